@@ -0,0 +1,188 @@
+"""Cold-start benchmark for the serverless entrypoint (``api/django.py``).
+
+Each run starts a fresh interpreter that imports ``api/django.py`` and
+sends one request straight to its WSGI application, recording the time
+from interpreter start to the end of the first response and how many
+modules got loaded. The median over ``--runs`` is compared with
+``cold_start_baseline.json``; the script exits with status 1 when it
+regresses by more than the tolerance.
+
+    python api/cold_start.py                     # check the API profile
+    python api/cold_start.py --compare ''        # skip the full profile
+    python api/cold_start.py --update-baseline   # after an intended change
+
+Absolute timings depend on the machine, so they are only reported. The
+check fails on the module count and on the first response time as a ratio
+of the ``--compare`` profile measured in the same run, which both hold
+from one machine to the next.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+BASELINE_FILE = Path(__file__).resolve().parent / 'cold_start_baseline.json'
+DEFAULT_SETTINGS = 'kissanmart.settings_api'
+# Answered without touching the database: token auth rejects the request
+DEFAULT_PATH = '/api/users/dashboard/'
+# Profile the API profile's timing is gated against
+COMPARE_SETTINGS = 'kissanmart.settings'
+
+CHILD = r'''
+import io, json, sys, time
+started = time.perf_counter()
+import runpy
+module = runpy.run_path(sys.argv[1], run_name='api_django')
+imported = time.perf_counter()
+status = []
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[2], 'QUERY_STRING': '',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+    'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+}
+body = b''.join(module['application'](environ, lambda code, headers, *args: status.append(code)))
+finished = time.perf_counter()
+print(json.dumps({
+    'status': int(status[0].split()[0]),
+    'import_ms': (imported - started) * 1000,
+    'first_response_ms': (finished - started) * 1000,
+    'modules': len(sys.modules),
+    'loaded': sorted(sys.modules),
+}))
+'''
+
+
+def run_once(settings_module, path=DEFAULT_PATH):
+    """Measure one cold start in a fresh interpreter"""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    env.setdefault('DJANGO_ALLOWED_HOSTS', 'localhost')
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD, str(BASE_DIR / 'api' / 'django.py'), path],
+        capture_output=True, text=True, cwd=BASE_DIR, env=env, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(settings_module, samples, path=DEFAULT_PATH):
+    """Median timings and the modules loaded over ``samples`` of one profile"""
+    if any(sample['status'] >= 500 for sample in samples):
+        raise RuntimeError(f'{path} answered {samples[0]["status"]} under {settings_module}')
+    return {
+        'import_ms': round(statistics.median(s['import_ms'] for s in samples), 1),
+        'first_response_ms': round(statistics.median(s['first_response_ms'] for s in samples), 1),
+        'modules': max(s['modules'] for s in samples),
+        'loaded': samples[-1]['loaded'],
+    }
+
+
+def measure(settings_module, runs=5, path=DEFAULT_PATH):
+    """Return the median timings of ``runs`` cold starts and the modules loaded"""
+    return summarize(settings_module, [run_once(settings_module, path) for _ in range(runs)], path)
+
+
+def measure_against(settings_module, compare, runs=5, path=DEFAULT_PATH):
+    """Measure two profiles with their runs interleaved, so both see the same machine load"""
+    samples = {settings_module: [], compare: []}
+    for _ in range(runs):
+        for name in samples:
+            samples[name].append(run_once(name, path))
+    return summarize(settings_module, samples[settings_module], path), summarize(compare, samples[compare], path)
+
+
+def ratio(result, other):
+    """First response time of ``result`` as a fraction of ``other``'s"""
+    return round(result['first_response_ms'] / other['first_response_ms'], 3)
+
+
+def check(result, baseline, other=None, ratio_tolerance=0.25, module_tolerance=0.05):
+    """Return the regressions of ``result`` against ``baseline`` as messages.
+
+    ``other`` is the ``--compare`` profile measured in the same run; without
+    it only the module count is checked.
+    """
+    problems = []
+    allowed_modules = baseline['modules'] * (1 + module_tolerance)
+    if result['modules'] > allowed_modules:
+        problems.append(f'{result["modules"]} modules loaded, over {allowed_modules:.0f} (baseline {baseline["modules"]})')
+    if other is not None and 'ratio' in baseline:
+        allowed_ratio = baseline['ratio'] * (1 + ratio_tolerance)
+        if ratio(result, other) > allowed_ratio:
+            problems.append(
+                f'first response took {ratio(result, other):.0%} of {baseline["compare"]}, over {allowed_ratio:.0%} '
+                f'(baseline {baseline["ratio"]:.0%})'
+            )
+    return problems
+
+
+def advise(result, baseline, time_tolerance=0.5):
+    """Return notes on absolute timings; these differ between machines and never fail the check"""
+    allowed_ms = baseline['first_response_ms'] * (1 + time_tolerance)
+    if result['first_response_ms'] > allowed_ms:
+        return [
+            f'first response took {result["first_response_ms"]}ms, over {allowed_ms:.1f}ms '
+            f'(baseline {baseline["first_response_ms"]}ms recorded on another run)'
+        ]
+    return []
+
+
+def load_baseline():
+    if not BASELINE_FILE.exists():
+        return {}
+    return json.loads(BASELINE_FILE.read_text())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--settings', default=DEFAULT_SETTINGS)
+    parser.add_argument('--path', default=DEFAULT_PATH)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--compare', metavar='SETTINGS', default=COMPARE_SETTINGS,
+                        help='Profile to gate the timing against; empty to skip')
+    parser.add_argument('--ratio-tolerance', type=float, default=0.25)
+    parser.add_argument('--time-tolerance', type=float, default=0.5, help='Only reported, never fails')
+    parser.add_argument('--module-tolerance', type=float, default=0.05)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    other = None
+    if args.compare:
+        result, other = measure_against(args.settings, args.compare, args.runs, args.path)
+    else:
+        result = measure(args.settings, args.runs, args.path)
+    print(f'{args.settings}: import {result["import_ms"]}ms, first response {result["first_response_ms"]}ms, '
+          f'{result["modules"]} modules')
+    if other is not None:
+        print(f'{args.compare}: import {other["import_ms"]}ms, first response {other["first_response_ms"]}ms, '
+              f'{other["modules"]} modules')
+
+    baselines = load_baseline()
+    if args.update_baseline:
+        baselines[args.settings] = {key: result[key] for key in ('first_response_ms', 'modules')}
+        if other is not None:
+            baselines[args.settings].update(compare=args.compare, ratio=ratio(result, other))
+        BASELINE_FILE.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+        print(f'Baseline written to {BASELINE_FILE}')
+        return 0
+
+    baseline = baselines.get(args.settings)
+    if baseline is None:
+        print('No baseline recorded; run with --update-baseline')
+        return 0
+    for note in advise(result, baseline, args.time_tolerance):
+        print(f'NOTE: {note}')
+    if other is not None and baseline.get('compare') not in (None, args.compare):
+        print(f'NOTE: baseline ratio is against {baseline["compare"]}, not {args.compare}')
+        other = None
+    problems = check(result, baseline, other, args.ratio_tolerance, args.module_tolerance)
+    for problem in problems:
+        print(f'REGRESSION: {problem}')
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,8 +6,9 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent.parent
 sys.path.append(str(BASE_DIR))
 
-# Set DJANGO_SETTINGS_MODULE to the production settings loader if desired
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kissanmart.settings')
+# The API-only profile boots a trimmed app and middleware stack; set
+# DJANGO_SETTINGS_MODULE=kissanmart.settings to serve the full site instead
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kissanmart.settings_api')
 
 # Boot Django
 import django
@@ -16,6 +17,8 @@ from django.core.wsgi import get_wsgi_application
 django.setup()
 application = get_wsgi_application()
 
+from kissanmart import serverless
+
 # awsgi wraps a WSGI app into a function that the serverless platform can call
 try:
     import awsgi
@@ -29,7 +32,15 @@ def handler(request, context=None):
     Vercel passes a Flask-like request object. awsgi provides a small adapter
     to convert between WSGI and the serverless event. If awsgi is not
     available, return a simple 500 response explaining the missing dependency.
+    Warmup pings (see ``kissanmart.serverless``) are answered directly.
     """
+    if serverless.is_warmup(request):
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json'},
+            'body': '{"warm": true, "ms": %s}' % serverless.warmup()
+        }
+
     if awsgi is None:
         return {
             'statusCode': 500,
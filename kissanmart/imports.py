@@ -0,0 +1,264 @@
+"""Import-time tooling: lazy module accessors and a startup import profiler.
+
+``lazy_import`` returns a stand-in that imports the real module on first
+attribute access. Modules that only need a heavy dependency on some code
+paths (``requests`` for outbound calls, provider SDKs) bind it this way so
+they never pull it in at startup themselves. A third-party module may still
+import it (DRF's compat module imports ``requests``); that is then the only
+importer left to remove.
+
+``profile_startup`` runs the app's startup path in a fresh interpreter with
+``-X importtime`` and parses the report into a tree. ``-X importtime`` only
+shows the first import of a module, so the child also lists every module
+holding a deferred package's module, class or function in its globals.
+``summarize`` rolls both up into totals, module counts and importers, which
+is what the ``import_profile`` command stores as a baseline and checks
+against.
+"""
+import importlib
+import json
+import os
+import subprocess
+import sys
+import types
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+BASELINE_FILE = Path(__file__).resolve().parent / 'import_baseline.json'
+
+# Kept off the startup path. Some are imported anyway by third-party code
+# (DRF's compat module imports requests when it is installed); the baseline
+# records every importer, and a new one is reported as a regression.
+DEFERRED_PACKAGES = ('requests', 'urllib3', 'PIL', 'google', 'twilio', 'facebook', 'jwt', 'cryptography')
+
+# What a WSGI worker or serverless instance imports before its first request
+STARTUP = (
+    'import django; django.setup(); '
+    'from django.urls import get_resolver; get_resolver().url_patterns; '
+    'from django.core.wsgi import get_wsgi_application; get_wsgi_application(); '
+    'import json; from kissanmart.imports import find_importers; print(json.dumps(find_importers()))'
+)
+
+
+class LazyModule:
+    """Module stand-in that imports ``name`` on first attribute access"""
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            # The import lock makes concurrent first uses safe
+            module = self.__dict__['_module'] = importlib.import_module(self._name)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f'<lazy module {self._name!r} ({state})>'
+
+
+def lazy_import(name):
+    """Return a ``LazyModule`` for ``name``.
+
+    Always a stand-in, even when ``name`` is already imported: binding the
+    real module would make the caller one of its importers.
+    """
+    return LazyModule(name)
+
+
+def find_importers(packages=DEFERRED_PACKAGES):
+    """Map each of ``packages`` to the loaded modules that bind something from it.
+
+    A binding is a module, class or function of the package in the module's
+    globals, i.e. ``import requests`` or ``from requests import Session``.
+    Modules of the deferred packages themselves are left out.
+    """
+    importers = {}
+    for name, module in list(sys.modules.items()):
+        if module is None or name.split('.')[0] in packages:
+            continue
+        for value in list(vars(module).values()):
+            # type() rather than isinstance(), which would set up lazy objects
+            kind = type(value)
+            if issubclass(kind, types.ModuleType):
+                owner = value.__name__
+            elif issubclass(kind, type) or kind is types.FunctionType:
+                owner = getattr(value, '__module__', None)
+            else:
+                continue
+            if not isinstance(owner, str):
+                continue
+            package = owner.split('.')[0]
+            if package in packages:
+                importers.setdefault(package, set()).add(name)
+    return {package: sorted(names) for package, names in sorted(importers.items())}
+
+
+class ImportNode:
+    def __init__(self, name, self_us, cumulative_us):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.children = []
+
+    @property
+    def package(self):
+        return self.name.split('.')[0]
+
+    def walk(self, depth=0):
+        yield self, depth
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+
+def parse_importtime(report):
+    """Build the import tree from ``-X importtime`` output; return the roots.
+
+    Each line is ``import time: self | cumulative | <2 spaces per level>name``
+    and a module is reported after everything it imported, so the pending
+    nodes one level deeper are its children.
+    """
+    pending = {}
+    for line in report.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|', 2)
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        label = fields[2][1:]
+        level = (len(label) - len(label.lstrip(' '))) // 2
+        node = ImportNode(label.strip(), int(fields[0]), int(fields[1]))
+        node.children = pending.pop(level + 1, [])
+        pending.setdefault(level, []).append(node)
+    return pending.get(0, [])
+
+
+def run_startup(settings_module=None):
+    """Run ``STARTUP`` under ``-X importtime`` in a fresh interpreter.
+
+    Returns the import tree's roots and ``find_importers()`` from the child.
+    """
+    env = dict(os.environ)
+    if settings_module:
+        env['DJANGO_SETTINGS_MODULE'] = settings_module
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP],
+        capture_output=True, text=True, cwd=BASE_DIR, env=env,
+    )
+    if result.returncode:
+        raise RuntimeError(f'Startup failed:\n{result.stderr[-2000:]}')
+    return parse_importtime(result.stderr), json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def profile_startup(settings_module=None, runs=3):
+    """Profile the startup path ``runs`` times, keeping each module's fastest time.
+
+    Import times are noisy; the minimum of a few runs is far more stable
+    than any single one. The tree and the importers are the first run's.
+    """
+    roots, importers = run_startup(settings_module)
+    nodes = {node.name: node for root in roots for node, _depth in root.walk()}
+    for _ in range(runs - 1):
+        for root in run_startup(settings_module)[0]:
+            for node, _depth in root.walk():
+                best = nodes.get(node.name)
+                if best is not None:
+                    best.self_us = min(best.self_us, node.self_us)
+                    best.cumulative_us = min(best.cumulative_us, node.cumulative_us)
+    return roots, importers
+
+
+def summarize(roots, importers=None):
+    """Roll the tree up per top-level package.
+
+    ``deferred`` names, for each of ``DEFERRED_PACKAGES`` that was imported
+    anyway, every module that imports it: the one that first loaded it
+    (``None`` at the top level) and those in ``importers``, which
+    ``-X importtime`` does not show once the package is loaded.
+    """
+    packages = {}
+    deferred = {package: set(names) for package, names in (importers or {}).items()}
+    total_us = 0
+    for root in roots:
+        total_us += root.cumulative_us
+        for parent, node in _edges(root):
+            entry = packages.setdefault(node.package, {'modules': 0, 'self_ms': 0.0})
+            entry['modules'] += 1
+            entry['self_ms'] += node.self_us / 1000
+            if node.package in DEFERRED_PACKAGES and (parent is None or parent.package != node.package):
+                deferred.setdefault(node.package, set()).add(parent.name if parent else None)
+    for entry in packages.values():
+        entry['self_ms'] = round(entry['self_ms'], 1)
+    return {
+        'total_ms': round(total_us / 1000, 1),
+        'modules': sum(entry['modules'] for entry in packages.values()),
+        'packages': dict(sorted(packages.items())),
+        'deferred': {
+            package: sorted(names, key=lambda name: name or '')
+            for package, names in sorted(deferred.items())
+        },
+    }
+
+
+def _edges(root, parent=None):
+    yield parent, root
+    for child in root.children:
+        yield from _edges(child, root)
+
+
+def check(summary, baseline, time_tolerance=0.5, module_tolerance=0.05):
+    """Return the regressions of ``summary`` against ``baseline`` as messages"""
+    problems = [
+        f'{package} is now imported at startup by {importer}; defer it with lazy_import'
+        for package, importers in summary['deferred'].items()
+        for importer in importers
+        if importer not in baseline['deferred'].get(package, ())
+    ]
+    allowed_ms = baseline['total_ms'] * (1 + time_tolerance)
+    if summary['total_ms'] > allowed_ms:
+        problems.append(f'startup imports took {summary["total_ms"]}ms, over {allowed_ms:.1f}ms '
+                        f'(baseline {baseline["total_ms"]}ms)')
+    allowed_modules = baseline['modules'] * (1 + module_tolerance)
+    if summary['modules'] > allowed_modules:
+        problems.append(f'{summary["modules"]} modules imported, over {allowed_modules:.0f} '
+                        f'(baseline {baseline["modules"]})')
+    return problems
+
+
+def baseline_entry(summary):
+    """The part of ``summary`` worth storing: totals, module counts and importers.
+
+    Per-package times are left out; they differ between machines and runs
+    and made every baseline update a diff of hundreds of lines.
+    """
+    return {
+        'total_ms': summary['total_ms'],
+        'modules': summary['modules'],
+        'packages': {
+            package: entry['modules'] for package, entry in summary['packages'].items()
+            # Third-party and project packages; the stdlib and private helpers vary by platform
+            if package not in sys.stdlib_module_names and not package.startswith('_')
+        },
+        'deferred': summary['deferred'],
+    }
+
+
+def load_baseline():
+    if not BASELINE_FILE.exists():
+        return {}
+    return json.loads(BASELINE_FILE.read_text())
+
+
+def save_baseline(settings_module, summary):
+    baselines = load_baseline()
+    baselines[settings_module] = baseline_entry(summary)
+    BASELINE_FILE.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
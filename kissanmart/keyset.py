@@ -0,0 +1,83 @@
+"""Keyset (seek) pagination shared by the product catalog and admin listings.
+
+A ``Keyset`` is an ordering whose last field is unique, e.g.
+``Keyset('-created_at', 'id')``. A page is located with a seek predicate on
+the position of the previous page's last row instead of an OFFSET, so every
+page costs the same however deep the client has scrolled. Cursors are that
+position, JSON-encoded and base64'd, and are parsed back with the model's
+own field types.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client supplies a cursor we did not issue"""
+
+
+def clamp_page_size(value, default, maximum):
+    """Clamp a requested page size to ``1..maximum``, using ``default`` when unset or junk"""
+    try:
+        page_size = int(value) if value else default
+    except (TypeError, ValueError):
+        page_size = default
+    return max(1, min(page_size, maximum))
+
+
+class Keyset:
+    def __init__(self, *ordering):
+        self.ordering = ordering
+        self.fields = [name.lstrip('-') for name in ordering]
+
+    def encode(self, row):
+        """Build an opaque cursor pointing just after ``row`` (an instance or a values() row)"""
+        if isinstance(row, dict):
+            position = [row[name] for name in self.fields]
+        else:
+            position = [getattr(row, name) for name in self.fields]
+        # Full isoformat: DjangoJSONEncoder would cut datetimes to milliseconds
+        position = [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]
+        raw = json.dumps(position, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode(self, cursor, model):
+        """Return the position encoded in ``cursor`` as values of ``model``'s fields"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if not isinstance(position, list) or len(position) != len(self.fields):
+                raise ValueError(cursor)
+            values = [
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(self.fields, position)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise InvalidCursor('Invalid cursor')
+        if any(value is None for value in values):
+            raise InvalidCursor('Invalid cursor')
+        return values
+
+    def seek(self, queryset, cursor):
+        """Order ``queryset`` by the keyset and skip to just after ``cursor``"""
+        queryset = queryset.order_by(*self.ordering)
+        if not cursor:
+            return queryset
+        values = self.decode(cursor, queryset.model)
+        # Rows after the position: equal on a prefix, then past it on the next field
+        after = Q()
+        for index, ordering in enumerate(self.ordering):
+            lookup = 'lt' if ordering.startswith('-') else 'gt'
+            equal = {name: value for name, value in zip(self.fields[:index], values[:index])}
+            after |= Q(**equal, **{f'{self.fields[index]}__{lookup}': values[index]})
+        return queryset.filter(after)
+
+    def paginate(self, queryset, cursor, page_size):
+        """Return one page of ``queryset`` and the cursor for the next page"""
+        # Fetch one extra row to know whether another page exists
+        rows = list(self.seek(queryset, cursor)[:page_size + 1])
+        page = rows[:page_size]
+        next_cursor = self.encode(page[-1]) if len(rows) > page_size else None
+        return page, next_cursor
@@ -0,0 +1,129 @@
+"""Test helpers that catch N+1 query patterns.
+
+``QueryCapture`` is an execute wrapper that records each query with its SQL
+fingerprint (see ``kissanmart.perf.fingerprint``) and the project stack
+frames it came from. A fingerprint that repeats ``threshold`` times or more
+within one request is reported as an N+1 pattern, pointing at the code that
+issued it.
+
+``NPlusOneMixin`` adds the assertions to a ``TestCase``; it needs nothing
+from the test runner, so it works the same under ``manage.py test`` and
+pytest-django::
+
+    class ProductQueryTests(NPlusOneMixin, TestCase):
+        def test_listing(self):
+            with self.capture_queries() as capture:
+                self.client.get(url)
+            self.assertNoNPlusOne(capture)
+"""
+import traceback
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.db import connections
+
+from . import perf
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_THRESHOLD = 3
+# Transaction control repeats legitimately (one savepoint per atomic block)
+IGNORED_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT', 'BEGIN', 'COMMIT')
+STACK_DEPTH = 4
+INSTRUMENTATION = (__file__, perf.__file__)
+
+
+def project_frames(limit=STACK_DEPTH):
+    """Innermost ``limit`` frames of project code (no libraries, no instrumentation)"""
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(str(BASE_DIR)) and frame.filename not in INSTRUMENTATION
+        and '/site-packages/' not in frame.filename
+    ]
+    return frames[-limit:]
+
+
+class CapturedQuery:
+    def __init__(self, sql, fingerprint, frames):
+        self.sql = sql
+        self.fingerprint = fingerprint
+        self.frames = frames
+
+    def origin(self):
+        return ''.join(traceback.format_list(self.frames)).rstrip() or '  (no project frames)'
+
+
+class QueryCapture:
+    """Execute wrapper recording queries with fingerprints and stack frames"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(IGNORED_PREFIXES):
+            self.queries.append(CapturedQuery(sql, perf.fingerprint(sql), project_frames()))
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def counts(self):
+        return Counter(query.fingerprint for query in self.queries)
+
+    def repeated(self, threshold=DEFAULT_THRESHOLD):
+        """``[(fingerprint, count, first query)]`` repeated ``threshold`` times or more"""
+        firsts = {}
+        for query in self.queries:
+            firsts.setdefault(query.fingerprint, query)
+        return [
+            (key, count, firsts[key])
+            for key, count in self.counts().most_common()
+            if count >= threshold
+        ]
+
+
+def describe(patterns):
+    return '\n\n'.join(
+        f'{count}x {key}\n{query.origin()}'
+        for key, count, query in patterns
+    )
+
+
+class NPlusOneMixin:
+    """Assertions for ``TestCase`` classes; see the module docstring"""
+    n_plus_one_threshold = DEFAULT_THRESHOLD
+
+    @contextmanager
+    def capture_queries(self):
+        capture = QueryCapture()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(capture))
+            yield capture
+
+    def assertNoNPlusOne(self, capture, threshold=None, msg=None):
+        patterns = capture.repeated(threshold or self.n_plus_one_threshold)
+        if patterns:
+            self.fail(self._formatMessage(msg, f'N+1 query patterns:\n\n{describe(patterns)}'))
+
+    def assertSameQueryCount(self, small, large, msg=None):
+        """Fail unless two captures of one request at different data sizes match.
+
+        The failure lists the fingerprints that ran more often on the larger
+        data set, with the code that issued them.
+        """
+        if len(small) == len(large):
+            return
+        small_counts = small.counts()
+        firsts = {}
+        for query in large.queries:
+            firsts.setdefault(query.fingerprint, query)
+        grown = [
+            (key, count, firsts[key])
+            for key, count in large.counts().most_common()
+            if count > small_counts.get(key, 0)
+        ]
+        self.fail(self._formatMessage(
+            msg, f'{len(small)} queries on the small data set, {len(large)} on the large one:\n\n{describe(grown)}'
+        ))
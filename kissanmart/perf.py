@@ -0,0 +1,268 @@
+"""Per-request performance metrics.
+
+``RequestMetricsMiddleware`` measures every request: wall time, the number
+of database queries and the time spent in them (through a connection
+execute wrapper), the time serializers spend producing their output (DRF's
+``.data`` and functions marked with ``timed_serializer``), and the response
+size. With ``PERF_SERVER_TIMING`` (off unless ``DEBUG``) it adds a
+``Server-Timing`` header for the browser's network panel. It folds the
+numbers into per-view aggregates with latency histograms, served by the
+admin metrics endpoint.
+
+Queries slower than ``PERF_SLOW_QUERY_MS`` are counted per SQL fingerprint
+(literals and ``IN`` lists collapsed) and a ``PERF_SLOW_QUERY_SAMPLE_RATE``
+share of them is logged to ``kissanmart.perf.slow_queries``.
+
+Aggregates live in process memory, like the outbound HTTP metrics: each
+worker reports its own numbers since it started (or since ``reset``).
+"""
+import contextvars
+import functools
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+
+slow_query_logger = logging.getLogger('kissanmart.perf.slow_queries')
+
+DEFAULT_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# Distinct slow fingerprints kept; later ones are still logged, not counted
+MAX_SLOW_FINGERPRINTS = 200
+UNRESOLVED = '<unresolved>'
+
+_current = contextvars.ContextVar('perf_request_stats', default=None)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Normalize ``sql`` so queries differing only in values compare equal"""
+    sql = _STRING_RE.sub('?', sql).replace('%s', '?')
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint_id(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+class RequestStats:
+    """Numbers for one request; also the execute wrapper that collects them"""
+
+    def __init__(self, path='', slow_ms=None, sample_rate=None):
+        self.path = path
+        self.slow_ms = getattr(settings, 'PERF_SLOW_QUERY_MS', 100) if slow_ms is None else slow_ms
+        self.sample_rate = (getattr(settings, 'PERF_SLOW_QUERY_SAMPLE_RATE', 1.0)
+                            if sample_rate is None else sample_rate)
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.in_serializer = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            if elapsed * 1000 >= self.slow_ms:
+                record_slow_query(sql, elapsed * 1000, self.path, self.sample_rate)
+
+
+class ViewMetrics:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.histogram = [0] * (len(buckets) + 1)
+        self.requests = 0
+        self.errors = 0
+        self.wall_total = self.wall_max = 0.0
+        self.queries_total = self.queries_max = 0
+        self.db_total = self.db_max = 0.0
+        self.serializer_total = 0.0
+        self.bytes_total = self.bytes_max = 0
+
+    def add(self, status_code, wall, stats, size):
+        wall_ms = wall * 1000
+        index = next((i for i, bound in enumerate(self.buckets) if wall_ms <= bound), len(self.buckets))
+        self.histogram[index] += 1
+        self.requests += 1
+        self.errors += int(status_code >= 500)
+        self.wall_total += wall
+        self.wall_max = max(self.wall_max, wall)
+        self.queries_total += stats.queries
+        self.queries_max = max(self.queries_max, stats.queries)
+        self.db_total += stats.db_time
+        self.db_max = max(self.db_max, stats.db_time)
+        self.serializer_total += stats.serializer_time
+        if size is not None:
+            self.bytes_total += size
+            self.bytes_max = max(self.bytes_max, size)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the ``fraction`` quantile (None past the last)"""
+        wanted = fraction * self.requests
+        seen = 0
+        for bound, count in zip(self.buckets, self.histogram):
+            seen += count
+            if seen >= wanted:
+                return bound
+        return None
+
+    def as_dict(self):
+        n = self.requests
+        labels = [str(bound) for bound in self.buckets] + ['+Inf']
+        return {
+            'requests': n,
+            'errors': self.errors,
+            'avg_ms': round(self.wall_total / n * 1000, 1),
+            'max_ms': round(self.wall_max * 1000, 1),
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'histogram_ms': dict(zip(labels, self.histogram)),
+            'avg_queries': round(self.queries_total / n, 2),
+            'max_queries': self.queries_max,
+            'avg_db_ms': round(self.db_total / n * 1000, 1),
+            'max_db_ms': round(self.db_max * 1000, 1),
+            'avg_serializer_ms': round(self.serializer_total / n * 1000, 1),
+            'avg_response_bytes': round(self.bytes_total / n),
+            'max_response_bytes': self.bytes_max,
+        }
+
+
+_lock = threading.Lock()
+_views = {}
+_slow_queries = {}
+_since = timezone.now()
+
+
+def record(view_name, status_code, wall, stats, size):
+    buckets = tuple(getattr(settings, 'PERF_LATENCY_BUCKETS_MS', DEFAULT_BUCKETS_MS))
+    with _lock:
+        metrics = _views.get(view_name)
+        if metrics is None or metrics.buckets != buckets:
+            metrics = _views[view_name] = ViewMetrics(buckets)
+        metrics.add(status_code, wall, stats, size)
+
+
+def record_slow_query(sql, elapsed_ms, path='', sample_rate=1.0):
+    normalized = fingerprint(sql)
+    key = fingerprint_id(normalized)
+    with _lock:
+        entry = _slow_queries.get(key)
+        if entry is None and len(_slow_queries) < MAX_SLOW_FINGERPRINTS:
+            entry = _slow_queries[key] = {'sql': normalized[:1000], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+        if entry is not None:
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+    if random.random() < sample_rate:
+        slow_query_logger.warning('Slow query %.1fms [%s] on %s: %s', elapsed_ms, key, path or '-', normalized[:1000])
+
+
+def snapshot(slow_limit=20):
+    with _lock:
+        views = {name: metrics.as_dict() for name, metrics in sorted(_views.items())}
+        slow = sorted(_slow_queries.items(), key=lambda item: -item[1]['total_ms'])[:slow_limit]
+        slow = [
+            dict(entry, fingerprint=key, total_ms=round(entry['total_ms'], 1), max_ms=round(entry['max_ms'], 1))
+            for key, entry in slow
+        ]
+        since = _since
+    return {'since': since.isoformat(), 'views': views, 'slow_queries': slow}
+
+
+def reset():
+    global _since
+    with _lock:
+        _views.clear()
+        _slow_queries.clear()
+        _since = timezone.now()
+
+
+def current_stats():
+    """The ``RequestStats`` of the request being handled, if it is measured"""
+    return _current.get()
+
+
+def timed_serializer(func):
+    """Count ``func``'s run time as serializer time of the request being measured.
+
+    ``BaseSerializer.data`` is wrapped with it; hand-written serializers that
+    bypass DRF (the lean product listing) use it as a decorator.
+    """
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        stats = _current.get()
+        if stats is None or stats.in_serializer:
+            # Nested serializers are part of the outermost one's time
+            return func(*args, **kwargs)
+        stats.in_serializer = True
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.serializer_time += time.perf_counter() - started
+            stats.in_serializer = False
+    timed.perf_timed = True
+    return timed
+
+
+def instrument_serializers():
+    """Time ``BaseSerializer.data``, which every serializer's ``.data`` goes through"""
+    from rest_framework.serializers import BaseSerializer
+
+    prop = BaseSerializer.__dict__['data']
+    if not getattr(prop.fget, 'perf_timed', False):
+        BaseSerializer.data = property(timed_serializer(prop.fget))
+
+
+def server_timing(wall, stats):
+    return (
+        f'app;dur={wall * 1000:.1f}, '
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+        f'ser;dur={stats.serializer_time * 1000:.1f}'
+    )
+
+
+class RequestMetricsMiddleware:
+    """Measure each request; list it first so the whole stack is timed"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument_serializers()
+
+    def __call__(self, request):
+        stats = RequestStats(request.path)
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        wall = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else UNRESOLVED
+        size = None if response.streaming else len(response.content)
+        record(view_name, response.status_code, wall, stats, size)
+        if getattr(settings, 'PERF_SERVER_TIMING', False):
+            response['Server-Timing'] = server_timing(wall, stats)
+        return response
@@ -4,6 +4,9 @@ from .settings import *  # noqa: F401,F403 - import base settings
 # Override base settings with production-safe defaults read from environment
 DEBUG = os.getenv('DJANGO_DEBUG', 'False').lower() in ('1', 'true', 'yes')
 
+# Server-Timing reveals DB time and query counts, so it is off unless asked for
+PERF_SERVER_TIMING = os.getenv('PERF_SERVER_TIMING', str(DEBUG)).lower() in ('1', 'true', 'yes')
+
 # SECRET_KEY must be provided in environment in production
 SECRET_KEY = os.getenv('DJANGO_SECRET_KEY', SECRET_KEY)
 
@@ -20,6 +23,38 @@ if DATABASE_URL:
         # If dj-database-url missing or parse error, keep default
         pass
 
+# Shared caches so every worker sees the same listing cache, catalog version
+# and auth state (credential cache, session revocations).
+#
+# REDIS_URL backs the default alias, which holds the auth state: revocations
+# must never be evicted, so that Redis needs maxmemory-policy noeviction.
+# Under allkeys-lru or volatile-lru a revoked session token (whose denylist
+# entry has a TTL) would become valid again once its entry was evicted.
+# Listings can go to a separate Redis with allkeys-lru through
+# PRODUCT_LISTING_REDIS_URL; on a shared noeviction Redis their size is
+# bounded by PRODUCT_LISTING_CACHE_TIMEOUT instead.
+REDIS_URL = os.getenv('REDIS_URL')
+PRODUCT_LISTING_REDIS_URL = os.getenv('PRODUCT_LISTING_REDIS_URL', REDIS_URL)
+if REDIS_URL:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'kissanmart',
+    }
+if PRODUCT_LISTING_REDIS_URL:
+    CACHES['product_listings'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': PRODUCT_LISTING_REDIS_URL,
+        'KEY_PREFIX': 'kissanmart-listings',
+        'TIMEOUT': PRODUCT_LISTING_CACHE_TIMEOUT,
+    }
+else:
+    # Per-process LocMem: a catalog write only bumps the version in the worker
+    # that handled it, so the others serve their cached listings until those
+    # expire. Keep that staleness window short.
+    PRODUCT_LISTING_CACHE_TIMEOUT = int(os.getenv('PRODUCT_LISTING_CACHE_TIMEOUT', '30'))
+    CACHES['product_listings']['TIMEOUT'] = PRODUCT_LISTING_CACHE_TIMEOUT
+
 # Static files served with WhiteNoise
 MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')  # after SecurityMiddleware
 
@@ -0,0 +1,40 @@
+"""Helpers for running the API as a serverless function (``api/django.py``).
+
+``warmup`` does the work a cold instance would otherwise do on its first
+real request: importing every view module (by loading the URLconf) and
+opening the database connection, which ``CONN_MAX_AGE`` in
+``kissanmart.settings_api`` then keeps for later invocations. Platforms
+that ping functions to keep them warm can send those pings to
+``WARMUP_PATH`` or with an ``X-Warmup`` header; they are answered here
+without going through Django's request handling.
+"""
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
+
+WARMUP_PATH = '/__warmup'
+WARMUP_HEADER = 'X-Warmup'
+
+
+def is_warmup(request):
+    path = (getattr(request, 'path', '') or '').split('?')[0]
+    headers = getattr(request, 'headers', None) or {}
+    return path == WARMUP_PATH or bool(headers.get(WARMUP_HEADER))
+
+
+def warmup():
+    """Load the URLconf and connect to the database; return the time taken in ms"""
+    from django.db import connection
+    from django.urls import get_resolver
+
+    started = time.perf_counter()
+    # Resolving the patterns imports every view, serializer and model module
+    get_resolver().url_patterns
+    try:
+        connection.ensure_connection()
+    except Exception:
+        # A database outage must not fail the warmup ping itself
+        logger.exception('Warmup could not connect to the database')
+    return round((time.perf_counter() - started) * 1000, 1)
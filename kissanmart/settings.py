@@ -53,6 +53,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'kissanmart.perf.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -138,6 +139,12 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Product image renditions are generated off-request (see products/images.py).
+# 'thread' uses an in-process worker pool, 'sync' renders inline, and a dotted
+# path names a callable that receives the ProductImage id (e.g. a task queue).
+PRODUCT_IMAGE_PIPELINE = os.getenv('PRODUCT_IMAGE_PIPELINE', 'thread')
+PRODUCT_IMAGE_WORKERS = int(os.getenv('PRODUCT_IMAGE_WORKERS', '2'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -145,7 +152,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        # Token and X-Session-Token auth with a short-lived credential cache
+        'users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -187,6 +195,99 @@ AUTH_USER_MODEL = 'users.CustomUser'
 
 # OTP Configuration
 OTP_EXPIRY_MINUTES = 5
+# Repeat OTP requests within this window reuse the live OTP instead of sending another
+OTP_RESEND_WINDOW_SECONDS = int(os.getenv('OTP_RESEND_WINDOW_SECONDS', '60'))
+# `manage.py purge_expired_otps` housekeeping
+OTP_PURGE_BATCH_SIZE = int(os.getenv('OTP_PURGE_BATCH_SIZE', '1000'))
+OTP_PURGE_GRACE_MINUTES = int(os.getenv('OTP_PURGE_GRACE_MINUTES', '10'))
+SMS_OUTBOX_RETENTION_HOURS = int(os.getenv('SMS_OUTBOX_RETENTION_HOURS', '24'))
+
+# Caches
+# LocMem in development; production_settings switches to a shared Redis cache
+# when REDIS_URL is set. The product listing cache is kept in its own alias so
+# its size bound (LRU eviction past MAX_ENTRIES) does not affect other users.
+# LocMem is per process: with several workers a catalog write only invalidates
+# the listings of the worker that handled it, the rest stay stale for up to
+# PRODUCT_LISTING_CACHE_TIMEOUT seconds.
+PRODUCT_LISTING_CACHE_TIMEOUT = int(os.getenv('PRODUCT_LISTING_CACHE_TIMEOUT', '300'))
+PRODUCT_LISTING_CACHE_MAX_ENTRIES = int(os.getenv('PRODUCT_LISTING_CACHE_MAX_ENTRIES', '1000'))
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'default',
+    },
+    'product_listings': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'product-listings',
+        'TIMEOUT': PRODUCT_LISTING_CACHE_TIMEOUT,
+        'OPTIONS': {'MAX_ENTRIES': PRODUCT_LISTING_CACHE_MAX_ENTRIES},
+    },
+}
+
+# Product listing pagination (cursor mode of the buyer catalog)
+PRODUCTS_PAGE_SIZE = int(os.getenv('PRODUCTS_PAGE_SIZE', '20'))
+PRODUCTS_MAX_PAGE_SIZE = int(os.getenv('PRODUCTS_MAX_PAGE_SIZE', '100'))
+# Admin user list cursor pagination
+ADMIN_USERS_PAGE_SIZE = int(os.getenv('ADMIN_USERS_PAGE_SIZE', '50'))
+ADMIN_USERS_MAX_PAGE_SIZE = int(os.getenv('ADMIN_USERS_MAX_PAGE_SIZE', '200'))
+# Rows fetched per database round-trip by the streaming admin exports
+ADMIN_EXPORT_CHUNK_SIZE = int(os.getenv('ADMIN_EXPORT_CHUNK_SIZE', '2000'))
+# Bulk admin actions: users written per UPDATE/audit batch, and per request
+ADMIN_BULK_BATCH_SIZE = int(os.getenv('ADMIN_BULK_BATCH_SIZE', '500'))
+ADMIN_BULK_MAX_USERS = int(os.getenv('ADMIN_BULK_MAX_USERS', '10000'))
+# Background user deletion (manage.py process_user_deletions)
+USER_DELETION_BATCH_SIZE = int(os.getenv('USER_DELETION_BATCH_SIZE', '200'))
+USER_DELETION_LEASE_SECONDS = int(os.getenv('USER_DELETION_LEASE_SECONDS', '300'))
+USER_DELETION_MAX_ATTEMPTS = int(os.getenv('USER_DELETION_MAX_ATTEMPTS', '5'))
+
+# "Near me" product discovery radius in km
+PRODUCTS_NEARBY_DEFAULT_RADIUS_KM = float(os.getenv('PRODUCTS_NEARBY_DEFAULT_RADIUS_KM', '25'))
+PRODUCTS_NEARBY_MAX_RADIUS_KM = float(os.getenv('PRODUCTS_NEARBY_MAX_RADIUS_KM', '200'))
+
+# Serve /statistics/ from counters kept current by signals
+USER_STATISTICS_MATERIALIZED = os.getenv('USER_STATISTICS_MATERIALIZED', 'true').lower() in ('1', 'true', 'yes')
+
+# Per-request metrics (kissanmart.perf): Server-Timing headers, /api/users/admin/metrics/
+# and a sampled log ('kissanmart.perf.slow_queries') of queries slower than the threshold.
+# Server-Timing exposes DB time and query counts to any client, so it follows DEBUG
+PERF_SERVER_TIMING = os.getenv('PERF_SERVER_TIMING', str(DEBUG)).lower() in ('1', 'true', 'yes')
+PERF_SLOW_QUERY_MS = float(os.getenv('PERF_SLOW_QUERY_MS', '100'))
+PERF_SLOW_QUERY_SAMPLE_RATE = float(os.getenv('PERF_SLOW_QUERY_SAMPLE_RATE', '0.1'))
+PERF_LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Outbound HTTP to Google, Facebook and MSG91 (users.http_client)
+OUTBOUND_HTTP_TIMEOUT = (
+    float(os.getenv('OUTBOUND_HTTP_CONNECT_TIMEOUT', '3.05')),
+    float(os.getenv('OUTBOUND_HTTP_READ_TIMEOUT', '10')),
+)
+OUTBOUND_HTTP_POOL_SIZE = int(os.getenv('OUTBOUND_HTTP_POOL_SIZE', '10'))
+OUTBOUND_HTTP_BREAKER_THRESHOLD = int(os.getenv('OUTBOUND_HTTP_BREAKER_THRESHOLD', '5'))
+OUTBOUND_HTTP_BREAKER_RESET_SECONDS = float(os.getenv('OUTBOUND_HTTP_BREAKER_RESET_SECONDS', '30'))
+
+# SMS outbox (drained by `manage.py send_sms_outbox`)
+SMS_PROVIDER = os.getenv('SMS_PROVIDER', 'msg91')
+SMS_OUTBOX_BATCH_SIZE = int(os.getenv('SMS_OUTBOX_BATCH_SIZE', '50'))
+SMS_OUTBOX_CONCURRENCY = int(os.getenv('SMS_OUTBOX_CONCURRENCY', '4'))
+SMS_OUTBOX_MAX_ATTEMPTS = int(os.getenv('SMS_OUTBOX_MAX_ATTEMPTS', '5'))
+SMS_OUTBOX_RETRY_BASE_SECONDS = float(os.getenv('SMS_OUTBOX_RETRY_BASE_SECONDS', '2'))
+SMS_OUTBOX_RETRY_MAX_SECONDS = float(os.getenv('SMS_OUTBOX_RETRY_MAX_SECONDS', '300'))
+SMS_OUTBOX_LEASE_SECONDS = int(os.getenv('SMS_OUTBOX_LEASE_SECONDS', '60'))
+SMS_FAKE_LATENCY_MS = int(os.getenv('SMS_FAKE_LATENCY_MS', '0'))
+SMS_FAKE_FAILURE_RATE = float(os.getenv('SMS_FAKE_FAILURE_RATE', '0'))
+
+# Cached credential lookups in users.authentication. Logout and suspension only
+# invalidate processes sharing this alias: use a shared cache with several workers
+AUTH_CACHE_ALIAS = os.getenv('AUTH_CACHE_ALIAS', 'default')
+AUTH_CACHE_TIMEOUT = int(os.getenv('AUTH_CACHE_TIMEOUT', '60'))
+
+# 'random' tokens are checked against UserSession; 'signed' tokens are verified
+# by HMAC alone and revoked through AUTH_CACHE_ALIAS (use a shared cache such as Redis)
+SESSION_TOKEN_MODE = os.getenv('SESSION_TOKEN_MODE', 'random')
+SESSION_TOKEN_LIFETIME_DAYS = int(os.getenv('SESSION_TOKEN_LIFETIME_DAYS', '30'))
+
+# Bulk product import (rows validated and inserted per chunk)
+PRODUCT_IMPORT_CHUNK_SIZE = int(os.getenv('PRODUCT_IMPORT_CHUNK_SIZE', '500'))
+PRODUCT_IMPORT_MAX_ROWS = int(os.getenv('PRODUCT_IMPORT_MAX_ROWS', '10000'))
 
 # Django Sites Framework (required for allauth)
 SITE_ID = 1
@@ -256,6 +357,13 @@ GOOGLE_OAUTH2_CLIENT_SECRET = os.getenv('GOOGLE_OAUTH2_CLIENT_SECRET', '')
 FACEBOOK_APP_ID = os.getenv('FACEBOOK_APP_ID', 'your-facebook-app-id')
 FACEBOOK_APP_SECRET = os.getenv('FACEBOOK_APP_SECRET', '')
 
+# Google ID tokens are verified locally against Google's published keys (users.google_identity).
+# Extra audiences cover mobile/web client IDs that sign users in to the same backend.
+GOOGLE_ID_TOKEN_EXTRA_AUDIENCES = [
+    audience.strip() for audience in os.getenv('GOOGLE_ID_TOKEN_EXTRA_AUDIENCES', '').split(',') if audience.strip()
+]
+GOOGLE_ID_TOKEN_CLOCK_SKEW = int(os.getenv('GOOGLE_ID_TOKEN_CLOCK_SKEW', '10'))
+
 # Load .env.local automatically in development if python-dotenv is installed
 try:
     from dotenv import load_dotenv
@@ -0,0 +1,69 @@
+"""
+API-only settings for the serverless function (``api/django.py``).
+
+The function serves nothing but the JSON API, so this profile drops what
+only the HTML side needs: the admin, sessions, messages, static files, the
+sites framework and allauth with its Google/Facebook providers, together
+with their middleware. Requests authenticate with tokens only. Database
+connections are kept open between warm invocations of the same instance.
+
+Everything else comes from ``kissanmart.settings``.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK, TEMPLATES, DATABASES
+import os
+
+API_EXCLUDED_APPS = (
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'django.contrib.sites',
+    'allauth',
+)
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS
+    if not any(app == excluded or app.startswith(excluded + '.') for excluded in API_EXCLUDED_APPS)
+]
+
+MIDDLEWARE = [
+    'kissanmart.perf.RequestMetricsMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'kissanmart.urls_api'
+
+AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    # No sessions in this profile, so no SessionAuthentication
+    'DEFAULT_AUTHENTICATION_CLASSES': ['users.authentication.CachedTokenAuthentication'],
+}
+
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'OPTIONS': {
+        'context_processors': [
+            'django.template.context_processors.debug',
+            'django.template.context_processors.request',
+        ],
+    },
+}]
+
+# Reuse the connection across warm invocations; check it before each request
+DATABASES = {
+    alias: {
+        **config,
+        'CONN_MAX_AGE': int(os.getenv('DJANGO_CONN_MAX_AGE', '300')),
+        'CONN_HEALTH_CHECKS': True,
+    }
+    for alias, config in DATABASES.items()
+}
+
+# The instance is frozen once the response is sent, so a background thread
+# would leave renditions pending; render inline unless a queue is configured
+PRODUCT_IMAGE_PIPELINE = os.getenv('PRODUCT_IMAGE_PIPELINE', 'sync')
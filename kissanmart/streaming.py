@@ -0,0 +1,66 @@
+"""Streaming CSV / NDJSON writers shared by the product and admin exports.
+
+``stream_rows`` encodes an iterator of value tuples and yields the text every
+``flush_rows`` rows, so a response of any size keeps a constant memory
+footprint and a bounded number of chunks.
+
+CSV text cells that a spreadsheet would read as a formula (starting with
+``=``, ``+``, ``-``, ``@``, tab or carriage return) are prefixed with a
+single quote. Numbers are written as they are, so a negative amount is not
+mangled; NDJSON is not a spreadsheet format and is left untouched.
+"""
+import csv
+import io
+import json
+from decimal import Decimal
+
+
+FORMATS = ('csv', 'ndjson')
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def json_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return "'" + value if value.startswith(FORMULA_PREFIXES) else value
+    return json_value(value)
+
+
+def stream_rows(rows, fields, data_format, flush_rows=500):
+    """Yield ``rows`` (tuples in ``fields`` order) encoded as CSV or NDJSON text"""
+    buffer = io.StringIO()
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return value
+
+    if data_format == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+
+        def write(row):
+            writer.writerow([csv_value(value) for value in row])
+    else:
+        def write(row):
+            buffer.write(json.dumps(dict(zip(fields, map(json_value, row)))) + '\n')
+
+    for count, row in enumerate(rows, start=1):
+        write(row)
+        if count % flush_rows == 0:
+            yield flush()
+    yield flush()
@@ -0,0 +1,7 @@
+from django.urls import path, include
+
+# JSON API only; see kissanmart/settings_api.py
+urlpatterns = [
+    path('api/users/', include('users.urls')),
+    path('api/products/', include('products.api.urls')),
+]
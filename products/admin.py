@@ -55,6 +55,6 @@ class ProductAdmin(admin.ModelAdmin):
 
 @admin.register(ProductImage)
 class ProductImageAdmin(admin.ModelAdmin):
-    list_display = ['product', 'image', 'caption']
-    list_filter = ['product__name']
+    list_display = ['product', 'image', 'caption', 'processing_status']
+    list_filter = ['processing_status', 'product__name']
     search_fields = ['product__name', 'caption']
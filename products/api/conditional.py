@@ -0,0 +1,66 @@
+"""ETag support for the product read endpoints.
+
+Validators are derived from a single aggregate over the products a response
+is built from (row count, newest ``updated_at``, image count, newest image id
+and how many images finished processing), so a conditional request can be
+answered with 304 Not Modified without loading or serializing the listing.
+
+No ``Last-Modified`` is sent: deleting an older product or adding an image
+changes the response without moving any timestamp we store, so an
+``If-Modified-Since`` check would keep serving the client a stale copy.
+"""
+import hashlib
+
+from django.db.models import Count, Max, Q
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+
+
+# Bump when the response format changes so clients drop their old copies
+ETAG_FORMAT_VERSION = '2'
+
+
+def catalog_validators(products, *scope):
+    """Return ``(etag, rows)`` for a Product queryset.
+
+    ``scope`` holds anything else the response body depends on (filters,
+    buyer category, ...) so different views of the same rows differ.
+    """
+    stats = products.order_by().aggregate(
+        rows=Count('id', distinct=True),
+        last_updated=Max('updated_at'),
+        image_count=Count('images'),
+        last_image=Max('images__id'),
+        ready_images=Count('images', filter=Q(images__processing_status='ready')),
+        failed_images=Count('images', filter=Q(images__processing_status='failed')),
+    )
+    last_updated = stats['last_updated']
+    parts = [
+        ETAG_FORMAT_VERSION,
+        stats['rows'],
+        last_updated.isoformat() if last_updated else '',
+        stats['image_count'],
+        stats['last_image'] or '',
+        stats['ready_images'],
+        stats['failed_images'],
+        *scope,
+    ]
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return quote_etag(digest), stats['rows']
+
+
+def get_not_modified_response(request, etag):
+    """Return a 304 response when the client's copy is current, else None"""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        add_validators(response, etag)
+    return response
+
+
+def add_validators(response, etag):
+    """Attach the ETag and ask clients to revalidate"""
+    if etag:
+        response.headers.setdefault('ETag', etag)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
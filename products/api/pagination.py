@@ -0,0 +1,27 @@
+from django.conf import settings
+
+from kissanmart.keyset import InvalidCursor, Keyset, clamp_page_size  # noqa: F401 - re-exported for the views
+
+
+# Keyset ordering used by cursor pagination: newest first, id breaks ties
+KEYSET = Keyset('-created_at', 'id')
+KEYSET_ORDERING = KEYSET.ordering
+
+
+def get_page_size(value):
+    """Clamp the requested page size to the configured bounds"""
+    return clamp_page_size(
+        value,
+        getattr(settings, 'PRODUCTS_PAGE_SIZE', 20),
+        getattr(settings, 'PRODUCTS_MAX_PAGE_SIZE', 100),
+    )
+
+
+def paginate_products(queryset, cursor=None, page_size=None):
+    """Return one keyset page of ``queryset`` and the cursor for the next page.
+
+    The page is located with a ``(created_at, id)`` seek predicate instead of
+    an OFFSET, so every page costs the same regardless of how deep the client
+    has scrolled into the catalog.
+    """
+    return KEYSET.paginate(queryset, cursor, get_page_size(page_size))
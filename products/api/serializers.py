@@ -1,5 +1,8 @@
+from django.core.files.storage import default_storage
 from rest_framework import serializers
-from ..models import Category, Product, ProductImage
+
+from kissanmart.perf import timed_serializer
+from ..models import Category, Product, ProductImage, product_status, target_buyers_display
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -10,9 +13,32 @@ class CategorySerializer(serializers.ModelSerializer):
 
 class ProductImageSerializer(serializers.ModelSerializer):
     """Serializer for product images"""
+    thumbnail = serializers.SerializerMethodField()
+    renditions = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'caption']
+        fields = ['id', 'image', 'caption', 'processing_status', 'thumbnail', 'renditions']
+
+    def get_renditions(self, obj):
+        """Rendition URLs and dimensions, e.g. ``{'card': {'width', 'height', 'webp', 'jpeg'}}``"""
+        return rendition_urls(obj.renditions)
+
+    def get_thumbnail(self, obj):
+        thumbnail = (obj.renditions or {}).get('thumbnail')
+        return default_storage.url(thumbnail['webp']) if thumbnail else None
+
+
+def rendition_urls(renditions):
+    return {
+        name: {
+            'width': entry['width'],
+            'height': entry['height'],
+            'webp': default_storage.url(entry['webp']),
+            'jpeg': default_storage.url(entry['jpeg']),
+        }
+        for name, entry in (renditions or {}).items()
+    }
 
 
 class ProductListSerializer(serializers.ModelSerializer):
@@ -33,6 +59,89 @@ class ProductListSerializer(serializers.ModelSerializer):
         ]
 
 
+# Read-only fast path for listings. ``ProductListSerializer`` builds field
+# objects and walks ``seller`` and ``images`` per row; this reads the
+# products with one values() query and their images with one more, and
+# formats the values with the serializer's own fields so the JSON is
+# byte-identical.
+LEAN_PRODUCT_VALUES = (
+    'id', 'seller_id', 'name', 'variety', 'description', 'quantity_available', 'unit', 'price_per_unit',
+    'min_order_quantity', 'target_mandi_owners', 'target_shopkeepers', 'target_communities',
+    'is_published', 'created_at', 'updated_at',
+)
+LEAN_IMAGE_VALUES = ('product_id', 'id', 'image', 'caption', 'processing_status', 'renditions')
+# Values that need the serializer's formatting (decimal places, ISO datetimes)
+FORMATTED_FIELDS = ('quantity_available', 'price_per_unit', 'min_order_quantity', 'created_at', 'updated_at')
+
+
+def product_list_values(queryset, *extra):
+    """``queryset`` as values() rows, keeping its filters and ordering; ``extra`` adds annotations"""
+    return queryset.select_related(None).prefetch_related(None).values(*LEAN_PRODUCT_VALUES, *extra)
+
+
+@timed_serializer
+def serialize_product_rows(rows):
+    """Return ``ProductListSerializer(many=True).data`` for rows of ``product_list_values``"""
+    rows = list(rows)
+    fields = ProductListSerializer().fields
+    formatters = {name: fields[name].to_representation for name in FORMATTED_FIELDS}
+    image_storage = ProductImage._meta.get_field('image').storage
+
+    images = {row['id']: [] for row in rows}
+    if images:
+        image_rows = (
+            ProductImage.objects.filter(product_id__in=list(images))
+            .order_by('product_id', 'id').values_list(*LEAN_IMAGE_VALUES)
+        )
+        for product_id, pk, name, caption, processing_status, renditions in image_rows:
+            thumbnail = (renditions or {}).get('thumbnail')
+            images[product_id].append({
+                'id': pk,
+                'image': image_storage.url(name) if name else None,
+                'caption': caption,
+                'processing_status': processing_status,
+                'thumbnail': default_storage.url(thumbnail['webp']) if thumbnail else None,
+                'renditions': rendition_urls(renditions),
+            })
+
+    def formatted(row, name):
+        value = row[name]
+        return None if value is None else formatters[name](value)
+
+    return [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'variety': row['variety'],
+            # CustomUser has no username (it is None on the class), so the
+            # serializer's seller.username is always null
+            'seller_name': None,
+            'description': row['description'],
+            'quantity_available': formatted(row, 'quantity_available'),
+            'unit': row['unit'],
+            'price_per_unit': formatted(row, 'price_per_unit'),
+            'min_order_quantity': formatted(row, 'min_order_quantity'),
+            'target_mandi_owners': row['target_mandi_owners'],
+            'target_shopkeepers': row['target_shopkeepers'],
+            'target_communities': row['target_communities'],
+            'target_buyers_display': target_buyers_display(
+                row['target_mandi_owners'], row['target_shopkeepers'], row['target_communities']
+            ),
+            'is_published': row['is_published'],
+            'status': product_status(row['is_published'], row['quantity_available']),
+            'images': images[row['id']],
+            'created_at': formatted(row, 'created_at'),
+            'updated_at': formatted(row, 'updated_at'),
+        }
+        for row in rows
+    ]
+
+
+def serialize_product_list(queryset):
+    """Fast equivalent of ``ProductListSerializer(queryset, many=True).data``"""
+    return serialize_product_rows(product_list_values(queryset))
+
+
 class ProductCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating products"""
     images = serializers.ListField(
@@ -2,6 +2,8 @@ from django.urls import path
 from .views import (
     get_seller_products,
     add_product,
+    bulk_import_products,
+    export_seller_products,
     update_product,
     delete_product,
     get_products_by_buyer_type,
@@ -9,13 +11,16 @@ from .views import (
     add_product_images,
     delete_product_image,
     get_available_products_for_buyer,
-    get_product_detail_for_buyer
+    get_product_detail_for_buyer,
+    get_listing_cache_stats
 )
 
 urlpatterns = [
     # Seller Product endpoints (authenticated sellers)
     path('products/', get_seller_products, name='seller-products'),
     path('add-product/', add_product, name='add-product'),
+    path('products/bulk-import/', bulk_import_products, name='bulk-import-products'),
+    path('products/export/', export_seller_products, name='export-products'),
     path('products/<int:product_id>/', get_product_detail, name='product-detail'),
     path('products/<int:product_id>/update/', update_product, name='update-product'),
     path('products/<int:product_id>/delete/', delete_product, name='delete-product'),
@@ -28,4 +33,7 @@ urlpatterns = [
     # Buyer Product endpoints (authenticated buyers)
     path('available-products/', get_available_products_for_buyer, name='available-products-for-buyer'),
     path('available-products/<int:product_id>/', get_product_detail_for_buyer, name='product-detail-for-buyer'),
+
+    # Operations
+    path('listing-cache-stats/', get_listing_cache_stats, name='listing-cache-stats'),
 ]
@@ -1,12 +1,71 @@
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, prefetch_related_objects
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
+from users import geo
 from ..models import Product, Category, ProductImage
-from .serializers import ProductListSerializer, ProductCreateSerializer, ProductUpdateSerializer
+from .. import bulk
+from .. import listing_cache
+from .. import search as product_search
+from .serializers import (
+    ProductListSerializer, ProductCreateSerializer, ProductUpdateSerializer,
+    product_list_values, serialize_product_list, serialize_product_rows,
+)
+from .pagination import InvalidCursor, get_page_size, paginate_products
+from .conditional import add_validators, catalog_validators, get_not_modified_response
+
+
+def get_listing_facets(products):
+    """Return the total count and distinct units of a listing in one query"""
+    unit_counts = list(
+        products.order_by().values('unit').annotate(count=Count('id')).order_by('unit')
+    )
+    total = sum(row['count'] for row in unit_counts)
+    return total, [row['unit'] for row in unit_counts]
+
+
+def get_nearby_origin(request):
+    """Return ``(latitude, longitude, radius_km)`` for a "near me" listing.
+
+    Coordinates default to the buyer's saved location. Raises ValueError with
+    a client-facing message when they are missing or out of range.
+    """
+    params = request.GET
+    latitude = params.get('lat') or request.user.latitude
+    longitude = params.get('lng') or request.user.longitude
+    if latitude is None or longitude is None:
+        raise ValueError('Location required: pass lat and lng or save your location in your profile')
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+        radius_km = float(params.get('radius_km') or settings.PRODUCTS_NEARBY_DEFAULT_RADIUS_KM)
+    except (ValueError, TypeError):
+        raise ValueError('lat, lng and radius_km must be numbers')
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('lat/lng out of range')
+    if not 0 < radius_km <= settings.PRODUCTS_NEARBY_MAX_RADIUS_KM:
+        raise ValueError(f'radius_km must be between 0 and {settings.PRODUCTS_NEARBY_MAX_RADIUS_KM}')
+    return round(latitude, 6), round(longitude, 6), radius_km
+
+
+def filter_nearby(products, latitude, longitude, radius_km):
+    """Keep products whose seller is within the radius, annotated with ``distance_km``.
+
+    The seller prefilter is a subquery on the geohash index and the exact
+    cut a SQL distance over the joined seller's coordinates, so the query
+    stays the same size however many sellers are in range.
+    """
+    sellers = get_user_model().objects.filter(
+        geo.nearby_filter(latitude, longitude, radius_km), user_type='smart_seller'
+    )
+    return products.filter(seller_id__in=sellers.values('id')).annotate(
+        distance_km=geo.distance_expression(latitude, longitude, prefix='seller__')
+    ).filter(distance_km__lte=radius_km)
 
 
 @api_view(['GET'])
@@ -20,14 +79,19 @@ def get_seller_products(request):
     #         'message': 'Only sellers can access this endpoint'
     #     }, status=status.HTTP_403_FORBIDDEN)
     
-    products = Product.objects.filter(seller=request.user).prefetch_related('images')
-    serializer = ProductListSerializer(products, many=True)
-    
-    return Response({
+    products = Product.objects.filter(seller=request.user)
+
+    # Answer repeat polls with 304 before loading or serializing anything
+    etag, total_products = catalog_validators(products, 'seller-products')
+    not_modified = get_not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    return add_validators(Response({
         'success': True,
-        'total_products': products.count(),
-        'products': serializer.data
-    })
+        'total_products': total_products,
+        'products': serialize_product_list(products)
+    }), etag)
 
 
 @api_view(['POST'])
@@ -56,6 +120,56 @@ def add_product(request):
     }, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_import_products(request):
+    """Create many products from a streamed CSV or NDJSON request body.
+
+    Rows are validated like ``add_product`` and inserted in chunks; the
+    response reports which rows (by line number) were rejected and why.
+    """
+    data_format = bulk.detect_format(request.query_params.get('data_format'), request.content_type)
+    if data_format is None:
+        return Response({
+            'success': False,
+            'message': 'Send a text/csv or application/x-ndjson body, or set data_format=csv|ndjson'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    summary = bulk.import_products(request.user, bulk.iter_rows(request.stream, data_format))
+
+    if summary['aborted'] or not summary['created']:
+        return Response({
+            'success': False,
+            'message': summary['aborted'] or 'No products were imported',
+            **summary
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'success': summary['failed'] == 0,
+        'message': f"{summary['created']} products imported",
+        **summary
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_seller_products(request):
+    """Stream the seller's whole catalog as CSV or NDJSON"""
+    data_format = request.query_params.get('data_format', 'csv')
+    if data_format not in bulk.FORMATS:
+        return Response({
+            'success': False,
+            'message': 'data_format must be csv or ndjson'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(
+        bulk.export_products(Product.objects.filter(seller=request.user), data_format),
+        content_type=bulk.CONTENT_TYPES[data_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="products.{data_format}"'
+    return response
+
+
 @api_view(['PUT', 'PATCH'])
 @permission_classes([IsAuthenticated])
 def update_product(request, product_id):
@@ -95,39 +209,36 @@ def delete_product(request, product_id):
 @permission_classes([IsAuthenticated])
 def get_products_by_buyer_type(request):
     """Get products grouped by target buyer types"""
-    products = Product.objects.filter(seller=request.user, is_published=True).prefetch_related('images')
-    
-    # Group products by target buyer type
-    mandi_owners = products.filter(target_mandi_owners=True)
-    shopkeepers = products.filter(target_shopkeepers=True)
-    communities = products.filter(target_communities=True)
-    
-    # Products targeting all buyers (all three types selected)
-    all_buyers = products.filter(
-        target_mandi_owners=True,
-        target_shopkeepers=True,
-        target_communities=True
-    )
-    
+    # Load the seller's published products (and their images) once, then
+    # group them in memory instead of re-querying per buyer type
+    products = list(product_list_values(Product.objects.filter(seller=request.user, is_published=True)))
+    serialized = serialize_product_rows(products)
+
+    groups = {
+        'all_buyers': [],
+        'mandi_owners': [],
+        'shopkeepers': [],
+        'communities': [],
+    }
+    for product, data in zip(products, serialized):
+        if product['target_mandi_owners']:
+            groups['mandi_owners'].append(data)
+        if product['target_shopkeepers']:
+            groups['shopkeepers'].append(data)
+        if product['target_communities']:
+            groups['communities'].append(data)
+        # Products targeting all buyers (all three types selected)
+        if product['target_mandi_owners'] and product['target_shopkeepers'] and product['target_communities']:
+            groups['all_buyers'].append(data)
+
     return Response({
         'success': True,
         'products_by_buyer_type': {
-            'all_buyers': {
-                'count': all_buyers.count(),
-                'products': ProductListSerializer(all_buyers, many=True).data
-            },
-            'mandi_owners': {
-                'count': mandi_owners.count(),
-                'products': ProductListSerializer(mandi_owners, many=True).data
-            },
-            'shopkeepers': {
-                'count': shopkeepers.count(),
-                'products': ProductListSerializer(shopkeepers, many=True).data
-            },
-            'communities': {
-                'count': communities.count(),
-                'products': ProductListSerializer(communities, many=True).data
+            group: {
+                'count': len(items),
+                'products': items
             }
+            for group, items in groups.items()
         }
     })
 
@@ -136,17 +247,21 @@ def get_products_by_buyer_type(request):
 @permission_classes([IsAuthenticated])
 def get_product_detail(request, product_id):
     """Get detailed information about a specific product"""
-    product = get_object_or_404(
-        Product.objects.prefetch_related('images'),
-        id=product_id,
-        seller=request.user
-    )
+    products = Product.objects.filter(id=product_id, seller=request.user)
+
+    etag, rows = catalog_validators(products, 'product-detail')
+    if rows:
+        not_modified = get_not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+    product = get_object_or_404(products.select_related('seller').prefetch_related('images'))
     
     serializer = ProductListSerializer(product)
-    return Response({
+    return add_validators(Response({
         'success': True,
         'product': serializer.data
-    })
+    }), etag)
 
 
 @api_view(['POST'])
@@ -172,7 +287,8 @@ def add_product_images(request, product_id):
         created_images.append({
             'id': product_image.id,
             'image': product_image.image.url,
-            'caption': product_image.caption
+            'caption': product_image.caption,
+            'processing_status': product_image.processing_status
         })
     
     return Response({
@@ -213,6 +329,33 @@ def get_available_products_for_buyer(request):
             'message': 'Buyer category not set for this user'
         }, status=status.HTTP_400_BAD_REQUEST)
     
+    # "Near me" mode: products from sellers within radius_km, nearest first
+    params = request.GET
+    origin = None
+    if params.get('near_me') or 'radius_km' in params:
+        try:
+            origin = get_nearby_origin(request)
+        except ValueError as exc:
+            return Response({
+                'success': False,
+                'message': str(exc)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        # Key the cache on the resolved origin, which may come from the profile
+        params = params.copy()
+        params['lat'], params['lng'], params['radius_km'] = (str(value) for value in origin)
+
+    # Listings only depend on the buyer category and filters, so repeat
+    # requests are answered from the versioned response cache
+    buyer_category = request.user.buyer_category
+    cache_key = listing_cache.make_listing_key(buyer_category, params)
+    cached = listing_cache.get_listing(cache_key)
+    if cached is not None:
+        etag = cached['etag']
+        not_modified = get_not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        return add_validators(Response(cached['data'], headers={'X-Cache': 'HIT'}), etag)
+
     # Get query parameters for filtering
     search = request.GET.get('search', '')
     unit = request.GET.get('unit', '')
@@ -221,10 +364,9 @@ def get_available_products_for_buyer(request):
     min_quantity = request.GET.get('min_quantity')
     
     # Base queryset - only published products
-    products = Product.objects.filter(is_published=True, quantity_available__gt=0).prefetch_related('images')
+    products = Product.objects.filter(is_published=True, quantity_available__gt=0)
     
     # Filter based on buyer category
-    buyer_category = request.user.buyer_category
     if buyer_category == 'mandi_owner':
         products = products.filter(target_mandi_owners=True)
     elif buyer_category == 'shopkeeper':
@@ -234,11 +376,7 @@ def get_available_products_for_buyer(request):
     
     # Apply additional filters
     if search:
-        products = products.filter(
-            Q(name__icontains=search) | 
-            Q(variety__icontains=search) | 
-            Q(description__icontains=search)
-        )
+        products = product_search.filter_products(products, search)
     
     if unit:
         products = products.filter(unit__iexact=unit)
@@ -264,21 +402,28 @@ def get_available_products_for_buyer(request):
         except (ValueError, TypeError):
             pass
     
-    # Order by creation date (newest first)
-    products = products.order_by('-created_at')
-    
-    # Serialize the data
-    serializer = ProductListSerializer(products, many=True)
-    
-    # Get available units for filtering
-    available_units = products.values_list('unit', flat=True).distinct()
-    
-    return Response({
+    if origin is not None:
+        products = filter_nearby(products, *origin)
+
+    # Validators cover the whole filtered set, so a 304 skips facets,
+    # pagination and serialization entirely. The near-me origin and radius
+    # are part of the normalized filters
+    etag, _ = catalog_validators(
+        products, 'available-products', buyer_category, listing_cache.normalize_filters(params)
+    )
+    not_modified = get_not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    # Count and unit facets come from a single GROUP BY over the filtered set
+    total_products, available_units = get_listing_facets(products)
+
+    response_data = {
         'success': True,
         'buyer_category': buyer_category,
         'buyer_category_display': dict(request.user.BUYER_CATEGORY_CHOICES).get(buyer_category),
-        'total_products': products.count(),
-        'available_units': list(available_units),
+        'total_products': total_products,
+        'available_units': available_units,
         'filters_applied': {
             'search': search,
             'unit': unit,
@@ -286,7 +431,73 @@ def get_available_products_for_buyer(request):
             'max_price': max_price,
             'min_quantity': min_quantity
         },
-        'products': serializer.data
+    }
+
+    if origin is not None:
+        latitude, longitude, radius_km = origin
+        response_data['filters_applied']['near_me'] = {
+            'lat': latitude,
+            'lng': longitude,
+            'radius_km': radius_km
+        }
+        # Near-me results have no cursor: the nearest page_size products are
+        # returned and total_products tells the client to narrow the search
+        page_size = get_page_size(request.GET.get('page_size'))
+        products = list(product_list_values(
+            products.order_by('distance_km', '-created_at', 'id')[:page_size], 'distance_km'
+        ))
+        serialized = serialize_product_rows(products)
+        for product, item in zip(products, serialized):
+            item['distance_km'] = round(product['distance_km'], 3)
+        response_data['products'] = serialized
+        response_data['pagination'] = {
+            'page_size': page_size,
+            'next_cursor': None,
+            'has_more': total_products > len(products)
+        }
+        listing_cache.set_listing(cache_key, response_data, etag)
+        return add_validators(Response(response_data, headers={'X-Cache': 'MISS'}), etag)
+
+    # Cursor mode: keyset pagination on (-created_at, id)
+    cursor = request.GET.get('cursor')
+    if cursor is not None or request.GET.get('page_size'):
+        try:
+            page, next_cursor = paginate_products(
+                product_list_values(products), cursor, request.GET.get('page_size')
+            )
+        except InvalidCursor:
+            return Response({
+                'success': False,
+                'message': 'Invalid cursor'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        response_data['pagination'] = {
+            'page_size': get_page_size(request.GET.get('page_size')),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }
+        response_data['products'] = serialize_product_rows(page)
+        listing_cache.set_listing(cache_key, response_data, etag)
+        return add_validators(Response(response_data, headers={'X-Cache': 'MISS'}), etag)
+
+    # Rank search results by relevance, otherwise newest first
+    if search:
+        products = product_search.order_by_rank(products, search)
+    else:
+        products = products.order_by('-created_at')
+    response_data['products'] = serialize_product_list(products)
+    listing_cache.set_listing(cache_key, response_data, etag)
+
+    return add_validators(Response(response_data, headers={'X-Cache': 'MISS'}), etag)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_listing_cache_stats(request):
+    """Hit/miss counters of the buyer listing response cache (staff only)"""
+    return Response({
+        'success': True,
+        'cache': listing_cache.get_cache_stats()
     })
 
 
@@ -308,7 +519,7 @@ def get_product_detail_for_buyer(request, product_id):
     
     # Get the product
     try:
-        product = Product.objects.prefetch_related('images').get(
+        product = Product.objects.select_related('seller').get(
             id=product_id,
             is_published=True,
             quantity_available__gt=0
@@ -336,11 +547,19 @@ def get_product_detail_for_buyer(request, product_id):
             'message': f'This product is not available for {dict(request.user.BUYER_CATEGORY_CHOICES).get(buyer_category, "your buyer type")}'
         }, status=status.HTTP_403_FORBIDDEN)
     
+    etag, _ = catalog_validators(
+        Product.objects.filter(pk=product.pk), 'product-detail-for-buyer', buyer_category
+    )
+    not_modified = get_not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    prefetch_related_objects([product], 'images')
     serializer = ProductListSerializer(product)
     
-    return Response({
+    return add_validators(Response({
         'success': True,
         'can_purchase': can_purchase,
         'buyer_category': buyer_category,
         'product': serializer.data
-    })
+    }), etag)
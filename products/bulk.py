@@ -0,0 +1,162 @@
+"""Bulk product import and streaming export.
+
+Imports read a CSV or NDJSON request body line by line, validate rows with
+``ProductCreateSerializer`` in chunks and insert each chunk's valid rows with
+one ``bulk_create`` inside its own transaction. Exports are generators over a
+chunked ``iterator()`` so a seller's whole catalog never sits in memory.
+"""
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers
+
+from kissanmart.streaming import CONTENT_TYPES, FORMATS, stream_rows  # noqa: F401 - CONTENT_TYPES used by the views
+from . import listing_cache
+from . import search
+from .models import Product
+
+
+EXPORT_FIELDS = [
+    'id', 'name', 'variety', 'description', 'quantity_available', 'unit',
+    'price_per_unit', 'min_order_quantity', 'target_mandi_owners',
+    'target_shopkeepers', 'target_communities', 'is_published',
+    'created_at', 'updated_at',
+]
+# Rows written per streamed chunk of an export
+FLUSH_ROWS = 200
+
+
+class ImportFormatError(ValueError):
+    """Raised when the request body cannot be read as the declared format"""
+
+
+def detect_format(requested, content_type):
+    """Pick csv/ndjson from an explicit parameter or the Content-Type header"""
+    if requested:
+        return requested if requested in FORMATS else None
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type in ('text/csv', 'application/csv'):
+        return 'csv'
+    if content_type in ('application/x-ndjson', 'application/jsonl', 'application/json-lines'):
+        return 'ndjson'
+    return None
+
+
+def decode_lines(stream):
+    """Yield the text lines of a UTF-8 byte stream, reporting where decoding fails"""
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+    line_number = 0
+    while True:
+        try:
+            line = next(lines)
+        except StopIteration:
+            return
+        except UnicodeDecodeError:
+            raise ImportFormatError(f'Line {line_number + 1} is not valid UTF-8')
+        line_number += 1
+        yield line
+
+
+def iter_rows(stream, data_format):
+    """Yield ``(line_number, row_dict)`` pairs from a byte stream"""
+    if stream is None:
+        return
+    lines = decode_lines(stream)
+    if data_format == 'csv':
+        reader = csv.DictReader(lines)
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as exc:
+                raise ImportFormatError(f'Line {reader.line_num} is not valid CSV: {exc}')
+            # Empty cells mean "not provided" so optional fields fall back to defaults
+            yield reader.line_num, {key: value for key, value in row.items() if key and value != ''}
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            raise ImportFormatError(f'Line {line_number} is not valid JSON')
+        if not isinstance(row, dict):
+            raise ImportFormatError(f'Line {line_number} is not a JSON object')
+        yield line_number, row
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_products(seller, rows, chunk_size=None, max_rows=None):
+    """Validate and insert ``rows`` for ``seller``; return a summary dict"""
+    from .api.serializers import ProductCreateSerializer
+
+    chunk_size = chunk_size or getattr(settings, 'PRODUCT_IMPORT_CHUNK_SIZE', 500)
+    max_rows = max_rows or getattr(settings, 'PRODUCT_IMPORT_MAX_ROWS', 10000)
+
+    # One serializer instance validates every row, as ListSerializer does
+    validator = ProductCreateSerializer()
+    created = 0
+    seen = 0
+    errors = []
+
+    aborted = None
+
+    try:
+        for chunk in chunked(rows, chunk_size):
+            if seen + len(chunk) > max_rows:
+                raise ImportFormatError(f'Imports are limited to {max_rows} rows')
+            seen += len(chunk)
+
+            products = []
+            for line_number, row in chunk:
+                try:
+                    data = validator.run_validation(row)
+                except serializers.ValidationError as exc:
+                    errors.append({'row': line_number, 'errors': exc.detail})
+                    continue
+                data.pop('images', None)
+                products.append(Product(seller=seller, **data))
+
+            if products:
+                with transaction.atomic():
+                    Product.objects.bulk_create(products)
+                    # bulk_create skips the post_save signal, so index here
+                    search.index_products(products)
+                created += len(products)
+    except ImportFormatError as exc:
+        # Chunks committed before the bad input are kept and reported
+        aborted = str(exc)
+
+    if created:
+        listing_cache.bump_catalog_version()
+
+    return {
+        'total_rows': seen,
+        'created': created,
+        'failed': len(errors),
+        'errors': errors,
+        'aborted': aborted,
+    }
+
+
+def export_products(queryset, data_format, chunk_size=2000):
+    """Yield the rows of ``queryset`` encoded as CSV or NDJSON text.
+
+    Output is flushed every ``FLUSH_ROWS`` rows to keep the number of
+    response chunks (and their overhead) low while memory stays flat.
+    """
+    rows = queryset.order_by('-created_at').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    return stream_rows(rows, EXPORT_FIELDS, data_format, FLUSH_ROWS)
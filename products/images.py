@@ -0,0 +1,147 @@
+"""Off-request rendition pipeline for product images.
+
+Uploads are stored as-is and answered immediately; a fixed set of renditions
+(thumbnail, card, full) in WebP and JPEG is generated afterwards by a worker.
+By default the worker is an in-process thread pool; ``PRODUCT_IMAGE_PIPELINE``
+can instead name ``'sync'`` (process inline, used by scripts and tests) or the
+dotted path of a callable taking a ProductImage id, e.g. a task-queue hook.
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels for each rendition
+RENDITIONS = {
+    'thumbnail': (160, 160),
+    'card': (400, 400),
+    'full': (800, 800),
+}
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': True},
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'PRODUCT_IMAGE_WORKERS', 2),
+                thread_name_prefix='product-images',
+            )
+        return _executor
+
+
+def rendition_name(image_name, rendition, fmt):
+    base, _ = os.path.splitext(image_name)
+    return f'{base}_{rendition}.{fmt}'
+
+
+def render(source, max_size, fmt):
+    """Return ``(bytes, width, height)`` of ``source`` fitted inside ``max_size``"""
+    from PIL import Image
+
+    img = source.copy()
+    img.thumbnail(max_size, Image.Resampling.LANCZOS)
+    if fmt == 'jpeg' and img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    options = dict(FORMATS[fmt])
+    buffer = io.BytesIO()
+    img.save(buffer, **options)
+    return buffer.getvalue(), img.size[0], img.size[1]
+
+
+def generate_renditions(image_id):
+    """Build and store every rendition for one ProductImage.
+
+    Returns the renditions mapping, which is empty when processing failed.
+    """
+    from PIL import Image, ImageOps
+    from . import listing_cache
+    from .models import ProductImage
+
+    product_image = ProductImage.objects.filter(pk=image_id).first()
+    if product_image is None or not product_image.image:
+        return {}
+
+    try:
+        with default_storage.open(product_image.image.name, 'rb') as fh:
+            with Image.open(fh) as opened:
+                # Respect camera orientation before resizing
+                source = ImageOps.exif_transpose(opened)
+                source.load()
+
+        renditions = {}
+        for rendition, max_size in RENDITIONS.items():
+            entry = {}
+            for fmt in FORMATS:
+                data, width, height = render(source, max_size, fmt)
+                name = rendition_name(product_image.image.name, rendition, fmt)
+                if default_storage.exists(name):
+                    default_storage.delete(name)
+                entry[fmt] = default_storage.save(name, ContentFile(data))
+                entry['width'], entry['height'] = width, height
+            renditions[rendition] = entry
+        status = ProductImage.STATUS_READY
+    except Exception:
+        logger.exception('Failed to generate renditions for product image %s', image_id)
+        renditions = {}
+        status = ProductImage.STATUS_FAILED
+
+    # update() rather than save() so finishing a job never re-enqueues it
+    ProductImage.objects.filter(pk=image_id).update(renditions=renditions, processing_status=status)
+    listing_cache.bump_catalog_version()
+    return renditions
+
+
+def _run_in_worker(image_id):
+    try:
+        generate_renditions(image_id)
+    finally:
+        # Each worker thread opened its own DB connection
+        connections.close_all()
+
+
+def dispatch(image_id):
+    pipeline = getattr(settings, 'PRODUCT_IMAGE_PIPELINE', 'thread')
+    if pipeline == 'sync':
+        generate_renditions(image_id)
+    elif pipeline == 'thread':
+        get_executor().submit(_run_in_worker, image_id)
+    else:
+        import_string(pipeline)(image_id)
+
+
+def enqueue_renditions(image_id):
+    """Schedule rendition generation once the upload's row is committed"""
+    transaction.on_commit(lambda: dispatch(image_id))
+
+
+def delete_rendition_files(renditions):
+    for entry in (renditions or {}).values():
+        for fmt in FORMATS:
+            name = entry.get(fmt)
+            if name:
+                default_storage.delete(name)
+
+
+def delete_files(names):
+    """Remove stored files in one pass; return how many were asked for"""
+    for name in names:
+        default_storage.delete(name)
+    return len(names)
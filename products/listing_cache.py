@@ -0,0 +1,100 @@
+"""Versioned response cache for the buyer product listing.
+
+Listing responses only depend on the buyer category and the filter
+parameters, so they are cached under a key built from those plus a global
+catalog version. Any Product or ProductImage write bumps the version (see
+``products.signals``), which makes every older entry unreachable at once;
+stale entries then age out through the cache's TIMEOUT / LRU eviction.
+"""
+import hashlib
+import json
+import time
+
+from django.core.cache import caches
+
+
+CACHE_ALIAS = 'product_listings'
+VERSION_KEY = 'products:catalog_version'
+HITS_KEY = 'products:listing_cache:hits'
+MISSES_KEY = 'products:listing_cache:misses'
+
+# Query parameters that change the listing; anything else (cache busters,
+# tracking params) is ignored when building the key
+LISTING_PARAMS = (
+    'search', 'unit', 'min_price', 'max_price', 'min_quantity', 'cursor', 'page_size',
+    'near_me', 'lat', 'lng', 'radius_km',
+)
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def get_catalog_version():
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed from the clock rather than 1 so a counter that was evicted can
+        # never come back to a value older entries were stored under
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    cache = get_cache()
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(VERSION_KEY, version, timeout=None)
+        return version
+
+
+def normalize_filters(params):
+    """Return the listing-relevant query params as a stable sorted tuple"""
+    # Presence matters even for empty values: ``?cursor=`` selects cursor mode
+    return tuple((name, params.get(name)) for name in LISTING_PARAMS if name in params)
+
+
+def make_listing_key(buyer_category, params):
+    payload = json.dumps([buyer_category, normalize_filters(params)], separators=(',', ':'))
+    digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    return f'products:listing:{get_catalog_version()}:{digest}'
+
+
+def _count(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_listing(key):
+    """Return the cached entry for ``key`` or None, recording hit/miss.
+
+    Entries are dicts holding the response body (``data``) together with the
+    ``etag`` it was served with.
+    """
+    data = get_cache().get(key)
+    _count(MISSES_KEY if data is None else HITS_KEY)
+    return data
+
+
+def set_listing(key, data, etag=None):
+    get_cache().set(key, {'data': data, 'etag': etag})
+
+
+def get_cache_stats():
+    cache = get_cache()
+    hits = cache.get(HITS_KEY) or 0
+    misses = cache.get(MISSES_KEY) or 0
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+        'catalog_version': get_catalog_version(),
+    }
@@ -0,0 +1,73 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from products.api.serializers import ProductListSerializer, serialize_product_list
+from products.models import Product, ProductImage
+
+
+RENDITIONS = {
+    'thumbnail': {'width': 200, 'height': 150, 'webp': 'renditions/t.webp', 'jpeg': 'renditions/t.jpg'},
+    'card': {'width': 600, 'height': 450, 'webp': 'renditions/c.webp', 'jpeg': 'renditions/c.jpg'},
+}
+
+
+class Command(BaseCommand):
+    help = ('Compare ProductListSerializer with the values()-based listing serializer on generated products. '
+            'The rows are created in a transaction that is rolled back afterwards')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per size to take the best time from')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"rows":>8} {"serializer ms":>14} {"lean ms":>10} {"speedup":>8}')
+        with transaction.atomic():
+            seller = get_user_model().objects.create(
+                mobile_number='9999900000', full_name='Benchmark seller', user_type='smart_seller'
+            )
+            created = 0
+            for size in sorted(options['sizes']):
+                self.add_products(seller, created, size - created)
+                created = max(created, size)
+                queryset = Product.objects.filter(seller=seller).order_by('-created_at', 'id')[:size]
+                full, full_body = self.best(options['repeat'], lambda: ProductListSerializer(
+                    queryset.select_related('seller').prefetch_related('images'), many=True
+                ).data)
+                lean, lean_body = self.best(options['repeat'], lambda: serialize_product_list(queryset))
+                if full_body != lean_body:
+                    raise CommandError(f'Lean output differs from ProductListSerializer at {size} rows')
+                self.stdout.write(f'{size:>8} {full * 1000:>14.1f} {lean * 1000:>10.1f} {full / lean:>7.1f}x')
+            transaction.set_rollback(True)
+
+    def add_products(self, seller, start, count):
+        if count <= 0:
+            return
+        products = Product.objects.bulk_create([
+            Product(
+                seller=seller, name=f'Wheat {i}', variety='Sharbati' if i % 2 else None,
+                description='Sharbati wheat', quantity_available=100 + i, price_per_unit='30.50',
+                min_order_quantity=5 if i % 3 else None, unit='QUINTAL',
+                target_mandi_owners=bool(i % 2), target_shopkeepers=True, target_communities=bool(i % 3)
+            )
+            for i in range(start, start + count)
+        ])
+        ProductImage.objects.bulk_create([
+            ProductImage(
+                product=product, image=f'product_images/w{product.pk}-{n}.jpg',
+                renditions=RENDITIONS if n == 0 else {}
+            )
+            for product in products for n in range(2)
+        ])
+
+    def best(self, repeat, serialize):
+        """Best wall time of fetching, serializing and rendering, with the rendered body"""
+        timings = []
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            body = JSONRenderer().render(serialize())
+            timings.append(time.perf_counter() - started)
+        return min(timings), body
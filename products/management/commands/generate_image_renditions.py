@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from products.images import generate_renditions
+from products.models import ProductImage
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail/card/full renditions for product images that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate renditions for every image')
+        parser.add_argument('--failed', action='store_true', help='Retry images whose processing failed')
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.all()
+        if not options['all']:
+            statuses = [ProductImage.STATUS_PENDING]
+            if options['failed']:
+                statuses.append(ProductImage.STATUS_FAILED)
+            images = images.filter(processing_status__in=statuses)
+
+        processed = failed = 0
+        for image_id in images.values_list('id', flat=True).iterator():
+            # An empty result means the image was missing or could not be decoded
+            if generate_renditions(image_id):
+                processed += 1
+            else:
+                failed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Generated renditions for {processed} images ({failed} failed)'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from products.search import get_search_vendor, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product full-text search index from the products table'
+
+    def handle(self, *args, **options):
+        vendor = get_search_vendor()
+        if vendor is None:
+            self.stdout.write(self.style.WARNING('No full-text index for this database backend; nothing to do'))
+            return
+        count = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {vendor} search index for {count} products'))
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    from products.search import create_search_index, rebuild_search_index
+    create_search_index(schema_editor.connection)
+    # The FTS5 table starts empty; the Postgres GIN index is built on creation
+    if schema_editor.connection.vendor == 'sqlite':
+        rebuild_search_index(schema_editor.connection)
+
+
+def drop_index(apps, schema_editor):
+    from products.search import drop_search_index
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_remove_product_available_quantity_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
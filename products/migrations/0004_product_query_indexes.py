@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['seller', '-created_at'], name='product_seller_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['seller', '-created_at'], name='product_seller_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_published', True), ('quantity_available__gt', 0), ('target_mandi_owners', True)), fields=['-created_at', 'id'], name='product_mandi_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_published', True), ('quantity_available__gt', 0), ('target_shopkeepers', True)), fields=['-created_at', 'id'], name='product_shop_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_published', True), ('quantity_available__gt', 0), ('target_communities', True)), fields=['-created_at', 'id'], name='product_community_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_published', True), ('quantity_available__gt', 0)), fields=['price_per_unit', '-created_at'], name='product_listing_price_idx'),
+        ),
+    ]
@@ -1,6 +1,5 @@
 from django.db import models
 from django.contrib.auth import get_user_model
-from PIL import Image
 
 # Get the custom user model (or default User if not customized)
 User = get_user_model()
@@ -30,6 +29,27 @@ class Category(models.Model):
         return self.name
 
 
+# Shared with the values()-based listing serializer, which has no instances
+def product_status(is_published, quantity_available):
+    if not is_published:
+        return 'inactive'
+    elif quantity_available <= 0:
+        return 'sold_out'
+    else:
+        return 'available'
+
+
+def target_buyers_display(target_mandi_owners, target_shopkeepers, target_communities):
+    targets = []
+    if target_mandi_owners:
+        targets.append('Mandi Owners')
+    if target_shopkeepers:
+        targets.append('Shopkeepers')
+    if target_communities:
+        targets.append('Communities')
+    return ', '.join(targets) if targets else 'All Buyers'
+
+
 class Product(models.Model):
     """
     Main model for a seller's produce listing.
@@ -60,6 +80,38 @@ class Product(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Seller dashboards: a seller's listings, newest first
+            models.Index(fields=['seller', '-created_at'], name='product_seller_created_idx'),
+            models.Index(
+                fields=['seller', '-created_at'],
+                condition=models.Q(is_published=True),
+                name='product_seller_pub_idx',
+            ),
+            # Buyer catalog: one partial index per buyer category, matching the
+            # listing predicate and its (-created_at, id) ordering
+            models.Index(
+                fields=['-created_at', 'id'],
+                condition=models.Q(is_published=True, quantity_available__gt=0, target_mandi_owners=True),
+                name='product_mandi_listing_idx',
+            ),
+            models.Index(
+                fields=['-created_at', 'id'],
+                condition=models.Q(is_published=True, quantity_available__gt=0, target_shopkeepers=True),
+                name='product_shop_listing_idx',
+            ),
+            models.Index(
+                fields=['-created_at', 'id'],
+                condition=models.Q(is_published=True, quantity_available__gt=0, target_communities=True),
+                name='product_community_listing_idx',
+            ),
+            # Price range filters within the published catalog
+            models.Index(
+                fields=['price_per_unit', '-created_at'],
+                condition=models.Q(is_published=True, quantity_available__gt=0),
+                name='product_listing_price_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.seller.username})"
@@ -72,33 +124,36 @@ class Product(models.Model):
     @property
     def status(self):
         """Determine product status based on availability"""
-        if not self.is_published:
-            return 'inactive'
-        elif self.quantity_available <= 0:
-            return 'sold_out'
-        else:
-            return 'available'
+        return product_status(self.is_published, self.quantity_available)
 
     @property
     def target_buyers_display(self):
         """Get display string for target buyers"""
-        targets = []
-        if self.target_mandi_owners:
-            targets.append('Mandi Owners')
-        if self.target_shopkeepers:
-            targets.append('Shopkeepers')
-        if self.target_communities:
-            targets.append('Communities')
-        return ', '.join(targets) if targets else 'All Buyers'
+        return target_buyers_display(self.target_mandi_owners, self.target_shopkeepers, self.target_communities)
     
 
 class ProductImage(models.Model):
     """
     Model to handle multiple images for a product.
+
+    The uploaded original is kept untouched; resized renditions are generated
+    off-request by ``products.images`` and recorded in ``renditions`` as
+    ``{name: {'width', 'height', 'webp', 'jpeg'}}`` (storage file names).
     """
+    STATUS_PENDING = 'pending'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    PROCESSING_STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_READY, 'Ready'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='product_images/%Y/%m/%d/')
     caption = models.CharField(max_length=255, blank=True)
+    renditions = models.JSONField(default=dict, blank=True)
+    processing_status = models.CharField(max_length=10, choices=PROCESSING_STATUS_CHOICES, default=STATUS_PENDING)
     
     class Meta:
         verbose_name_plural = "Product Images"
@@ -109,16 +164,7 @@ class ProductImage(models.Model):
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
         
-        # Resize image if it exists
-        if self.image:
-            self.resize_image(self.image.path)
-
-    def resize_image(self, image_path, max_size=(800, 800)):
-        """Resize image to optimize storage"""
-        try:
-            with Image.open(image_path) as img:
-                if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-                    img.thumbnail(max_size, Image.Resampling.LANCZOS)
-                    img.save(image_path, optimize=True, quality=85)
-        except Exception as e:
-            print(f"Error resizing image: {e}")
+        # Generate renditions in the background once the upload is committed
+        if self.image and self.processing_status == self.STATUS_PENDING:
+            from .images import enqueue_renditions
+            enqueue_renditions(self.pk)
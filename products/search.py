@@ -0,0 +1,179 @@
+"""Full-text search over product listings.
+
+SQLite keeps a FTS5 shadow table (``products_product_fts``) that is updated
+from the Product signals. PostgreSQL uses a GIN index on a ``to_tsvector``
+expression over the same columns, which the database maintains itself. Any
+other backend falls back to the old ``icontains`` scan.
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+
+FTS_TABLE = 'products_product_fts'
+PG_INDEX_NAME = 'products_product_search_gin'
+PG_DOCUMENT = (
+    "to_tsvector('simple', coalesce(\"products_product\".\"name\", '') || ' ' || "
+    "coalesce(\"products_product\".\"variety\", '') || ' ' || "
+    "coalesce(\"products_product\".\"description\", ''))"
+)
+# Same expression without table qualification, as stored in the index
+PG_INDEX_DOCUMENT = (
+    "to_tsvector('simple', coalesce(name, '') || ' ' || "
+    "coalesce(variety, '') || ' ' || coalesce(description, ''))"
+)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def get_search_vendor(conn=None):
+    """Return 'sqlite', 'postgresql' or None when no index is available"""
+    vendor = (conn or connection).vendor
+    return vendor if vendor in ('sqlite', 'postgresql') else None
+
+
+def tokenize(term):
+    return [token.lower() for token in TOKEN_RE.findall(term or '')]
+
+
+def build_match_query(term, vendor):
+    """Turn free text into a prefix query for the backend's query syntax.
+
+    User input is never passed through verbatim: each word is quoted (FTS5)
+    or reduced to word characters (tsquery) so operators cannot be injected.
+    """
+    tokens = tokenize(term)
+    if not tokens:
+        return None
+    if vendor == 'sqlite':
+        return ' '.join(f'"{token}"*' for token in tokens)
+    return ' & '.join(f'{token}:*' for token in tokens)
+
+
+def filter_products(queryset, term):
+    """Restrict ``queryset`` to products matching ``term``"""
+    vendor = get_search_vendor()
+    if vendor is None:
+        return queryset.filter(
+            Q(name__icontains=term) |
+            Q(variety__icontains=term) |
+            Q(description__icontains=term)
+        )
+
+    query = build_match_query(term, vendor)
+    if query is None:
+        return queryset.none()
+
+    if vendor == 'sqlite':
+        condition = RawSQL(
+            f'"products_product"."id" IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)',
+            [query],
+            output_field=BooleanField(),
+        )
+    else:
+        condition = RawSQL(
+            f"{PG_DOCUMENT} @@ to_tsquery('simple', %s)",
+            [query],
+            output_field=BooleanField(),
+        )
+    return queryset.filter(condition)
+
+
+def order_by_rank(queryset, term):
+    """Order an already filtered queryset by relevance, best match first"""
+    vendor = get_search_vendor()
+    query = build_match_query(term, vendor) if vendor else None
+    if query is None:
+        return queryset.order_by('-created_at')
+
+    if vendor == 'sqlite':
+        # FTS5's bm25 rank is negative; flip it so higher means better
+        rank = RawSQL(
+            f'SELECT -rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'AND rowid = "products_product"."id"',
+            [query],
+            output_field=FloatField(),
+        )
+    else:
+        rank = RawSQL(
+            f"ts_rank({PG_DOCUMENT}, to_tsquery('simple', %s))",
+            [query],
+            output_field=FloatField(),
+        )
+    return queryset.annotate(search_rank=rank).order_by('-search_rank', '-created_at')
+
+
+def index_product(product):
+    """Insert or refresh one product in the FTS5 table"""
+    if get_search_vendor() != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, variety, description) VALUES (%s, %s, %s, %s)',
+            [product.pk, product.name, product.variety or '', product.description or ''],
+        )
+
+
+def index_products(products):
+    """Add many freshly created products to the FTS5 table in one statement"""
+    if get_search_vendor() != 'sqlite' or not products:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, variety, description) VALUES (%s, %s, %s, %s)',
+            [(product.pk, product.name, product.variety or '', product.description or '') for product in products],
+        )
+
+
+def unindex_product(product_id):
+    """Remove one product from the FTS5 table"""
+    if get_search_vendor() != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product_id])
+
+
+def create_search_index(conn):
+    """Create the backend's search structure (used by the migration)"""
+    vendor = get_search_vendor(conn)
+    with conn.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+                f"USING fts5(name, variety, description, tokenize = 'unicode61')"
+            )
+        elif vendor == 'postgresql':
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {PG_INDEX_NAME} '
+                f'ON products_product USING GIN (({PG_INDEX_DOCUMENT}))'
+            )
+
+
+def drop_search_index(conn):
+    vendor = get_search_vendor(conn)
+    with conn.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        elif vendor == 'postgresql':
+            cursor.execute(f'DROP INDEX IF EXISTS {PG_INDEX_NAME}')
+
+
+def rebuild_search_index(conn=None):
+    """Rebuild the whole index with set-based SQL and return the row count"""
+    conn = conn or connection
+    vendor = get_search_vendor(conn)
+    with conn.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, variety, description) '
+                f"SELECT id, name, coalesce(variety, ''), coalesce(description, '') FROM products_product"
+            )
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        elif vendor == 'postgresql':
+            cursor.execute(f'REINDEX INDEX {PG_INDEX_NAME}')
+        cursor.execute('SELECT COUNT(*) FROM products_product')
+        return cursor.fetchone()[0]
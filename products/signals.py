@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Product, ProductImage
+from . import images
+from . import listing_cache
+from . import search
+
+
+@receiver(post_save, sender=Product)
+def index_product_on_save(sender, instance, **kwargs):
+    """Keep the full-text index in step with the listing"""
+    search.index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product_on_delete(sender, instance, **kwargs):
+    search.unindex_product(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_listing_cache(sender, **kwargs):
+    """Any catalog write makes previously cached listings unreachable"""
+    listing_cache.bump_catalog_version()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_on_seller_move(sender, instance, update_fields=None, **kwargs):
+    """Seller locations feed the "near me" listing"""
+    if instance.user_type != 'smart_seller':
+        return
+    if update_fields is None or {'latitude', 'longitude'} & set(update_fields):
+        listing_cache.bump_catalog_version()
+
+
+@receiver(post_delete, sender=ProductImage)
+def delete_renditions_on_delete(sender, instance, **kwargs):
+    """Generated renditions are owned by the image row and go with it"""
+    renditions = instance.renditions
+    transaction.on_commit(lambda: images.delete_rendition_files(renditions))
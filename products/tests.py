@@ -1,3 +1,931 @@
-from django.test import TestCase
+import io
+import json
+import re
+import shutil
+import tempfile
+import time
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from kissanmart.nplusone import NPlusOneMixin
+from users import geo
+from users.models import CustomUser
+from .api import urls as product_urls
+from .api.serializers import ProductListSerializer, serialize_product_list
+from . import listing_cache
+from . import search as product_search
+from .models import Product, ProductImage
+
+
+# Tables whose full scans the plan checks reject
+PLAN_CHECKED_TABLES = ('products_product', 'products_productimage')
+
+
+def explain(sql, params):
+    """Return the query plan lines for ``sql`` on the active backend"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN ' + sql, params)
+            return [row[0] for row in cursor.fetchall()]
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def find_full_scans(plan):
+    """Return plan lines that scan a checked table without an index"""
+    tables = '|'.join(PLAN_CHECKED_TABLES)
+    if connection.vendor == 'postgresql':
+        pattern = re.compile(rf'Seq Scan on ({tables})\b')
+    else:
+        pattern = re.compile(rf'^SCAN ({tables})$')
+    return [line for line in plan if pattern.search(line.strip())]
+
+
+class QueryRecorder:
+    """Execute wrapper collecting the raw SQL and params of each query"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def send_scenario(client, name, method, url, data):
+    """Issue one scenario request; return the response and its full body"""
+    if method == 'raw':
+        body, content_type = data
+        response = client.generic('POST', url, body, content_type=content_type)
+    elif method == 'post' and name == 'add-product-images':
+        response = client.post(url, data, format='multipart')
+    elif data is not None and method != 'get':
+        response = getattr(client, method)(url, data, format='json')
+    else:
+        response = getattr(client, method)(url, data)
+    body = b''.join(response.streaming_content) if response.streaming else response.content
+    return response, body
+
+
+def make_image_file(name='photo.jpg'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (32, 32), 'red').save(buffer, format='JPEG')
+    buffer.seek(0)
+    buffer.name = name
+    return buffer
+
+
+class ProductScenarioMixin:
+    """One request scenario per URL in ``products.api.urls``, with its fixtures"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = CustomUser.objects.create(
+            mobile_number='9876500001', full_name='Seller', user_type='smart_seller'
+        )
+        cls.buyer = CustomUser.objects.create(
+            mobile_number='9876500002', full_name='Buyer', user_type='smart_buyer',
+            buyer_category='shopkeeper'
+        )
+        cls.staff = CustomUser.objects.create(
+            mobile_number='9876500003', full_name='Staff', is_staff=True
+        )
+        cls.products = [
+            Product.objects.create(
+                seller=cls.seller, name=f'Tomato {i}', description='Fresh red tomatoes',
+                quantity_available=10 + i, price_per_unit=20 + i, unit='KG',
+                target_shopkeepers=True, target_mandi_owners=bool(i % 2)
+            )
+            for i in range(6)
+        ]
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image=f'product_images/p{product.id}.jpg')
+            for product in cls.products
+        ])
+
+    def scenarios(self):
+        product = self.products[0]
+        image = product.images.first()
+        return {
+            'seller-products': (self.seller, 'get', reverse('seller-products'), None),
+            'add-product': (self.seller, 'post', reverse('add-product'), {
+                'name': 'Onion', 'description': 'Red onion', 'quantity_available': '5',
+                'price_per_unit': '30', 'unit': 'KG', 'target_shopkeepers': True,
+            }),
+            'bulk-import-products': (self.seller, 'raw', reverse('bulk-import-products'), (
+                'name,description,quantity_available,price_per_unit,target_shopkeepers\n'
+                'Garlic,Desi garlic,8,120,true\n', 'text/csv'
+            )),
+            'export-products': (self.seller, 'get', reverse('export-products'), {'data_format': 'ndjson'}),
+            'product-detail': (self.seller, 'get', reverse('product-detail', args=[product.id]), None),
+            'update-product': (self.seller, 'patch', reverse('update-product', args=[product.id]), {
+                'price_per_unit': '25'
+            }),
+            'delete-product': (self.seller, 'delete', reverse('delete-product', args=[self.products[-1].id]), None),
+            'products-by-buyer-type': (self.seller, 'get', reverse('products-by-buyer-type'), None),
+            'add-product-images': (self.seller, 'post', reverse('add-product-images', args=[product.id]), {
+                'images': [make_image_file()]
+            }),
+            'delete-product-image': (self.seller, 'delete', reverse(
+                'delete-product-image', args=[product.id, image.id]), None),
+            'available-products-for-buyer': (self.buyer, 'get', reverse('available-products-for-buyer'), {
+                'min_price': '21', 'max_price': '40'
+            }),
+            'product-detail-for-buyer': (self.buyer, 'get', reverse(
+                'product-detail-for-buyer', args=[product.id]), None),
+            'listing-cache-stats': (self.staff, 'get', reverse('listing-cache-stats'), None),
+        }
+
+
+class ProductQueryPlanTests(ProductScenarioMixin, TestCase):
+    """Run EXPLAIN on every query issued by the product views.
+
+    Each URL in ``products.api.urls`` must have a scenario, so new endpoints
+    cannot slip in without their access path being checked.
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.client = APIClient()
+        # Listing responses must be built from the database to be checked
+        caches[listing_cache.CACHE_ALIAS].clear()
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be sequentially scanned
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def test_every_product_url_has_a_scenario(self):
+        names = {pattern.name for pattern in product_urls.urlpatterns}
+        self.assertEqual(names, set(self.scenarios()))
+
+    def test_no_full_table_scans(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            for name, (user, method, url, data) in self.scenarios().items():
+                with self.subTest(view=name):
+                    self.client.force_authenticate(user)
+                    recorder = QueryRecorder()
+                    with connection.execute_wrapper(recorder):
+                        response, body = send_scenario(self.client, name, method, url, data)
+                    self.assertLess(response.status_code, 400, body)
+
+                    for sql, params in recorder.queries:
+                        if not sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                            continue
+                        scans = find_full_scans(explain(sql, params))
+                        self.assertFalse(scans, f'{name}: full table scan in {sql} -> {scans}')
+
+
+class ProductQueryCountTests(ProductScenarioMixin, NPlusOneMixin, TestCase):
+    """Every product URL issues the same queries however much data there is.
+
+    Each scenario runs against the fixtures plus ``SIZES`` extra products
+    (with images, spread over as many sellers); every run is rolled back so
+    the next one starts from the same state.
+    """
+    SIZES = (2, 12)
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.client = APIClient()
+
+    def seed(self, size):
+        sellers = CustomUser.objects.bulk_create([
+            CustomUser(mobile_number=f'98777{i:05d}', full_name=f'Grower {i}', user_type='smart_seller')
+            for i in range(size)
+        ])
+        # Half of the products belong to the fixture seller, half to the new ones
+        products = Product.objects.bulk_create([
+            Product(
+                seller=self.seller if i % 2 else sellers[i], name=f'Brinjal {i}', description='Purple brinjal',
+                quantity_available=5, price_per_unit=30, unit='KG', target_shopkeepers=True,
+            )
+            for i in range(size)
+        ])
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image=f'product_images/b{product.id}_{j}.jpg')
+            for product in products for j in range(2)
+        ])
+
+    def measure(self, name, size):
+        for cache in caches.all():
+            cache.clear()
+        with transaction.atomic():
+            self.seed(size)
+            user, method, url, data = self.scenarios()[name]
+            self.client.force_authenticate(user)
+            with self.capture_queries() as capture:
+                response, body = send_scenario(self.client, name, method, url, data)
+            transaction.set_rollback(True)
+        self.assertLess(response.status_code, 400, body)
+        return capture
+
+    def test_every_product_url_has_a_scenario(self):
+        names = {pattern.name for pattern in product_urls.urlpatterns}
+        self.assertEqual(names, set(self.scenarios()))
+
+    def test_query_count_is_constant(self):
+        small, large = self.SIZES
+        for name in self.scenarios():
+            with self.subTest(view=name):
+                # The first run pays for per-process lookups (e.g. content types)
+                self.measure(name, small)
+                small_capture = self.measure(name, small)
+                large_capture = self.measure(name, large)
+                self.assertSameQueryCount(small_capture, large_capture, name)
+                self.assertNoNPlusOne(large_capture, msg=name)
+
+    def test_detects_n_plus_one(self):
+        self.seed(4)
+        with self.capture_queries() as capture:
+            [product.seller.full_name for product in Product.objects.all()]
+        with self.assertRaisesRegex(AssertionError, r'(?s)\dx SELECT .*users_customuser.*products/tests\.py'):
+            self.assertNoNPlusOne(capture)
+
+
+class ProductsByBuyerTypeTests(TestCase):
+    """``products-by-buyer-type`` must cost the same number of queries at any size"""
+
+    def setUp(self):
+        self.seller = CustomUser.objects.create(
+            mobile_number='9876500011', full_name='Seller', user_type='smart_seller'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+        self.url = reverse('products-by-buyer-type')
+
+    def add_products(self, count):
+        targets = [
+            (True, True, True),
+            (True, False, False),
+            (False, True, False),
+            (False, False, True),
+        ]
+        for i in range(count):
+            mandi, shop, community = targets[i % len(targets)]
+            product = Product.objects.create(
+                seller=self.seller, name=f'Wheat {i}', description='Sharbati wheat',
+                quantity_available=100, price_per_unit=30, unit='QUINTAL',
+                target_mandi_owners=mandi, target_shopkeepers=shop, target_communities=community
+            )
+            ProductImage.objects.bulk_create([
+                ProductImage(product=product, image=f'product_images/w{product.id}.jpg')
+            ])
+
+    def test_groups_and_counts(self):
+        self.add_products(8)
+        Product.objects.filter(name='Wheat 7').update(is_published=False)
+
+        response = self.client.get(self.url)
+
+        groups = response.json()['products_by_buyer_type']
+        self.assertEqual(groups['all_buyers']['count'], 2)
+        self.assertEqual(groups['mandi_owners']['count'], 4)
+        self.assertEqual(groups['shopkeepers']['count'], 4)
+        self.assertEqual(groups['communities']['count'], 3)
+        for group in groups.values():
+            self.assertEqual(group['count'], len(group['products']))
+        self.assertEqual(len(groups['all_buyers']['products'][0]['images']), 1)
+
+    def test_query_count_is_constant(self):
+        # One query for the products, one for their images
+        self.add_products(4)
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+        self.add_products(40)
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+
+class LeanProductListTests(TestCase):
+    """The values()-based listing serializer renders exactly like ProductListSerializer"""
+
+    def setUp(self):
+        seller = CustomUser.objects.create(
+            mobile_number='9876500061', full_name='Seller', user_type='smart_seller'
+        )
+        Product.objects.create(
+            seller=seller, name='Wheat', variety='Sharbati', description='Sharbati wheat',
+            quantity_available='100.50', price_per_unit=30, min_order_quantity='2.25', unit='QUINTAL',
+            target_mandi_owners=True, target_shopkeepers=True, target_communities=True
+        )
+        Product.objects.create(
+            seller=seller, name='Rice', description='Basmati', quantity_available=0,
+            price_per_unit='55.5', unit='KG', target_shopkeepers=True
+        )
+        hidden = Product.objects.create(
+            seller=seller, name='Onion', description='Red onion', quantity_available=5,
+            price_per_unit=20, unit='KG', is_published=False
+        )
+        wheat = Product.objects.get(name='Wheat')
+        ProductImage.objects.bulk_create([
+            ProductImage(product=wheat, image='product_images/wheat.jpg', caption='Field', renditions={
+                'thumbnail': {'width': 200, 'height': 150, 'webp': 'renditions/w_t.webp', 'jpeg': 'renditions/w_t.jpg'},
+                'card': {'width': 600, 'height': 450, 'webp': 'renditions/w_c.webp', 'jpeg': 'renditions/w_c.jpg'},
+            }, processing_status=ProductImage.STATUS_READY),
+            ProductImage(product=wheat, image='product_images/wheat-2.jpg'),
+            ProductImage(product=hidden, image=''),
+        ])
+
+    def assertSameJSON(self, queryset):
+        expected = ProductListSerializer(queryset, many=True).data
+        self.assertEqual(JSONRenderer().render(serialize_product_list(queryset)), JSONRenderer().render(expected))
+
+    def test_output_matches_model_serializer(self):
+        self.assertSameJSON(Product.objects.order_by('id'))
+        self.assertSameJSON(Product.objects.filter(is_published=True).order_by('-created_at'))
+        self.assertSameJSON(Product.objects.none())
+
+    def test_uses_two_queries(self):
+        with self.assertNumQueries(2):
+            serialize_product_list(Product.objects.all())
+
+
+class ProductSearchTests(TestCase):
+    """Full-text search: index sync, prefix-token matching and rank ordering"""
+
+    def setUp(self):
+        caches[listing_cache.CACHE_ALIAS].clear()
+        self.seller = CustomUser.objects.create(
+            mobile_number='9876500081', full_name='Seller', user_type='smart_seller'
+        )
+        self.buyer = CustomUser.objects.create(
+            mobile_number='9876500082', full_name='Buyer', user_type='smart_buyer',
+            buyer_category='shopkeeper'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+        self.url = reverse('available-products-for-buyer')
+
+    def add(self, name, description, variety=None):
+        return Product.objects.create(
+            seller=self.seller, name=name, variety=variety, description=description,
+            quantity_available=10, price_per_unit=50, unit='KG', target_shopkeepers=True
+        )
+
+    def search(self, term):
+        return [product.name for product in product_search.filter_products(Product.objects.order_by('id'), term)]
+
+    def test_index_follows_save_and_delete(self):
+        product = self.add('Mango', 'Ratnagiri fruit')
+        self.assertEqual(self.search('ratnagiri'), ['Mango'])
+
+        product.description = 'Devgad fruit'
+        product.save()
+        self.assertEqual(self.search('ratnagiri'), [])
+        self.assertEqual(self.search('devgad'), ['Mango'])
+
+        product.delete()
+        self.assertEqual(self.search('devgad'), [])
+
+    def test_tokens_match_word_prefixes(self):
+        self.add('Tomato', 'Hybrid tomatoes', variety='Cherry')
+        self.add('Potato', 'Jyoti potatoes')
+        self.assertEqual(self.search('tom'), ['Tomato'])
+        self.assertEqual(self.search('CHERRY tomat'), ['Tomato'])
+        # Every token must match, and only at the start of a word
+        self.assertEqual(self.search('cherry potato'), [])
+        self.assertEqual(self.search('mato'), [])
+        # Query operators in user input are treated as plain words
+        self.assertEqual(self.search('("tomato")* -'), ['Tomato'])
+
+    def test_results_are_ranked(self):
+        self.add('Onion', 'Stored in a cool dry place, good for wholesale buyers of onion bags')
+        self.add('Onion onion', 'Nashik onion')
+        data = self.client.get(self.url, {'search': 'onion'}).json()
+        self.assertEqual([product['name'] for product in data['products']], ['Onion onion', 'Onion'])
+
+
+class CursorPaginationTests(TestCase):
+    """Keyset pages of the buyer catalog"""
+
+    def setUp(self):
+        caches[listing_cache.CACHE_ALIAS].clear()
+        seller = CustomUser.objects.create(
+            mobile_number='9876500071', full_name='Seller', user_type='smart_seller'
+        )
+        self.buyer = CustomUser.objects.create(
+            mobile_number='9876500072', full_name='Buyer', user_type='smart_buyer',
+            buyer_category='shopkeeper'
+        )
+        Product.objects.bulk_create([
+            Product(
+                seller=seller, name=f'Okra {i}', description='Tender okra',
+                quantity_available=10, price_per_unit=40, unit='KG', target_shopkeepers=True
+            )
+            for i in range(7)
+        ])
+        # Rows sharing a created_at must still be paged without gaps
+        moment = timezone.now()
+        Product.objects.filter(name__in=['Okra 1', 'Okra 2', 'Okra 3', 'Okra 4']).update(created_at=moment)
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+        self.url = reverse('available-products-for-buyer')
+
+    def test_pages_are_continuous(self):
+        seen = []
+        cursor = ''
+        pages = 0
+        while cursor is not None:
+            data = self.client.get(self.url, {'cursor': cursor, 'page_size': 2}).json()
+            pages += 1
+            seen.extend(product['id'] for product in data['products'])
+            cursor = data['pagination']['next_cursor']
+            self.assertEqual(data['pagination']['has_more'], cursor is not None)
+        self.assertEqual(pages, 4)
+        expected = list(Product.objects.order_by('-created_at', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_last_page_has_no_cursor(self):
+        data = self.client.get(self.url, {'page_size': 7}).json()
+        self.assertEqual(len(data['products']), 7)
+        self.assertEqual(data['pagination'], {'page_size': 7, 'next_cursor': None, 'has_more': False})
+
+    @override_settings(PRODUCTS_PAGE_SIZE=3, PRODUCTS_MAX_PAGE_SIZE=5)
+    def test_page_size_is_clamped(self):
+        for requested, expected in (('50', 5), ('0', 1), ('abc', 3)):
+            data = self.client.get(self.url, {'cursor': '', 'page_size': requested}).json()
+            self.assertEqual(data['pagination']['page_size'], expected)
+            self.assertEqual(len(data['products']), expected)
+
+    def test_malformed_cursor_is_rejected(self):
+        for cursor in ('not-a-cursor', 'WyJ4IiwxXQ'):
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['message'], 'Invalid cursor')
+
+
+class ListingCacheTests(TestCase):
+    """Buyer listing responses are cached per catalog version"""
+
+    def setUp(self):
+        caches[listing_cache.CACHE_ALIAS].clear()
+        self.seller = CustomUser.objects.create(
+            mobile_number='9876500021', full_name='Seller', user_type='smart_seller'
+        )
+        self.buyer = CustomUser.objects.create(
+            mobile_number='9876500022', full_name='Buyer', user_type='smart_buyer',
+            buyer_category='community'
+        )
+        self.product = Product.objects.create(
+            seller=self.seller, name='Rice', description='Basmati rice',
+            quantity_available=50, price_per_unit=90, unit='KG', target_communities=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+        self.url = reverse('available-products-for-buyer')
+
+    def test_repeat_request_is_served_from_cache(self):
+        first = self.client.get(self.url, {'unit': 'KG', 'utm_source': 'app'})
+        self.assertEqual(first['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url, {'utm_source': 'web', 'unit': 'KG'})
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.json(), second.json())
+
+        stats = listing_cache.get_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_cursor_mode_is_cached_separately(self):
+        self.client.get(self.url)
+        response = self.client.get(self.url, {'cursor': ''})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('pagination', response.json())
+
+    def test_product_write_invalidates(self):
+        self.client.get(self.url)
+        self.product.price_per_unit = 95
+        self.product.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['products'][0]['price_per_unit'], '95.00')
+
+    def test_image_write_invalidates(self):
+        self.client.get(self.url)
+        ProductImage.objects.create(product=self.product, image='product_images/missing.jpg')
+
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.json()['products'][0]['images']), 1)
+
+
+class ConditionalGetTests(TestCase):
+    """Product read endpoints honour If-None-Match / If-Modified-Since"""
+
+    def setUp(self):
+        caches[listing_cache.CACHE_ALIAS].clear()
+        self.seller = CustomUser.objects.create(
+            mobile_number='9876500031', full_name='Seller', user_type='smart_seller'
+        )
+        self.buyer = CustomUser.objects.create(
+            mobile_number='9876500032', full_name='Buyer', user_type='smart_buyer',
+            buyer_category='mandi_owner'
+        )
+        self.product = Product.objects.create(
+            seller=self.seller, name='Potato', description='Jyoti potato',
+            quantity_available=500, price_per_unit=12, unit='KG', target_mandi_owners=True
+        )
+        self.client = APIClient()
+
+    def assert_revalidates(self, user, url):
+        self.client.force_authenticate(user)
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+        self.assertFalse(first.has_header('Last-Modified'))
+
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+
+        self.product.quantity_available = 450
+        self.product.save()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_seller_products(self):
+        self.assert_revalidates(self.seller, reverse('seller-products'))
+
+    def test_product_detail(self):
+        self.assert_revalidates(self.seller, reverse('product-detail', args=[self.product.id]))
+
+    def test_buyer_listing(self):
+        self.assert_revalidates(self.buyer, reverse('available-products-for-buyer'))
+
+    def test_buyer_product_detail(self):
+        self.assert_revalidates(self.buyer, reverse('product-detail-for-buyer', args=[self.product.id]))
+
+    def test_image_changes_etag(self):
+        self.client.force_authenticate(self.seller)
+        url = reverse('seller-products')
+        etag = self.client.get(url)['ETag']
+        ProductImage.objects.bulk_create([
+            ProductImage(product=self.product, image='product_images/extra.jpg')
+        ])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def assert_sees_untimestamped_changes(self, user, url):
+        # Neither change moves the newest updated_at of the listing
+        older = Product.objects.create(
+            seller=self.seller, name='Onion', description='Red onion',
+            quantity_available=5, price_per_unit=20, unit='KG', target_mandi_owners=True
+        )
+        Product.objects.filter(pk=older.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        self.client.force_authenticate(user)
+        first = self.client.get(url)
+        self.assertEqual(len(first.json()['products']), 2)
+
+        older.delete()
+        ProductImage.objects.bulk_create([ProductImage(product=self.product, image='product_images/extra.jpg')])
+
+        since = http_date(time.time() + 60)
+        for headers in ({'HTTP_IF_MODIFIED_SINCE': since},
+                        {'HTTP_IF_MODIFIED_SINCE': since, 'HTTP_IF_NONE_MATCH': first['ETag']}):
+            response = self.client.get(url, **headers)
+            self.assertEqual(response.status_code, 200)
+            products = response.json()['products']
+            self.assertEqual([product['name'] for product in products], ['Potato'])
+            self.assertEqual(len(products[0]['images']), 1)
+
+    def test_seller_products_see_delete_and_new_image(self):
+        self.assert_sees_untimestamped_changes(self.seller, reverse('seller-products'))
+
+    def test_buyer_listing_sees_delete_and_new_image(self):
+        self.assert_sees_untimestamped_changes(self.buyer, reverse('available-products-for-buyer'))
+
+    def test_not_modified_skips_serialization(self):
+        self.client.force_authenticate(self.seller)
+        url = reverse('seller-products')
+        etag = self.client.get(url)['ETag']
+        # Only the validator aggregate runs
+        with self.assertNumQueries(1):
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_missing_product_is_still_404(self):
+        self.client.force_authenticate(self.seller)
+        response = self.client.get(reverse('product-detail', args=[self.product.id + 100]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ImageRenditionTests(TestCase):
+    """Uploads return immediately and renditions are generated afterwards"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root, PRODUCT_IMAGE_PIPELINE='sync')
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.seller = CustomUser.objects.create(
+            mobile_number='9876500041', full_name='Seller', user_type='smart_seller'
+        )
+        self.product = Product.objects.create(
+            seller=self.seller, name='Mango', description='Alphonso',
+            quantity_available=20, price_per_unit=300, unit='DOZEN', target_shopkeepers=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def upload(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (1600, 1200), 'orange').save(buffer, format='PNG')
+        buffer.seek(0)
+        buffer.name = 'mango.png'
+        url = reverse('add-product-images', args=[self.product.id])
+        return self.client.post(url, {'images': [buffer]}, format='multipart')
+
+    def test_upload_is_pending_until_committed(self):
+        response = self.upload()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['images'][0]['processing_status'], 'pending')
+
+    def test_renditions_are_recorded_and_serialized(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload()
+
+        image = self.product.images.get()
+        self.assertEqual(image.processing_status, ProductImage.STATUS_READY)
+        self.assertEqual(set(image.renditions), {'thumbnail', 'card', 'full'})
+        self.assertEqual((image.renditions['thumbnail']['width'], image.renditions['thumbnail']['height']), (160, 120))
+        self.assertEqual(image.renditions['full']['width'], 800)
+
+        # The original upload is kept untouched
+        with Image.open(image.image.path) as original:
+            self.assertEqual(original.size, (1600, 1200))
+
+        data = self.client.get(reverse('product-detail', args=[self.product.id])).json()
+        serialized = data['product']['images'][0]
+        self.assertTrue(serialized['thumbnail'].endswith('_thumbnail.webp'))
+        self.assertTrue(serialized['renditions']['card']['jpeg'].endswith('_card.jpeg'))
+
+    def test_deleting_image_removes_renditions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload()
+        image = self.product.images.get()
+        card = image.renditions['card']['webp']
+        self.assertTrue(default_storage.exists(card))
+
+        url = reverse('delete-product-image', args=[self.product.id, image.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(url)
+        self.assertFalse(default_storage.exists(card))
+
+    def test_undecodable_upload_is_marked_failed(self):
+        image = ProductImage.objects.create(product=self.product, image='product_images/missing.jpg')
+        from .images import generate_renditions
+        with self.assertLogs('products.images', 'ERROR'):
+            self.assertEqual(generate_renditions(image.id), {})
+        image.refresh_from_db()
+        self.assertEqual(image.processing_status, ProductImage.STATUS_FAILED)
+
+
+class BulkImportExportTests(TestCase):
+    """CSV / NDJSON bulk import and streaming export for sellers"""
+
+    def setUp(self):
+        caches[listing_cache.CACHE_ALIAS].clear()
+        self.seller = CustomUser.objects.create(
+            mobile_number='9876500051', full_name='Seller', user_type='smart_seller'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+        self.import_url = reverse('bulk-import-products')
+        self.export_url = reverse('export-products')
+
+    def post_body(self, body, content_type, **params):
+        url = self.import_url
+        if params:
+            url += '?' + '&'.join(f'{key}={value}' for key, value in params.items())
+        return self.client.generic('POST', url, body, content_type=content_type)
+
+    def test_csv_import_reports_row_errors(self):
+        body = (
+            'name,variety,description,quantity_available,unit,price_per_unit,target_mandi_owners,target_shopkeepers\n'
+            'Onion,Nashik Red,Dry onion,100,KG,25,true,false\n'
+            'Onion,,Bad price,100,KG,-5,true,false\n'
+            'Chilli,,No target,10,KG,80,false,false\n'
+            'Garlic,,Desi garlic,40,KG,120,false,true\n'
+        )
+        with self.settings(PRODUCT_IMPORT_CHUNK_SIZE=2):
+            response = self.post_body(body, 'text/csv')
+
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertFalse(data['success'])
+        self.assertEqual((data['total_rows'], data['created'], data['failed']), (4, 2, 2))
+        self.assertEqual([error['row'] for error in data['errors']], [3, 4])
+        self.assertIn('price_per_unit', data['errors'][0]['errors'])
+
+        onion = Product.objects.get(seller=self.seller, name='Onion')
+        self.assertEqual(onion.variety, 'Nashik Red')
+        self.assertTrue(onion.target_mandi_owners)
+        # Imported rows are searchable straight away
+        from .search import filter_products
+        self.assertEqual(list(filter_products(Product.objects.all(), 'garlic')), [
+            Product.objects.get(name='Garlic')
+        ])
+
+    def test_ndjson_import(self):
+        body = '\n'.join([
+            '{"name": "Banana", "description": "Robusta", "quantity_available": "12", "unit": "DOZEN", '
+            '"price_per_unit": "40", "target_communities": true}',
+            '',
+            '{"name": "Papaya", "description": "Red lady", "quantity_available": "30", '
+            '"price_per_unit": "35", "target_shopkeepers": true}',
+        ])
+        response = self.post_body(body, 'application/octet-stream', data_format='ndjson')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(Product.objects.filter(seller=self.seller).count(), 2)
+
+    def test_malformed_ndjson_keeps_committed_chunks(self):
+        body = (
+            '{"name": "Banana", "description": "Robusta", "quantity_available": "12", '
+            '"price_per_unit": "40", "target_communities": true}\n'
+            'not json\n'
+        )
+        with self.settings(PRODUCT_IMPORT_CHUNK_SIZE=1):
+            response = self.post_body(body, 'application/x-ndjson')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['aborted'], 'Line 2 is not valid JSON')
+        self.assertEqual(response.json()['created'], 1)
+
+    def test_non_utf8_csv_is_rejected(self):
+        body = (
+            'name,description,quantity_available,price_per_unit,target_shopkeepers\n'
+            'Garlic,Desi garlic,8,120,true\n'
+            'Jeera,Unjha cumin \xe9,8,120,true\n'
+        ).encode('latin-1')
+        with self.settings(PRODUCT_IMPORT_CHUNK_SIZE=1):
+            response = self.post_body(body, 'text/csv')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['aborted'], 'Line 3 is not valid UTF-8')
+        self.assertEqual(response.json()['created'], 1)
+
+    def test_unknown_format_is_rejected(self):
+        response = self.post_body('{}', 'application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_streams_csv_and_ndjson(self):
+        for i in range(3):
+            Product.objects.create(
+                seller=self.seller, name=f'Guava {i}', description='Allahabad safeda',
+                quantity_available=5, price_per_unit='60.50', unit='KG', target_shopkeepers=True
+            )
+
+        response = self.client.get(self.export_url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'name', 'variety'])
+        self.assertEqual(len(lines), 4)
+
+        response = self.client.get(self.export_url, {'data_format': 'ndjson'})
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([record['name'] for record in records], ['Guava 2', 'Guava 1', 'Guava 0'])
+        self.assertEqual(records[0]['price_per_unit'], '60.50')
+        self.assertIsNone(records[0]['variety'])
+
+
+class NearbyProductsTests(TestCase):
+    """"Near me" discovery: radius filter over seller locations, nearest first"""
+
+    def setUp(self):
+        caches[listing_cache.CACHE_ALIAS].clear()
+        self.pune_seller = CustomUser.objects.create(
+            mobile_number='9876500071', full_name='Pune', user_type='smart_seller',
+            latitude='18.520400', longitude='73.856700'
+        )
+        self.mumbai_seller = CustomUser.objects.create(
+            mobile_number='9876500072', full_name='Mumbai', user_type='smart_seller',
+            latitude='19.076000', longitude='72.877700'
+        )
+        self.unlocated_seller = CustomUser.objects.create(
+            mobile_number='9876500073', full_name='Nowhere', user_type='smart_seller'
+        )
+        self.buyer = CustomUser.objects.create(
+            mobile_number='9876500074', full_name='Buyer', user_type='smart_buyer',
+            buyer_category='shopkeeper', latitude='18.530000', longitude='73.850000'
+        )
+        for seller in (self.mumbai_seller, self.pune_seller, self.unlocated_seller):
+            Product.objects.create(
+                seller=seller, name=f'Tomato {seller.full_name}', description='Fresh',
+                quantity_available=10, price_per_unit=20, target_shopkeepers=True
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+        self.url = reverse('available-products-for-buyer')
+
+    def test_radius_uses_profile_location(self):
+        response = self.client.get(self.url, {'near_me': '1', 'radius_km': '50'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([product['name'] for product in data['products']], ['Tomato Pune'])
+        self.assertLess(data['products'][0]['distance_km'], 2)
+        self.assertEqual(data['total_products'], 1)
+        self.assertEqual(data['filters_applied']['near_me']['radius_km'], 50)
+
+    def test_results_are_sorted_by_distance(self):
+        response = self.client.get(self.url, {'lat': '19.0', 'lng': '72.9', 'radius_km': '150'})
+        names = [product['name'] for product in response.json()['products']]
+        self.assertEqual(names, ['Tomato Mumbai', 'Tomato Pune'])
+
+    def test_results_are_capped_at_page_size(self):
+        for i in range(3):
+            Product.objects.create(
+                seller=self.pune_seller, name=f'Onion {i}', description='Fresh',
+                quantity_available=10, price_per_unit=20, target_shopkeepers=True
+            )
+        params = {'lat': '19.0', 'lng': '72.9', 'radius_km': '150', 'page_size': '2'}
+        with self.settings(PRODUCTS_MAX_PAGE_SIZE=3):
+            data = self.client.get(self.url, params).json()
+            capped = self.client.get(self.url, dict(params, page_size='50')).json()
+
+        nearest, second = data['products']
+        self.assertEqual(nearest['name'], 'Tomato Mumbai')
+        self.assertGreater(second['distance_km'], nearest['distance_km'])
+        self.assertEqual(data['total_products'], 5)
+        self.assertEqual(data['pagination'], {'page_size': 2, 'next_cursor': None, 'has_more': True})
+        self.assertEqual(len(capped['products']), 3)
+
+    def test_query_size_does_not_grow_with_sellers_in_range(self):
+        # A 40 x 30 grid of sellers about 1km apart around the buyer, plus one outside the radius
+        located = [(18.40 + row * 0.009, 73.70 + col * 0.0095) for row in range(30) for col in range(40)]
+        located.append((19.5, 73.85))
+        sellers = CustomUser.objects.bulk_create([
+            CustomUser(
+                mobile_number=f'+9170000{i:05d}', full_name=f'Seller {i}', user_type='smart_seller',
+                latitude=f'{lat:.6f}', longitude=f'{lng:.6f}', geohash=geo.encode(lat, lng)
+            )
+            for i, (lat, lng) in enumerate(located)
+        ])
+        Product.objects.bulk_create([
+            Product(
+                seller=seller, name=f'Onion {seller.full_name}', description='Fresh',
+                quantity_available=10, price_per_unit=20, target_shopkeepers=True
+            )
+            for seller in sellers
+        ])
+
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            data = self.client.get(self.url, {'near_me': '1', 'radius_km': '50', 'page_size': '10'}).json()
+
+        # 1,200 grid sellers plus the Pune seller; Mumbai and the far one are out of range
+        self.assertEqual(data['total_products'], 1201)
+        distances = [product['distance_km'] for product in data['products']]
+        self.assertEqual(len(distances), 10)
+        self.assertEqual(distances, sorted(distances))
+        self.assertLess(distances[0], 1)
+        self.assertLess(max(len(params or ()) for _sql, params in recorder.queries), 100)
+
+    def test_location_is_required(self):
+        self.buyer.latitude = self.buyer.longitude = None
+        self.buyer.save()
+        self.assertEqual(self.client.get(self.url, {'near_me': '1'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'lat': '18.5', 'lng': '73.8', 'radius_km': '5000'}).status_code, 400)
+
+    def test_seller_move_invalidates_cached_listing(self):
+        params = {'near_me': '1', 'radius_km': '50'}
+        self.assertEqual(len(self.client.get(self.url, params).json()['products']), 1)
+
+        self.mumbai_seller.latitude, self.mumbai_seller.longitude = '18.510000', '73.860000'
+        self.mumbai_seller.save(update_fields=['latitude', 'longitude'])
+
+        response = self.client.get(self.url, params)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.json()['products']), 2)
+
+    def test_seller_lookup_uses_geohash_index(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            self.client.get(self.url, {'near_me': '1', 'radius_km': '50'})
+        # The prefilter is part of the validator, facet and page queries
+        lookups = [(sql, params) for sql, params in recorder.queries if '"geohash" >=' in sql]
+        self.assertEqual(len(lookups), 3)
+        for lookup in lookups:
+            plan = explain(*lookup)
+            scans = [line for line in plan if re.search(r'^SCAN users_customuser\b|Seq Scan on users_customuser', line.strip())]
+            self.assertFalse(scans, plan)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, OTP, UserSession
+from .models import CustomUser, OTP, UserSession, SMSOutbox, UserDeletionJob
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
@@ -41,6 +41,14 @@ class CustomUserAdmin(UserAdmin):
     
     readonly_fields = ('created_at', 'updated_at', 'date_joined', 'last_login')
 
+    def get_readonly_fields(self, request, obj=None):
+        fields = super().get_readonly_fields(request, obj)
+        # An account with a queued deletion must not be reactivated
+        if obj is not None and UserDeletionJob.objects.filter(user_id=obj.pk).exclude(
+                status=UserDeletionJob.STATUS_DONE).exists():
+            fields = (*fields, 'is_active')
+        return fields
+
 
 @admin.register(OTP)
 class OTPAdmin(admin.ModelAdmin):
@@ -72,3 +80,21 @@ class UserSessionAdmin(admin.ModelAdmin):
         return obj.is_expired()
     is_expired_display.short_description = 'Is Expired'
     is_expired_display.boolean = True
+
+
+@admin.register(SMSOutbox)
+class SMSOutboxAdmin(admin.ModelAdmin):
+    list_display = ('mobile_number', 'template', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'template', 'created_at')
+    search_fields = ('mobile_number',)
+    ordering = ('-created_at',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
+
+@admin.register(UserDeletionJob)
+class UserDeletionJobAdmin(admin.ModelAdmin):
+    list_display = ('user_id', 'user_identifier', 'status', 'step', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('user_identifier',)
+    ordering = ('-created_at',)
+    readonly_fields = ('progress', 'last_error', 'created_at', 'finished_at')
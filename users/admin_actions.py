@@ -0,0 +1,111 @@
+"""Bulk admin actions on user accounts.
+
+Users are processed ``ADMIN_BULK_BATCH_SIZE`` at a time. Each batch is one
+transaction: a locking SELECT of the current state, one ``UPDATE`` for the
+users that actually change, and one ``bulk_create`` of their
+``AdminActionLog`` rows. Cached credentials of the changed users are then
+dropped in two cache calls, and with signed session tokens their sessions
+are revoked in one. Deletion is only scheduled here; ``users.deletion``
+does the work in the background, and users with a queued deletion are not
+reactivated (their outcome is ``deletion_scheduled``).
+
+``QuerySet.update`` bypasses the CustomUser signals; that is safe here
+because ``is_active`` moves none of the materialized statistics counters.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+
+from . import authentication
+from . import deletion
+from . import sessions
+from .models import AdminActionLog, CustomUser, UserDeletionJob
+
+
+ACTIONS = ('suspend', 'reactivate', 'delete')
+
+# Per-id outcomes reported back to the admin
+SUSPENDED = 'suspended'
+REACTIVATED = 'reactivated'
+DELETION_SCHEDULED = 'deletion_scheduled'
+ALREADY_SUSPENDED = 'already_suspended'
+ALREADY_ACTIVE = 'already_active'
+NOT_FOUND = 'not_found'
+
+
+def get_batch_size():
+    return getattr(settings, 'ADMIN_BULK_BATCH_SIZE', 500)
+
+
+def batches(ids, size):
+    iterator = iter(ids)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _forget_credentials(user_ids):
+    authentication.invalidate_users(user_ids)
+    if sessions.is_signed_mode():
+        sessions.revoke_all_many(user_ids)
+
+
+def set_active(user_ids, active, admin_username=None):
+    """Suspend (``active=False``) or reactivate users; return ``{id: outcome}``"""
+    action = 'reactivate' if active else 'suspend'
+    changed_outcome, unchanged_outcome = (REACTIVATED, ALREADY_ACTIVE) if active else (SUSPENDED, ALREADY_SUSPENDED)
+    results = {}
+    for batch in batches(user_ids, get_batch_size()):
+        with transaction.atomic():
+            current = dict(
+                CustomUser.objects.select_for_update().filter(pk__in=batch).values_list('pk', 'is_active')
+            )
+            # Reactivating a user whose deletion is queued would bring back an
+            # account with hidden products that the worker deletes anyway
+            doomed = set(
+                UserDeletionJob.objects.filter(user_id__in=current)
+                .exclude(status=UserDeletionJob.STATUS_DONE).values_list('user_id', flat=True)
+            ) if active else set()
+            to_change = [pk for pk, is_active in current.items() if is_active != active and pk not in doomed]
+            if to_change:
+                CustomUser.objects.filter(pk__in=to_change).update(is_active=active)
+                AdminActionLog.objects.bulk_create([
+                    AdminActionLog(
+                        admin_username=admin_username, user_id=pk, action=action,
+                        details=f'{changed_outcome.capitalize()} by admin (bulk)',
+                    )
+                    for pk in to_change
+                ])
+        if to_change:
+            _forget_credentials(to_change)
+        for pk in batch:
+            if pk not in current:
+                results[pk] = NOT_FOUND
+            elif pk in doomed:
+                results[pk] = DELETION_SCHEDULED
+            else:
+                results[pk] = changed_outcome if pk in to_change else unchanged_outcome
+    return results
+
+
+def delete_users(user_ids, admin_username=None):
+    """Schedule background deletion of users; return ``{id: outcome}``.
+
+    The users are deactivated and their products hidden right away (see
+    ``users.deletion``); the rows go once the deletion worker gets to them.
+    """
+    results = {}
+    for batch in batches(user_ids, get_batch_size()):
+        jobs = deletion.schedule(batch, admin_username)
+        for pk in batch:
+            results[pk] = DELETION_SCHEDULED if pk in jobs else NOT_FOUND
+    return results
+
+
+def run(action, user_ids, admin_username=None):
+    if action == 'delete':
+        return delete_users(user_ids, admin_username)
+    return set_active(user_ids, action == 'reactivate', admin_username)
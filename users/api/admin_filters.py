@@ -0,0 +1,127 @@
+"""Server-side filtering and search for the admin user list.
+
+Filters map onto the composite indexes declared on ``CustomUser`` so each
+page is an index range scan in keyset order. Search is a prefix match on the
+mobile number for numeric terms and a substring match on the name otherwise;
+on PostgreSQL both are backed by indexes created in migration 0008
+(``varchar_pattern_ops`` for the prefix, ``pg_trgm`` for the substring).
+"""
+import re
+from datetime import datetime, time
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from ..models import CustomUser
+
+
+PG_MOBILE_INDEX = 'user_mobile_prefix_idx'
+PG_NAME_INDEX = 'user_full_name_trgm_idx'
+
+CHOICE_FILTERS = {
+    'user_type': CustomUser.USER_TYPE_CHOICES,
+    'buyer_category': CustomUser.BUYER_CATEGORY_CHOICES,
+    'registration_method': CustomUser.REGISTRATION_METHOD_CHOICES,
+}
+BOOLEAN_FILTERS = ('is_active', 'is_profile_complete')
+TRUE_VALUES = ('1', 'true', 'yes')
+FALSE_VALUES = ('0', 'false', 'no')
+
+PHONE_RE = re.compile(r'^\+?\d+$')
+
+
+class InvalidFilter(ValueError):
+    """Raised for a filter value the admin list does not understand"""
+
+
+def parse_boundary(name, value):
+    """Parse a ``created_*`` bound; a bare date means midnight of that day"""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise InvalidFilter(f'{name} must be an ISO date or datetime')
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def search_users(queryset, term):
+    term = term.strip()
+    if not term:
+        return queryset
+    if PHONE_RE.match(term):
+        if term.startswith('+'):
+            return queryset.filter(mobile_number__startswith=term)
+        # Numbers are stored with or without the country code
+        return queryset.filter(
+            Q(mobile_number__startswith=term) |
+            Q(mobile_number__startswith=f'+{term}') |
+            Q(mobile_number__startswith=f'+91{term}')
+        )
+    return queryset.filter(full_name__icontains=term)
+
+
+def filter_users(queryset, params):
+    """Apply the admin list filters in ``params`` (a QueryDict) to ``queryset``.
+
+    Choice filters accept comma-separated values; ``created_after`` is
+    inclusive and ``created_before`` exclusive.
+    """
+    for name, choices in CHOICE_FILTERS.items():
+        value = params.get(name)
+        if not value:
+            continue
+        values = [item.strip() for item in value.split(',') if item.strip()]
+        allowed = {choice for choice, _ in choices}
+        unknown = [item for item in values if item not in allowed]
+        if unknown:
+            raise InvalidFilter(f'Unknown {name}: {", ".join(unknown)}')
+        queryset = queryset.filter(**{f'{name}__in': values})
+
+    for name in BOOLEAN_FILTERS:
+        value = params.get(name)
+        if value is None or value == '':
+            continue
+        if value.lower() in TRUE_VALUES:
+            queryset = queryset.filter(**{name: True})
+        elif value.lower() in FALSE_VALUES:
+            queryset = queryset.filter(**{name: False})
+        else:
+            raise InvalidFilter(f'{name} must be true or false')
+
+    if params.get('created_after'):
+        queryset = queryset.filter(created_at__gte=parse_boundary('created_after', params['created_after']))
+    if params.get('created_before'):
+        queryset = queryset.filter(created_at__lt=parse_boundary('created_before', params['created_before']))
+
+    if params.get('search'):
+        queryset = search_users(queryset, params['search'])
+    return queryset
+
+
+def create_search_indexes(conn):
+    """Create the PostgreSQL-only search indexes (used by the migration)"""
+    if conn.vendor != 'postgresql':
+        return
+    with conn.cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {PG_MOBILE_INDEX} '
+            f'ON users_customuser (mobile_number varchar_pattern_ops)'
+        )
+        # Matches the UPPER(...) LIKE UPPER(...) that icontains compiles to
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {PG_NAME_INDEX} '
+            f'ON users_customuser USING GIN ((UPPER(full_name::text)) gin_trgm_ops)'
+        )
+
+
+def drop_search_indexes(conn):
+    if conn.vendor != 'postgresql':
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(f'DROP INDEX IF EXISTS {PG_MOBILE_INDEX}')
+        cursor.execute(f'DROP INDEX IF EXISTS {PG_NAME_INDEX}')
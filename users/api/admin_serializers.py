@@ -1,20 +1,22 @@
 from rest_framework import serializers
 from ..models import CustomUser
-from ..models import AdminActionLog
+from ..models import AdminActionLog, UserDeletionJob
 
 
 class AdminUserListSerializer(serializers.ModelSerializer):
-    """Serializer for admin user listing - limited visible fields"""
+    """Serializer for admin user listing - the columns the list table shows.
+
+    The list view loads only these columns (``.only(*Meta.fields)``); the
+    detail endpoint has the rest.
+    """
     class Meta:
         model = CustomUser
-        # Provide a comprehensive list view for admins (excluding password)
         fields = [
             'id', 'mobile_number', 'full_name', 'email', 'user_type', 'buyer_category',
             'registration_method', 'is_mobile_verified', 'is_profile_complete', 'is_active',
-            'profile_picture', 'address', 'city', 'state', 'pincode', 'latitude', 'longitude',
-            'created_at', 'updated_at', 'last_login', 'google_id', 'facebook_id'
+            'city', 'state', 'created_at', 'last_login'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'last_login']
+        read_only_fields = fields
 
 
 class AdminUserDetailSerializer(serializers.ModelSerializer):
@@ -37,6 +39,15 @@ class AdminActionLogSerializer(serializers.ModelSerializer):
         fields = ['id', 'admin_username', 'action', 'details', 'created_at']
 
 
+class UserDeletionJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserDeletionJob
+        fields = [
+            'user_id', 'user_identifier', 'requested_by', 'status', 'step', 'progress',
+            'attempts', 'last_error', 'created_at', 'finished_at'
+        ]
+
+
 class AdminUserUpdateSerializer(serializers.ModelSerializer):
     """Serializer used by admin to update allowed fields only"""
     class Meta:
@@ -8,18 +8,44 @@ from .admin_serializers import (
     AdminUserListSerializer, AdminUserDetailSerializer, AdminUserUpdateSerializer
 )
 from ..models import AdminActionLog
-from .admin_serializers import AdminActionLogSerializer
-from ..models import CustomUser
+from .admin_serializers import AdminActionLogSerializer, UserDeletionJobSerializer
+from .admin_filters import InvalidFilter, filter_users
+from .pagination import InvalidCursor, get_page_size, paginate_users
+from ..models import CustomUser, UserDeletionJob
+from .. import admin_actions
+from .. import deletion
+from .. import exports
+from kissanmart import perf
+from kissanmart.imports import lazy_import
+from ..sessions import is_signed_mode, revoke_all as revoke_all_sessions
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 import base64
 
 
+# Providers register their clients on first use; no need to load them here
+http_client = lazy_import('users.http_client')
+
+
 def make_admin_token(username: str, password: str) -> str:
     """Create a simple base64 token from username:password"""
     raw = f"{username}:{password}".encode('utf-8')
     return base64.b64encode(raw).decode('utf-8')
 
 
+def get_admin_username(request):
+    """Best-effort admin name from a Basic auth header, for audit logs"""
+    auth = request.headers.get('Authorization') or request.META.get('HTTP_AUTHORIZATION', '')
+    if not auth.startswith('Basic '):
+        return None
+    try:
+        raw = base64.b64decode(auth.split(' ', 1)[1]).decode('utf-8')
+    except Exception:
+        return None
+    return raw.split(':', 1)[0]
+
+
 class AdminAuthView(APIView):
     """Authenticate admin credentials against env vars and return a token.
 
@@ -47,7 +73,11 @@ class AdminAuthView(APIView):
 
 
 class AdminPermissionMixin:
-    """Mixin to check X-Admin-Token header or basic auth style token"""
+    """Mixin to check X-Admin-Token header or basic auth style token.
+
+    Views reject requests in ``dispatch`` before DRF negotiates a renderer, so
+    that rejection is a plain ``JsonResponse``.
+    """
 
     def check_admin(self, request):
         header_token = request.headers.get('X-Admin-Token') or request.META.get('HTTP_X_ADMIN_TOKEN')
@@ -69,12 +99,16 @@ class AdminPermissionMixin:
 
 
 class AdminUserListCreate(AdminPermissionMixin, generics.ListCreateAPIView):
-    """List all users or create a new user. Protected by admin token header.
+    """List users a page at a time or create a new user. Protected by admin token header.
 
-    GET /api/admin/users/ -> list users
+    GET /api/admin/users/ -> one page of users, newest first. Query params:
+        cursor, page_size, search (mobile number prefix or name substring),
+        user_type, buyer_category, registration_method (comma-separated),
+        is_active, is_profile_complete (true/false),
+        created_after (inclusive), created_before (exclusive)
     POST /api/admin/users/ -> create user (use UserProfileSerializer fields)
     """
-    queryset = CustomUser.objects.all().order_by('-created_at')
+    queryset = CustomUser.objects.only(*AdminUserListSerializer.Meta.fields)
     # Use admin-locked serializer for listing
     serializer_class = AdminUserListSerializer
 
@@ -82,13 +116,26 @@ class AdminUserListCreate(AdminPermissionMixin, generics.ListCreateAPIView):
 
     def dispatch(self, request, *args, **kwargs):
         if not self.check_admin(request):
-            return Response({'success': False, 'message': 'Admin authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+            return JsonResponse({'success': False, 'message': 'Admin authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
         return super().dispatch(request, *args, **kwargs)
 
     def get(self, request, *args, **kwargs):
-        users = self.get_queryset()
-        serializer = AdminUserListSerializer(users, many=True)
-        return Response({'success': True, 'users': serializer.data})
+        try:
+            users = filter_users(self.get_queryset(), request.GET)
+            page, next_cursor = paginate_users(users, request.GET.get('cursor'), request.GET.get('page_size'))
+        except (InvalidFilter, InvalidCursor) as e:
+            return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = AdminUserListSerializer(page, many=True)
+        return Response({
+            'success': True,
+            'users': serializer.data,
+            'pagination': {
+                'page_size': get_page_size(request.GET.get('page_size')),
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
+            }
+        })
 
     def post(self, request, *args, **kwargs):
         # Admins should not create users via this endpoint - disallow
@@ -109,7 +156,7 @@ class AdminUserRetrieveUpdateDelete(AdminPermissionMixin, APIView):
 
     def dispatch(self, request, *args, **kwargs):
         if not self.check_admin(request):
-            return Response({'success': False, 'message': 'Admin authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+            return JsonResponse({'success': False, 'message': 'Admin authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
         return super().dispatch(request, *args, **kwargs)
 
     def get(self, request, id):
@@ -126,23 +173,14 @@ class AdminUserRetrieveUpdateDelete(AdminPermissionMixin, APIView):
         return Response({'success': False, 'message': 'Admin update not allowed'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
     def delete(self, request, id):
-        # Permanently delete user and log action
+        # Deactivate now and delete (with products, images, sessions) in the background
         user = self.get_object(id)
-        admin_user = None
-        # try to get admin username from basic auth header or token (best-effort)
-        auth = request.headers.get('Authorization') or request.META.get('HTTP_AUTHORIZATION', '')
-        if auth.startswith('Basic '):
-            token = auth.split(' ', 1)[1]
-            try:
-                import base64
-                raw = base64.b64decode(token).decode('utf-8')
-                admin_user = raw.split(':', 1)[0]
-            except Exception:
-                admin_user = None
-
-        AdminActionLog.objects.create(admin_username=admin_user, user=user, action='delete', details='Deleted by admin')
-        user.delete()
-        return Response({'success': True, 'message': 'User deleted'})
+        job = deletion.schedule([user.pk], get_admin_username(request))[user.pk]
+        return Response({
+            'success': True,
+            'message': 'User deactivated; deletion scheduled',
+            'deletion': UserDeletionJobSerializer(job).data
+        }, status=status.HTTP_202_ACCEPTED)
 
     # Additional admin-only actions
     def post_suspend(self, request, id):
@@ -178,7 +216,7 @@ class AdminUserSuspendView(AdminPermissionMixin, APIView):
 
     def dispatch(self, request, *args, **kwargs):
         if not self.check_admin(request):
-            return Response({'success': False, 'message': 'Admin authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+            return JsonResponse({'success': False, 'message': 'Admin authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
         return super().dispatch(request, *args, **kwargs)
 
     def post(self, request, id):
@@ -187,6 +225,9 @@ class AdminUserSuspendView(AdminPermissionMixin, APIView):
             return Response({'success': False, 'message': 'User already suspended'}, status=status.HTTP_400_BAD_REQUEST)
         user.is_active = False
         user.save()
+        # Signed session tokens stay valid by themselves; end them explicitly
+        if is_signed_mode():
+            revoke_all_sessions(user.pk)
         admin_user = None
         auth = request.headers.get('Authorization') or request.META.get('HTTP_AUTHORIZATION', '')
         if auth.startswith('Basic '):
@@ -205,7 +246,7 @@ class AdminUserLogsView(AdminPermissionMixin, APIView):
 
     def dispatch(self, request, *args, **kwargs):
         if not self.check_admin(request):
-            return Response({'success': False, 'message': 'Admin authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+            return JsonResponse({'success': False, 'message': 'Admin authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
         return super().dispatch(request, *args, **kwargs)
 
     def get(self, request, id):
@@ -213,3 +254,164 @@ class AdminUserLogsView(AdminPermissionMixin, APIView):
         logs = AdminActionLog.objects.filter(user=user).order_by('-created_at')
         serializer = AdminActionLogSerializer(logs, many=True)
         return Response({'success': True, 'logs': serializer.data})
+
+
+def export_response(rows, data_format, name):
+    response = StreamingHttpResponse(rows, content_type=exports.CONTENT_TYPES[data_format])
+    stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+    response['Content-Disposition'] = f'attachment; filename="{name}-{stamp}.{data_format}"'
+    return response
+
+
+class AdminUserExportView(AdminPermissionMixin, APIView):
+    """Stream every user matching the admin list filters as CSV or NDJSON.
+
+    GET /api/admin/users/export/?data_format=csv|ndjson&<list filters>
+    """
+    permission_classes = [AllowAny]
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.check_admin(request):
+            return JsonResponse({'success': False, 'message': 'Admin authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+        return super().dispatch(request, *args, **kwargs)
+
+    def get(self, request):
+        data_format = request.GET.get('data_format', 'csv')
+        if data_format not in exports.FORMATS:
+            return Response({'success': False, 'message': 'data_format must be csv or ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            users = filter_users(CustomUser.objects.all(), request.GET)
+        except InvalidFilter as e:
+            return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return export_response(exports.export_users(users, data_format), data_format, 'users')
+
+
+class AdminLogExportView(AdminPermissionMixin, APIView):
+    """Stream admin action logs as CSV or NDJSON, oldest first.
+
+    GET /api/admin/logs/export/?data_format=csv|ndjson
+        &user=<id>&action=suspend,delete&admin_username=...&created_after=...&created_before=...
+    """
+    permission_classes = [AllowAny]
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.check_admin(request):
+            return JsonResponse({'success': False, 'message': 'Admin authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+        return super().dispatch(request, *args, **kwargs)
+
+    def get(self, request):
+        data_format = request.GET.get('data_format', 'csv')
+        if data_format not in exports.FORMATS:
+            return Response({'success': False, 'message': 'data_format must be csv or ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            logs = exports.filter_logs(AdminActionLog.objects.all(), request.GET)
+        except InvalidFilter as e:
+            return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return export_response(exports.export_logs(logs, data_format), data_format, 'admin-logs')
+
+
+class AdminUserBulkActionView(AdminPermissionMixin, APIView):
+    """Suspend, reactivate or delete many users in one request.
+
+    POST /api/admin/users/bulk/
+        {"action": "suspend" | "reactivate" | "delete", "ids": [1, 2, 3]}
+        {"action": "suspend", "filter": {"search": "+91981", "created_after": "2024-05-01"}}
+    The filter takes the admin list's query parameters. Returns one result per id.
+    """
+    permission_classes = [AllowAny]
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.check_admin(request):
+            return JsonResponse({'success': False, 'message': 'Admin authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_user_ids(self, data):
+        """Return the target ids in request order; raise ValueError for bad input"""
+        max_users = getattr(settings, 'ADMIN_BULK_MAX_USERS', 10000)
+        ids, filters = data.get('ids'), data.get('filter')
+        if (ids is None) == (filters is None):
+            raise ValueError('Provide either ids or filter')
+
+        if ids is not None:
+            if not isinstance(ids, list) or not ids:
+                raise ValueError('ids must be a non-empty list')
+            try:
+                user_ids = list(dict.fromkeys(int(pk) for pk in ids))
+            except (TypeError, ValueError):
+                raise ValueError('ids must be integers')
+        else:
+            if not isinstance(filters, dict) or not filters:
+                raise ValueError('filter must be a non-empty object')
+            params = {
+                key: ','.join(map(str, value)) if isinstance(value, list) else str(value)
+                for key, value in filters.items()
+            }
+            users = filter_users(CustomUser.objects.all(), params)
+            user_ids = list(users.order_by('pk').values_list('pk', flat=True)[:max_users + 1])
+
+        if len(user_ids) > max_users:
+            raise ValueError(f'At most {max_users} users per request; narrow the selection')
+        return user_ids
+
+    def post(self, request):
+        action = request.data.get('action')
+        if action not in admin_actions.ACTIONS:
+            return Response({'success': False, 'message': 'action must be suspend, reactivate or delete'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            user_ids = self.get_user_ids(request.data)
+        except ValueError as e:
+            # InvalidFilter is a ValueError too
+            return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = admin_actions.run(action, user_ids, get_admin_username(request))
+        summary = {}
+        for outcome in results.values():
+            summary[outcome] = summary.get(outcome, 0) + 1
+        return Response({
+            'success': True,
+            'action': action,
+            'summary': summary,
+            'results': [{'id': pk, 'status': outcome} for pk, outcome in results.items()]
+        })
+
+
+class AdminUserDeletionView(AdminPermissionMixin, APIView):
+    """Progress of a user's background deletion.
+
+    GET /api/admin/users/<id>/deletion/
+    """
+    permission_classes = [AllowAny]
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.check_admin(request):
+            return JsonResponse({'success': False, 'message': 'Admin authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+        return super().dispatch(request, *args, **kwargs)
+
+    def get(self, request, id):
+        job = get_object_or_404(UserDeletionJob, user_id=id)
+        return Response({'success': True, 'deletion': UserDeletionJobSerializer(job).data})
+
+
+class AdminMetricsView(AdminPermissionMixin, APIView):
+    """Request metrics of the worker process that answers (see kissanmart.perf).
+
+    GET /api/users/admin/metrics/ -> per-view latency histograms, query counts, DB,
+        serializer and response-size figures, the slowest query fingerprints
+        and per-provider outbound HTTP figures (see users.http_client)
+    DELETE /api/users/admin/metrics/ -> start counting afresh (request metrics only)
+    """
+    permission_classes = [AllowAny]
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.check_admin(request):
+            return JsonResponse({'success': False, 'message': 'Admin authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+        return super().dispatch(request, *args, **kwargs)
+
+    def get(self, request):
+        metrics = perf.snapshot()
+        metrics['outbound_http'] = http_client.get_metrics()
+        return Response({'success': True, 'metrics': metrics})
+
+    def delete(self, request):
+        perf.reset()
+        return Response({'success': True, 'message': 'Metrics reset'})
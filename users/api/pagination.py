@@ -0,0 +1,27 @@
+from django.conf import settings
+
+from kissanmart.keyset import InvalidCursor, Keyset, clamp_page_size  # noqa: F401 - re-exported for the views
+
+
+# Keyset ordering used by admin listings: newest first, id breaks ties
+KEYSET = Keyset('-created_at', 'id')
+KEYSET_ORDERING = KEYSET.ordering
+
+
+def get_page_size(value):
+    """Clamp the requested page size to the configured bounds"""
+    return clamp_page_size(
+        value,
+        getattr(settings, 'ADMIN_USERS_PAGE_SIZE', 50),
+        getattr(settings, 'ADMIN_USERS_MAX_PAGE_SIZE', 200),
+    )
+
+
+def seek(queryset, cursor):
+    """Order ``queryset`` by the keyset and skip to just after ``cursor``"""
+    return KEYSET.seek(queryset, cursor)
+
+
+def paginate_users(queryset, cursor=None, page_size=None):
+    """Return one keyset page of ``queryset`` and the cursor for the next page"""
+    return KEYSET.paginate(queryset, cursor, get_page_size(page_size))
@@ -21,7 +21,6 @@ from django.shortcuts import redirect
 from django.urls import reverse
 from django.http import JsonResponse
 import logging
-import requests
 import json
 import secrets
 import base64
@@ -30,7 +29,15 @@ import urllib.parse
 
 from django.views.decorators.csrf import csrf_exempt
 
+from kissanmart.imports import lazy_import
 from ..models import CustomUser, OTP, UserSession
+from ..authentication import invalidate_user, resolve_session_token
+from ..sessions import (
+    SignedSession, is_signed_mode, revoke as revoke_session, revoke_all as revoke_all_sessions, start_session
+)
+from .. import google_identity
+from ..otp import issue_otp
+from .. import stats as user_stats
 from .serializers_new import (
     PhoneRegistrationSerializer,
     ProfileCompletionSerializer,
@@ -43,6 +50,11 @@ from .serializers_new import (
 
 logger = logging.getLogger(__name__)
 
+# Bound lazily so this module never imports requests at startup itself;
+# only the OAuth flows use it
+requests = lazy_import('requests')
+http_client = lazy_import('users.http_client')
+
 
 # REGISTRATION FLOW
 class SendOTPView(APIView):
@@ -54,72 +66,22 @@ class SendOTPView(APIView):
         
         if serializer.is_valid():
             mobile_number = serializer.validated_data['mobile_number']
-            otp = OTP.objects.create(mobile_number=mobile_number)
-            sms_sent = self.send_sms(mobile_number, otp.otp_code)
+            # The SMS is queued with the OTP and delivered by send_sms_outbox,
+            # so a slow provider never holds up this request. Repeat requests
+            # within the resend window reuse the OTP already on its way.
+            issue_otp(mobile_number)
             
-            if sms_sent:
-                return Response({
-                    'success': True,
-                    'message': f'OTP sent successfully to {mobile_number}',
-                    'expires_in_minutes': getattr(settings, 'OTP_EXPIRY_MINUTES', 5)
-                }, status=status.HTTP_200_OK)
-            else:
-                return Response({
-                    'success': False,
-                    'message': 'Failed to send OTP. Please try again.'
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response({
+                'success': True,
+                'message': f'OTP queued for delivery to {mobile_number}',
+                'expires_in_minutes': getattr(settings, 'OTP_EXPIRY_MINUTES', 5)
+            }, status=status.HTTP_200_OK)
         
         return Response({
             'success': False,
             'errors': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    def send_sms(self, mobile_number, otp_code):
-        try:
-            # Use MSG91 flow API to send OTP. Settings pulled from Django settings.
-            from django.conf import settings
-
-            otp_url = getattr(settings, 'OTP_URL', 'https://control.msg91.com/api/v5/flow/')
-            flow_id = getattr(settings, 'OTP_FLOW_ID', None)
-            sender = getattr(settings, 'OTP_SENDER_ID', None)
-            auth_key = getattr(settings, 'OTP_AUTH_KEY', None)
-
-            # Ensure number is in expected format (without +), msg91 expects country code prefixed
-            cleaned = mobile_number
-            if cleaned.startswith('+'):
-                cleaned = cleaned[1:]
-            # If number is 10 digits, prefix with 91
-            if len(cleaned) == 10:
-                cleaned = '91' + cleaned
-
-            headers = {
-                'authkey': auth_key or '',
-                'Content-Type': 'application/json'
-            }
-
-            payload = {
-                'flow_id': flow_id,
-                'sender': sender,
-                'mobiles': cleaned,
-                'var1': otp_code
-            }
-
-            # Log payload (avoid logging sensitive keys in production)
-            logger.info(f"Sending OTP via MSG91 to {cleaned}")
-
-            resp = requests.post(otp_url, headers=headers, json=payload, timeout=10)
-
-            if resp.status_code in (200, 201):
-                logger.info(f"MSG91 response: {resp.status_code} - {resp.text}")
-                return True
-            else:
-                logger.error(f"MSG91 failed: {resp.status_code} - {resp.text}")
-                return False
-        except Exception as e:
-            logger.error(f"SMS sending failed: {str(e)}")
-            return False
-
-
 class VerifyPhoneRegistrationView(APIView):
     """Step 2: Verify phone number and create basic user account"""
     permission_classes = [AllowAny]
@@ -235,7 +197,7 @@ class CompleteProfileView(APIView):
                 return Response({'success': False, 'message': 'Account suspended'}, status=status.HTTP_403_FORBIDDEN)
 
             token, created = Token.objects.get_or_create(user=user)
-            user_session = UserSession.objects.create(user=user)
+            session_token = start_session(user, end_others=False)
             
             response_message = 'Profile completed successfully! You can now login.'
             return Response({
@@ -243,7 +205,7 @@ class CompleteProfileView(APIView):
                 'message': response_message,
                 'user': UserProfileSerializer(user).data,
                 'token': token.key,
-                'session_token': user_session.session_token,
+                'session_token': session_token,
                 'profile_complete': user.is_profile_complete
             }, status=status.HTTP_200_OK)
         
@@ -299,15 +261,14 @@ class PhoneLoginView(APIView):
 
         # Create new session
         token, created = Token.objects.get_or_create(user=user)
-        UserSession.objects.filter(user=user, is_active=True).update(is_active=False)
-        user_session = UserSession.objects.create(user=user)
+        session_token = start_session(user)
 
         return Response({
             'success': True,
             'message': 'Login successful',
             'user': UserProfileSerializer(user).data,
             'token': token.key,
-            'session_token': user_session.session_token
+            'session_token': session_token
         }, status=status.HTTP_200_OK)
 
 
@@ -373,8 +334,15 @@ class UserLogoutView(APIView):
     
     def post(self, request):
         try:
+            if isinstance(request.auth, SignedSession):
+                revoke_session(request.auth)
+            if is_signed_mode():
+                # Like the UserSession update below, logout ends every session
+                revoke_all_sessions(request.user.pk)
             request.user.auth_token.delete()
             UserSession.objects.filter(user=request.user, is_active=True).update(is_active=False)
+            # update() skips signals, so drop cached credentials explicitly
+            invalidate_user(request.user.pk)
             
             return Response({
                 'success': True,
@@ -426,7 +394,8 @@ class CurrentUserView(APIView):
     """Return the currently authenticated user's profile.
 
     Supports DRF Token authentication (Authorization: Token <key>)
-    or session token via header X-Session-Token: <token> or query param ?session_token=<token>
+    or session token via header X-Session-Token: <token> or query param ?session_token=<token>.
+    Both resolve through the cached credential lookup in ``users.authentication``.
     """
     permission_classes = [AllowAny]
 
@@ -438,16 +407,13 @@ class CurrentUserView(APIView):
         except Exception:
             user = None
 
-        # If not authenticated by DRF token, try session token
+        # X-Session-Token is handled by the authentication class; the query
+        # parameter form is still accepted here
         if not user:
-            session_token = request.headers.get('X-Session-Token') or request.query_params.get('session_token')
+            session_token = request.query_params.get('session_token')
             if session_token:
-                try:
-                    session = UserSession.objects.filter(session_token=session_token, is_active=True).select_related('user').first()
-                    if session and not session.is_expired():
-                        user = session.user
-                except Exception:
-                    user = None
+                resolved = resolve_session_token(session_token)
+                user = resolved[0] if resolved else None
 
         if not user:
             return Response({'success': False, 'message': 'Authentication credentials were not provided or are invalid'}, status=status.HTTP_401_UNAUTHORIZED)
@@ -477,10 +443,10 @@ class OAuthCallbackView(APIView):
             if provider == 'google':
                 token_data = self.exchange_google_code(code, redirect_uri)
                 access_token = token_data.get('access_token')
-                # fetch user info
-                user_info = requests.get(
-                    f'https://www.googleapis.com/oauth2/v1/userinfo?alt=json&access_token={access_token}'
-                ).json()
+                # The exchange also returns an ID token, verified locally against Google's keys
+                user_info = google_identity.get_user_info(
+                    id_token=token_data.get('id_token'), access_token=access_token
+                )
                 social_id = user_info.get('id')
                 email = user_info.get('email')
                 name = user_info.get('name') or f"{user_info.get('given_name','')} {user_info.get('family_name','')}".strip()
@@ -488,8 +454,9 @@ class OAuthCallbackView(APIView):
             elif provider == 'facebook':
                 token_data = self.exchange_facebook_code(code, redirect_uri)
                 access_token = token_data.get('access_token')
-                user_info = requests.get(
-                    f'https://graph.facebook.com/me?access_token={access_token}&fields=id,name,email,first_name,last_name,picture'
+                user_info = http_client.get_client('facebook').get(
+                    'https://graph.facebook.com/me',
+                    params={'access_token': access_token, 'fields': 'id,name,email,first_name,last_name,picture'}
                 ).json()
                 social_id = user_info.get('id')
                 email = user_info.get('email')
@@ -589,15 +556,14 @@ class OAuthCallbackView(APIView):
                     return Response({'success': False, 'message': 'Account suspended'}, status=status.HTTP_403_FORBIDDEN)
 
                 token, _ = Token.objects.get_or_create(user=user)
-                UserSession.objects.filter(user=user, is_active=True).update(is_active=False)
-                user_session = UserSession.objects.create(user=user)
+                session_token = start_session(user)
 
                 return Response({
                     'success': True,
                     'message': 'OAuth login successful',
                     'user': UserProfileSerializer(user).data,
                     'token': token.key,
-                    'session_token': user_session.session_token
+                    'session_token': session_token
                 }, status=status.HTTP_200_OK)
 
             # If profile is incomplete, return next_step and provider access token so frontend can complete profile
@@ -625,7 +591,7 @@ class OAuthCallbackView(APIView):
             'grant_type': 'authorization_code'
         }
         headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-        resp = requests.post('https://oauth2.googleapis.com/token', data=data, headers=headers)
+        resp = http_client.get_client('google').post('https://oauth2.googleapis.com/token', data=data, headers=headers)
         try:
             resp.raise_for_status()
         except requests.HTTPError as e:
@@ -642,7 +608,7 @@ class OAuthCallbackView(APIView):
             'redirect_uri': redirect_uri,
             'code': code
         }
-        resp = requests.get('https://graph.facebook.com/v18.0/oauth/access_token', params=params)
+        resp = http_client.get_client('facebook').get('https://graph.facebook.com/v18.0/oauth/access_token', params=params)
         resp.raise_for_status()
         return resp.json()
 
@@ -668,7 +634,7 @@ class OAuthTokenView(APIView):
                     'redirect_uri': redirect_uri,
                     'grant_type': 'authorization_code'
                 }
-                resp = requests.post('https://oauth2.googleapis.com/token', data=data)
+                resp = http_client.get_client('google').post('https://oauth2.googleapis.com/token', data=data)
                 resp.raise_for_status()
                 return Response(resp.json(), status=status.HTTP_200_OK)
 
@@ -679,14 +645,14 @@ class OAuthTokenView(APIView):
                     'redirect_uri': redirect_uri,
                     'code': code
                 }
-                resp = requests.get('https://graph.facebook.com/v18.0/oauth/access_token', params=params)
+                resp = http_client.get_client('facebook').get('https://graph.facebook.com/v18.0/oauth/access_token', params=params)
                 resp.raise_for_status()
                 return Response(resp.json(), status=status.HTTP_200_OK)
 
             else:
                 return Response({'success': False, 'message': 'Unsupported provider'}, status=status.HTTP_400_BAD_REQUEST)
 
-        except requests.HTTPError as e:
+        except requests.RequestException as e:
             logger.exception('Token exchange failed')
             return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -698,14 +664,15 @@ class LinkSocialView(APIView):
     def post(self, request):
         provider = request.data.get('provider')
         access_token = request.data.get('access_token')
+        # Google clients may send an ID token instead of, or with, the access token
+        id_token = request.data.get('id_token') if provider == 'google' else None
 
-        if not provider or not access_token:
+        if not provider or not (access_token or id_token):
             return Response({'success': False, 'message': 'provider and access_token are required'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
             if provider == 'google':
-                # fetch userinfo
-                user_info = requests.get(f'https://www.googleapis.com/oauth2/v1/userinfo?alt=json&access_token={access_token}').json()
+                user_info = google_identity.get_user_info(id_token=id_token, access_token=access_token)
                 social_id = user_info.get('id')
                 email = user_info.get('email')
                 name = user_info.get('name')
@@ -724,7 +691,9 @@ class LinkSocialView(APIView):
                 request.user.save()
 
             elif provider == 'facebook':
-                user_info = requests.get(f'https://graph.facebook.com/me?access_token={access_token}&fields=id,name,email').json()
+                user_info = http_client.get_client('facebook').get(
+                    'https://graph.facebook.com/me', params={'access_token': access_token, 'fields': 'id,name,email'}
+                ).json()
                 social_id = user_info.get('id')
                 email = user_info.get('email')
                 name = user_info.get('name')
@@ -746,7 +715,7 @@ class LinkSocialView(APIView):
 
             return Response({'success': True, 'message': 'Social account linked', 'user': UserProfileSerializer(request.user).data}, status=status.HTTP_200_OK)
 
-        except requests.HTTPError as e:
+        except (requests.RequestException, google_identity.InvalidIDToken, google_identity.KeySetUnavailable) as e:
             logger.exception('Link social failed')
             return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -774,29 +743,8 @@ def user_dashboard(request):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def user_statistics(request):
-    total_users = CustomUser.objects.count()
-    smart_sellers = CustomUser.objects.filter(user_type='smart_seller').count()
-    smart_buyers = CustomUser.objects.filter(user_type='smart_buyer').count()
-    verified_users = CustomUser.objects.filter(is_mobile_verified=True).count()
-    complete_profiles = CustomUser.objects.filter(is_profile_complete=True).count()
-    
-    buyer_categories = CustomUser.objects.filter(user_type='smart_buyer')
-    mandi_owners = buyer_categories.filter(buyer_category='mandi_owner').count()
-    shopkeepers = buyer_categories.filter(buyer_category='shopkeeper').count()
-    communities = buyer_categories.filter(buyer_category='community').count()
-    
+    # Materialized counters (or one aggregate query when disabled)
     return Response({
         'success': True,
-        'statistics': {
-            'total_users': total_users,
-            'smart_sellers': smart_sellers,
-            'smart_buyers': smart_buyers,
-            'verified_users': verified_users,
-            'complete_profiles': complete_profiles,
-            'buyer_breakdown': {
-                'mandi_owners': mandi_owners,
-                'shopkeepers': shopkeepers,
-                'communities': communities
-            }
-        }
+        'statistics': user_stats.format_statistics(user_stats.get_statistics())
     })
\ No newline at end of file
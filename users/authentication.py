@@ -0,0 +1,178 @@
+"""DRF authentication for API tokens and session tokens, backed by a cache.
+
+``CachedTokenAuthentication`` accepts ``Authorization: Token <key>`` and
+``X-Session-Token: <token>``. A successful lookup is cached for
+``AUTH_CACHE_TIMEOUT`` seconds, so repeat requests with the same credential
+skip the database. Each cached entry records its user's generation mark;
+``invalidate_user`` replaces the mark, which orphans every entry of that
+user at once. It is called on logout, session rotation and (through
+signals) any save or delete of the user or token. Signed session tokens
+(see ``users.sessions``) are verified without the database and resolve
+their user through the same cache.
+
+Invalidation only reaches processes that share ``AUTH_CACHE_ALIAS``. On the
+per-process LocMem default, other workers keep serving a logged-out or
+suspended user for up to ``AUTH_CACHE_TIMEOUT`` seconds, so production must
+point the alias at a shared cache (``production_settings`` does when
+``REDIS_URL`` is set).
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+SESSION_HEADER = 'X-Session-Token'
+
+
+def get_cache():
+    return caches[getattr(settings, 'AUTH_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'AUTH_CACHE_TIMEOUT', 60)
+
+
+def credential_key(kind, credential):
+    # Hash so raw credentials never become cache keys
+    digest = hashlib.sha256(credential.encode('utf-8')).hexdigest()
+    return f'auth:{kind}:{digest}'
+
+
+def generation_key(user_id):
+    return f'auth:gen:{user_id}'
+
+
+def new_generation():
+    return uuid.uuid4().hex
+
+
+def current_generation(user_id, cache=None):
+    """Return the user's generation mark, creating one if it is missing"""
+    cache = cache or get_cache()
+    key = generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # A lost mark is replaced by a new one, which only orphans entries
+        cache.add(key, new_generation(), get_timeout() * 2)
+        generation = cache.get(key)
+    return generation
+
+
+def remember(key, user, auth, generation=None):
+    """Cache ``(user, auth)`` under ``key``, tagged with the user's generation"""
+    cache = get_cache()
+    if generation is None:
+        generation = current_generation(user.pk, cache)
+    cache.set(key, (user, auth, generation), get_timeout())
+
+
+def recall(key):
+    """Return the cached ``(user, auth)`` for ``key`` unless its user was invalidated"""
+    cache = get_cache()
+    cached = cache.get(key)
+    if cached is None:
+        return None
+    user, auth, generation = cached
+    if generation != current_generation(user.pk, cache):
+        return None
+    return user, auth
+
+
+def invalidate_user(user_id):
+    """Forget every cached credential of a user"""
+    invalidate_users([user_id])
+
+
+def invalidate_users(user_ids):
+    """Forget every cached credential of several users in one cache call.
+
+    Each user gets a new generation mark with a plain set, so there is no
+    read-modify-write for concurrent logins to race with.
+    """
+    get_cache().set_many(
+        {generation_key(user_id): new_generation() for user_id in user_ids}, get_timeout() * 2
+    )
+
+
+def get_user_snapshot(user_id):
+    """Return the cached user for ``user_id``, loading it on a miss"""
+    from .models import CustomUser
+
+    cache = get_cache()
+    key = f'auth:uid:{user_id}'
+    found = cache.get_many([key, generation_key(user_id)])
+    cached = found.get(key)
+    generation = found.get(generation_key(user_id)) or current_generation(user_id, cache)
+    if cached is not None and cached[2] == generation:
+        return cached[0]
+    # The mark is read before the row, so an invalidation racing this load
+    # orphans the entry written below
+    user = CustomUser.objects.filter(pk=user_id).first()
+    if user is not None:
+        remember(key, user, None, generation)
+    return user
+
+
+def resolve_session_token(session_token):
+    """Return ``(user, session)`` for an active, unexpired session token or None"""
+    from .models import UserSession
+    from . import sessions
+
+    if sessions.is_signed_token(session_token):
+        signed = sessions.verify_signed_token(session_token)
+        user = get_user_snapshot(signed.user_id) if signed else None
+        return (user, signed) if user else None
+
+    key = credential_key('session', session_token)
+    cached = recall(key)
+    if cached is None:
+        session = UserSession.objects.filter(
+            session_token=session_token, is_active=True
+        ).select_related('user').first()
+        if session is None:
+            return None
+        cached = (session.user, session)
+        remember(key, *cached)
+    user, session = cached
+    if session.expires_at <= timezone.now():
+        return None
+    return user, session
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token or session-token authentication with a short-lived user cache"""
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            return result
+
+        session_token = request.headers.get(SESSION_HEADER)
+        if not session_token:
+            return None
+        resolved = resolve_session_token(session_token)
+        if resolved is None:
+            # A stale token must not lock the client out of AllowAny views
+            # (send-otp, login); protected views still reject the request
+            return None
+        if not resolved[0].is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return resolved
+
+    def authenticate_credentials(self, key):
+        cache_key = credential_key('token', key)
+        cached = recall(cache_key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            remember(cache_key, user, token)
+            return user, token
+        user, token = cached
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return user, token
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core import checks
+
+
+# Per-process or no-op caches: a revocation written by one worker is invisible
+# to the others, and LocMem culls entries past MAX_ENTRIES
+UNSHARED_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@checks.register(checks.Tags.caches)
+def check_signed_session_cache(app_configs, **kwargs):
+    """Signed session tokens are revoked through the auth cache alone"""
+    if getattr(settings, 'SESSION_TOKEN_MODE', 'random') != 'signed':
+        return []
+    alias = getattr(settings, 'AUTH_CACHE_ALIAS', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend in UNSHARED_CACHE_BACKENDS:
+        return [checks.Error(
+            f"SESSION_TOKEN_MODE='signed' needs a shared cache for AUTH_CACHE_ALIAS '{alias}', not {backend}",
+            hint='Logouts and suspensions would not reach other workers, and evicted revocations would '
+                 'revive tokens. Point the alias at a Redis configured with maxmemory-policy noeviction.',
+            id='users.E001',
+        )]
+    return []
@@ -0,0 +1,227 @@
+"""Background deletion of user accounts.
+
+``schedule`` is all a request does: it deactivates the users, hides their
+products from the catalog, ends their sessions, writes the audit rows and
+queues a ``UserDeletionJob`` per user. The ``process_user_deletions`` worker
+then walks each job through ``STEPS``. Every step deletes at most
+``USER_DELETION_BATCH_SIZE`` rows per transaction, so locks stay short and
+progress is saved after each chunk; a crashed worker's job is picked up
+again once its lease expires and resumes where it stopped, because each
+step only ever deletes what is still left. A live worker renews the lease
+with every chunk, and stops if another worker has taken the job over.
+
+Uploaded image files are removed after each chunk commits (renditions go
+with the existing ProductImage signal); the user row itself is deleted last.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from products import images
+from products import listing_cache
+from products.models import Product, ProductImage
+from . import authentication
+from . import sessions
+from .models import AdminActionLog, CustomUser, OTP, UserDeletionJob, UserSession
+
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseLost(Exception):
+    """Raised when another worker has claimed the job this worker was running"""
+
+
+def get_batch_size():
+    return getattr(settings, 'USER_DELETION_BATCH_SIZE', 200)
+
+
+def get_lease():
+    return timedelta(seconds=getattr(settings, 'USER_DELETION_LEASE_SECONDS', 300))
+
+
+def renew_lease(job):
+    """Extend this worker's lease on ``job``; raise ``LeaseLost`` if it was taken over.
+
+    The lease expiry this worker last wrote doubles as its claim: a worker
+    that re-claimed the job after it expired has written a different one.
+    Call inside the chunk's transaction, so the row stays locked until the
+    chunk commits.
+    """
+    lease_until = timezone.now() + get_lease()
+    renewed = UserDeletionJob.objects.filter(pk=job.pk, next_attempt_at=job.next_attempt_at).update(
+        next_attempt_at=lease_until
+    )
+    if not renewed:
+        raise LeaseLost(f'User deletion job {job.pk} was claimed by another worker')
+    job.next_attempt_at = lease_until
+
+
+def schedule(user_ids, admin_username=None):
+    """Deactivate ``user_ids`` and queue their deletion; return ``{id: job}``.
+
+    Ids of users that do not exist are left out. Scheduling a user whose
+    deletion is already queued (or failed) re-queues the existing job.
+    """
+    with transaction.atomic():
+        found = dict(
+            CustomUser.objects.select_for_update().filter(pk__in=user_ids).values_list('pk', 'mobile_number')
+        )
+        if not found:
+            return {}
+        CustomUser.objects.filter(pk__in=found).update(is_active=False)
+        hidden = Product.objects.filter(seller_id__in=found, is_published=True).update(is_published=False)
+
+        existing = {job.user_id: job for job in UserDeletionJob.objects.filter(user_id__in=found)}
+        UserDeletionJob.objects.filter(user_id__in=existing).exclude(status=UserDeletionJob.STATUS_DONE).update(
+            status=UserDeletionJob.STATUS_PENDING, next_attempt_at=timezone.now(), last_error=''
+        )
+        UserDeletionJob.objects.bulk_create([
+            UserDeletionJob(user_id=pk, user_identifier=mobile_number or '', requested_by=admin_username)
+            for pk, mobile_number in found.items() if pk not in existing
+        ])
+        AdminActionLog.objects.bulk_create([
+            AdminActionLog(
+                admin_username=admin_username, user_id=pk, action='delete',
+                details=f'Deletion scheduled by admin: user {pk} {mobile_number or ""}'.rstrip(),
+            )
+            for pk, mobile_number in found.items()
+        ])
+
+    if hidden:
+        listing_cache.bump_catalog_version()
+    authentication.invalidate_users(list(found))
+    if sessions.is_signed_mode():
+        sessions.revoke_all_many(list(found))
+    jobs = UserDeletionJob.objects.filter(user_id__in=found)
+    return {job.user_id: job for job in jobs}
+
+
+def _delete_chunk(queryset, batch_size):
+    ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+    if not ids:
+        return 0
+    queryset.model.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def delete_product_images(job, batch_size):
+    rows = list(
+        ProductImage.objects.filter(product__seller_id=job.user_id).values_list('pk', 'image')[:batch_size]
+    )
+    if not rows:
+        return 0
+    ProductImage.objects.filter(pk__in=[pk for pk, _ in rows]).delete()
+    names = [name for _, name in rows if name]
+    transaction.on_commit(lambda: images.delete_files(names))
+    return len(rows)
+
+
+def delete_products(job, batch_size):
+    return _delete_chunk(Product.objects.filter(seller_id=job.user_id), batch_size)
+
+
+def delete_credentials(job, batch_size):
+    deleted = _delete_chunk(UserSession.objects.filter(user_id=job.user_id), batch_size)
+    return deleted or _delete_chunk(Token.objects.filter(user_id=job.user_id), batch_size)
+
+
+def delete_otps(job, batch_size):
+    if not job.user_identifier:
+        return 0
+    return _delete_chunk(OTP.objects.filter(mobile_number=job.user_identifier), batch_size)
+
+
+def delete_user(job, batch_size):
+    # Audit rows are detached (SET_NULL), not deleted
+    return _delete_chunk(CustomUser.objects.filter(pk=job.user_id), 1)
+
+
+# In order: children before parents, the user row last
+STEPS = [
+    ('product_images', delete_product_images),
+    ('products', delete_products),
+    ('credentials', delete_credentials),
+    ('otps', delete_otps),
+    ('user', delete_user),
+]
+
+
+def run_job(job, batch_size=None, max_chunks=None):
+    """Advance ``job`` by up to ``max_chunks`` chunks; return True when finished"""
+    batch_size = batch_size or get_batch_size()
+    names = [name for name, _ in STEPS]
+    start = names.index(job.step) if job.step in names else 0
+    chunks = 0
+    for name, step in STEPS[start:]:
+        job.step = name
+        while True:
+            if max_chunks is not None and chunks >= max_chunks:
+                job.save(update_fields=['step', 'progress'])
+                return False
+            with transaction.atomic():
+                renew_lease(job)
+                deleted = step(job, batch_size)
+                if deleted:
+                    job.progress[name] = job.progress.get(name, 0) + deleted
+                job.save(update_fields=['step', 'progress'])
+            chunks += 1
+            if not deleted:
+                break
+
+    with transaction.atomic():
+        renew_lease(job)
+        job.status = UserDeletionJob.STATUS_DONE
+        job.finished_at = timezone.now()
+        job.last_error = ''
+        job.save(update_fields=['status', 'finished_at', 'last_error'])
+    return True
+
+
+def claim_jobs(limit):
+    """Lease up to ``limit`` due jobs to this worker (see ``sms.claim_batch``)"""
+    now = timezone.now()
+    lease_until = now + get_lease()
+    with transaction.atomic():
+        jobs = list(
+            UserDeletionJob.objects.select_for_update(skip_locked=True)
+            .filter(status__in=[UserDeletionJob.STATUS_PENDING, UserDeletionJob.STATUS_RUNNING],
+                    next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:limit]
+        )
+        if jobs:
+            UserDeletionJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=UserDeletionJob.STATUS_RUNNING, next_attempt_at=lease_until
+            )
+            for job in jobs:
+                job.status, job.next_attempt_at = UserDeletionJob.STATUS_RUNNING, lease_until
+    return jobs
+
+
+def process(limit=10, batch_size=None):
+    """Run due jobs to completion; return ``(finished, failed_attempts)``"""
+    max_attempts = getattr(settings, 'USER_DELETION_MAX_ATTEMPTS', 5)
+    finished = failed = 0
+    for job in claim_jobs(limit):
+        try:
+            run_job(job, batch_size)
+            finished += 1
+        except LeaseLost:
+            # The other worker carries on from the last committed chunk
+            logger.warning('User deletion job %s was taken over by another worker', job.pk)
+        except Exception as e:
+            logger.exception('User deletion job %s failed in step %s', job.pk, job.step)
+            failed += 1
+            job.attempts += 1
+            job.last_error = f'{type(e).__name__}: {e}'
+            if job.attempts >= max_attempts:
+                job.status = UserDeletionJob.STATUS_FAILED
+            else:
+                job.status = UserDeletionJob.STATUS_PENDING
+                job.next_attempt_at = timezone.now() + timedelta(minutes=2 ** job.attempts)
+            job.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at'])
+    return finished, failed
@@ -0,0 +1,58 @@
+"""Streaming CSV / NDJSON exports of users and admin audit logs.
+
+Exports are generators over ``values_list(...).iterator()``: rows come from
+the database ``EXPORT_CHUNK_SIZE`` at a time (through a server-side cursor
+on PostgreSQL) and are never turned into model instances, so memory stays
+flat however many rows are exported. Both exports read in index order, so
+the database streams rows without sorting the table first.
+"""
+from django.conf import settings
+
+from kissanmart.streaming import CONTENT_TYPES, FORMATS, stream_rows  # noqa: F401 - used by the admin views
+from .api.admin_filters import InvalidFilter, parse_boundary
+from .api.pagination import KEYSET_ORDERING
+
+
+USER_EXPORT_FIELDS = [
+    'id', 'mobile_number', 'full_name', 'email', 'user_type', 'buyer_category',
+    'registration_method', 'is_mobile_verified', 'is_profile_complete', 'is_active',
+    'address', 'city', 'state', 'pincode', 'latitude', 'longitude',
+    'google_id', 'facebook_id', 'created_at', 'updated_at', 'last_login',
+]
+LOG_EXPORT_FIELDS = ['id', 'admin_username', 'user_id', 'action', 'details', 'created_at']
+# Rows written per streamed chunk of an export
+FLUSH_ROWS = 500
+
+
+def get_chunk_size():
+    return getattr(settings, 'ADMIN_EXPORT_CHUNK_SIZE', 2000)
+
+
+def export_users(queryset, data_format):
+    """Stream already-filtered users newest first (the admin list order)"""
+    rows = queryset.order_by(*KEYSET_ORDERING).values_list(*USER_EXPORT_FIELDS)
+    return stream_rows(rows.iterator(chunk_size=get_chunk_size()), USER_EXPORT_FIELDS, data_format, FLUSH_ROWS)
+
+
+def filter_logs(queryset, params):
+    """Apply ``user``, ``action``, ``admin_username`` and ``created_*`` filters"""
+    if params.get('user'):
+        try:
+            queryset = queryset.filter(user_id=int(params['user']))
+        except ValueError:
+            raise InvalidFilter('user must be a user id')
+    if params.get('action'):
+        queryset = queryset.filter(action__in=params['action'].split(','))
+    if params.get('admin_username'):
+        queryset = queryset.filter(admin_username=params['admin_username'])
+    if params.get('created_after'):
+        queryset = queryset.filter(created_at__gte=parse_boundary('created_after', params['created_after']))
+    if params.get('created_before'):
+        queryset = queryset.filter(created_at__lt=parse_boundary('created_before', params['created_before']))
+    return queryset
+
+
+def export_logs(queryset, data_format):
+    """Stream audit log entries oldest first, in primary key order"""
+    rows = queryset.order_by('id').values_list(*LOG_EXPORT_FIELDS)
+    return stream_rows(rows.iterator(chunk_size=get_chunk_size()), LOG_EXPORT_FIELDS, data_format, FLUSH_ROWS)
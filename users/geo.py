@@ -0,0 +1,156 @@
+"""Geohash cells and distance helpers for location based lookups.
+
+Every user with coordinates stores the geohash of their location. A radius
+search turns the circle's bounding box into a handful of geohash prefixes,
+which become index range scans (``prefix <= geohash < prefix + '{'``), then
+drops the corners of the box with an exact haversine pass over the few
+candidates that remain.
+
+Lookups on other models (products by seller location) keep everything in
+SQL instead: ``nearby_filter`` is the same prefilter against a related
+user's fields and ``distance_expression`` an equirectangular distance to
+filter and order by, so no list of users is ever built in Python.
+"""
+import math
+
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Stored precision, about 4.8m x 4.8m per cell
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+# Coarsest cover allowed before falling back to a shorter prefix
+MAX_COVER_CELLS = 16
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        target, bounds = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if target >= mid:
+            value |= 1
+            bounds[0] = mid
+        else:
+            bounds[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """Return ``(lat_degrees, lon_degrees)`` spanned by one cell"""
+    total_bits = precision * 5
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """Return ``(min_lat, max_lat, min_lon, max_lon)`` enclosing the circle"""
+    latitude, longitude = float(latitude), float(longitude)
+    lat_delta = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = math.cos(math.radians(latitude))
+    # Near the poles the box spans every longitude
+    lon_delta = 180.0 if cos_lat < 1e-6 else min(radius_km / (KM_PER_DEGREE_LAT * cos_lat), 180.0)
+    return (
+        max(latitude - lat_delta, -90.0),
+        min(latitude + lat_delta, 90.0),
+        max(longitude - lon_delta, -180.0),
+        min(longitude + lon_delta, 180.0),
+    )
+
+
+def covering_cells(box, max_cells=MAX_COVER_CELLS):
+    """Return the geohash prefixes whose cells together cover ``box``.
+
+    Uses the longest prefix length that needs at most ``max_cells`` cells, so
+    small radii scan a narrow slice of the index and large ones stay bounded.
+    """
+    min_lat, max_lat, min_lon, max_lon = box
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_step, lon_step = cell_size(precision)
+        rows = math.floor(max_lat / lat_step) - math.floor(min_lat / lat_step) + 1
+        cols = math.floor(max_lon / lon_step) - math.floor(min_lon / lon_step) + 1
+        if rows * cols <= max_cells:
+            break
+
+    cells = set()
+    # Sample one point per row/column; the extra edge point covers the last cell
+    for row in range(rows + 1):
+        lat = min(min_lat + row * lat_step, max_lat)
+        for col in range(cols + 1):
+            lon = min(min_lon + col * lon_step, max_lon)
+            cells.add(encode(lat, lon, precision))
+    return sorted(cells)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (float(lat1), float(lon1), float(lat2), float(lon2)))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def geohash_filter(cells, field='geohash'):
+    """Q object matching any of ``cells`` as index-friendly range predicates"""
+    from django.db.models import Q
+
+    condition = Q()
+    for cell in cells:
+        # '{' sorts right after 'z', the last geohash character
+        condition |= Q(**{f'{field}__gte': cell, f'{field}__lt': cell + '{'})
+    return condition
+
+
+def nearby_filter(latitude, longitude, radius_km, prefix=''):
+    """Q object for users inside the circle's bounding box (``prefix`` reaches a related user)"""
+    from django.db.models import Q
+
+    box = bounding_box(latitude, longitude, radius_km)
+    min_lat, max_lat, min_lon, max_lon = box
+    return geohash_filter(covering_cells(box), f'{prefix}geohash') & Q(**{
+        f'{prefix}latitude__range': (min_lat, max_lat),
+        f'{prefix}longitude__range': (min_lon, max_lon),
+    })
+
+
+def distance_expression(latitude, longitude, prefix=''):
+    """SQL expression for the km from the origin to a user's location.
+
+    Equirectangular: exact enough within the few hundred km of a radius
+    search, and needs nothing beyond arithmetic and a square root.
+    """
+    from django.db.models import F, FloatField
+    from django.db.models.functions import Cast, Sqrt
+
+    lon_scale = math.cos(math.radians(float(latitude)))
+    d_lat = Cast(F(f'{prefix}latitude'), FloatField()) - float(latitude)
+    d_lon = (Cast(F(f'{prefix}longitude'), FloatField()) - float(longitude)) * lon_scale
+    return Sqrt(d_lat * d_lat + d_lon * d_lon) * KM_PER_DEGREE_LAT
+
+
+def find_nearby_users(queryset, latitude, longitude, radius_km):
+    """Return ``{user_id: distance_km}`` for users in ``queryset`` within the radius"""
+    candidates = queryset.filter(
+        nearby_filter(latitude, longitude, radius_km)
+    ).values_list('id', 'latitude', 'longitude')
+
+    nearby = {}
+    for user_id, lat, lon in candidates:
+        distance = haversine_km(latitude, longitude, lat, lon)
+        if distance <= radius_km:
+            nearby[user_id] = round(distance, 3)
+    return nearby
@@ -0,0 +1,167 @@
+"""Local verification of Google ID tokens.
+
+Google signs ID tokens with keys published as a JWKS document. The key set is
+kept in memory and in the shared cache for as long as its ``Cache-Control:
+max-age`` allows, so verifying a token is normally a signature check with no
+network call. An unknown ``kid`` (Google rotated keys) forces one refresh.
+The userinfo endpoint remains as a fallback when no ID token is available or
+the key set cannot be fetched.
+"""
+import base64
+import json
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from kissanmart.imports import lazy_import
+
+
+requests = lazy_import('requests')
+http_client = lazy_import('users.http_client')
+
+JWKS_URL = 'https://www.googleapis.com/oauth2/v3/certs'
+USERINFO_URL = 'https://www.googleapis.com/oauth2/v1/userinfo'
+ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+CACHE_KEY = 'google:jwks'
+# Used when the response carries no usable max-age
+DEFAULT_MAX_AGE = 3600
+
+MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+_keys = {}
+_expires_at = 0.0
+_lock = threading.Lock()
+
+
+class InvalidIDToken(ValueError):
+    """The token is malformed, expired, for another audience or badly signed"""
+
+
+class KeySetUnavailable(Exception):
+    """Google's key set could not be fetched"""
+
+
+def jwk_to_pem(jwk):
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicNumbers
+
+    def to_int(value):
+        return int.from_bytes(base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)), 'big')
+
+    public_key = RSAPublicNumbers(to_int(jwk['e']), to_int(jwk['n'])).public_key()
+    return public_key.public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode('ascii')
+
+
+def max_age(response):
+    match = MAX_AGE_RE.search(response.headers.get('Cache-Control', ''))
+    if not match:
+        return DEFAULT_MAX_AGE
+    # Age says how long a proxy already held the response
+    return max(0, int(match.group(1)) - int(response.headers.get('Age', 0) or 0))
+
+
+def fetch_key_set():
+    """Download the JWKS; return ``({kid: pem}, lifetime_seconds)``"""
+    url = getattr(settings, 'GOOGLE_JWKS_URL', JWKS_URL)
+    try:
+        response = http_client.get_client('google').get(url)
+        response.raise_for_status()
+        keys = {jwk['kid']: jwk_to_pem(jwk) for jwk in response.json()['keys'] if jwk.get('kty') == 'RSA'}
+    except (requests.RequestException, ValueError, KeyError) as e:
+        raise KeySetUnavailable(str(e)) from e
+    return keys, max_age(response)
+
+
+def get_keys(force_refresh=False):
+    """Return ``{kid: pem}`` from memory, then the shared cache, then Google"""
+    global _keys, _expires_at
+    with _lock:
+        now = time.time()
+        if not force_refresh and _keys and now < _expires_at:
+            return _keys
+
+        cached = None if force_refresh else cache.get(CACHE_KEY)
+        if cached is not None:
+            _keys, _expires_at = cached['keys'], cached['expires_at']
+            if now < _expires_at:
+                return _keys
+
+        keys, lifetime = fetch_key_set()
+        _keys, _expires_at = keys, now + lifetime
+        if lifetime:
+            cache.set(CACHE_KEY, {'keys': keys, 'expires_at': _expires_at}, lifetime)
+        return _keys
+
+
+def clear_keys():
+    global _keys, _expires_at
+    with _lock:
+        _keys, _expires_at = {}, 0.0
+    cache.delete(CACHE_KEY)
+
+
+def _token_kid(id_token):
+    try:
+        header = id_token.split('.', 1)[0]
+        return json.loads(base64.urlsafe_b64decode(header + '=' * (-len(header) % 4))).get('kid')
+    except (ValueError, AttributeError):
+        raise InvalidIDToken('Malformed ID token')
+
+
+def get_audiences():
+    audiences = [getattr(settings, 'GOOGLE_OAUTH2_CLIENT_ID', '')]
+    audiences += getattr(settings, 'GOOGLE_ID_TOKEN_EXTRA_AUDIENCES', [])
+    return [audience for audience in audiences if audience]
+
+
+def verify_id_token(id_token):
+    """Verify ``id_token`` locally and return its claims"""
+    # Imported on first use so google-auth stays out of process start-up
+    from google.auth import exceptions as google_exceptions
+    from google.auth import jwt as google_jwt
+
+    kid = _token_kid(id_token)
+    keys = get_keys()
+    if kid and kid not in keys:
+        keys = get_keys(force_refresh=True)
+    try:
+        claims = google_jwt.decode(
+            id_token, certs=keys, audience=get_audiences(),
+            clock_skew_in_seconds=getattr(settings, 'GOOGLE_ID_TOKEN_CLOCK_SKEW', 10),
+        )
+    except (google_exceptions.GoogleAuthError, ValueError) as e:
+        raise InvalidIDToken(str(e)) from e
+    if claims.get('iss') not in ISSUERS:
+        raise InvalidIDToken('Wrong issuer')
+    return claims
+
+
+def get_user_info(id_token=None, access_token=None):
+    """Return Google profile info shaped like the v1 userinfo response.
+
+    A present ID token is verified locally and must be valid. The userinfo
+    endpoint is only called without one, or if Google's keys are unreachable.
+    """
+    if id_token:
+        try:
+            claims = verify_id_token(id_token)
+        except KeySetUnavailable:
+            if not access_token:
+                raise
+        else:
+            return {
+                'id': claims['sub'],
+                # Only trust addresses Google has verified
+                'email': claims.get('email') if claims.get('email_verified') in (True, 'true') else None,
+                'name': claims.get('name'),
+                'given_name': claims.get('given_name'),
+                'family_name': claims.get('family_name'),
+                'picture': claims.get('picture'),
+            }
+
+    return http_client.get_client('google').get(USERINFO_URL, params={'alt': 'json', 'access_token': access_token}).json()
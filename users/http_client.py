@@ -0,0 +1,175 @@
+"""Shared outbound HTTP client for third-party providers (Google, Facebook, MSG91).
+
+One ``ProviderClient`` per provider keeps a pooled keep-alive
+``requests.Session``, applies a timeout to every call, counts latency and
+errors, and trips a circuit breaker after repeated failures so a provider
+outage fails fast instead of tying up workers.
+"""
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised without contacting the provider while its breaker is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open -> closed.
+
+    After ``threshold`` consecutive failures calls are rejected for
+    ``reset_timeout`` seconds; then a single trial call is let through and
+    its outcome closes or re-opens the breaker.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, threshold, reset_timeout, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+
+class ProviderClient:
+    def __init__(self, provider, timeout=None, pool_size=None, breaker=None):
+        self.provider = provider
+        self.timeout = timeout or getattr(settings, 'OUTBOUND_HTTP_TIMEOUT', (3.05, 10))
+        pool_size = pool_size or getattr(settings, 'OUTBOUND_HTTP_POOL_SIZE', 10)
+        self.breaker = breaker or CircuitBreaker(
+            getattr(settings, 'OUTBOUND_HTTP_BREAKER_THRESHOLD', 5),
+            getattr(settings, 'OUTBOUND_HTTP_BREAKER_RESET_SECONDS', 30),
+        )
+        self.session = requests.Session()
+        # One pool per host; retries are left to callers that know what is idempotent
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def request(self, method, url, **kwargs):
+        """Send a request; 5xx responses and network errors count as failures.
+
+        4xx responses are returned normally (they are the caller's problem,
+        not the provider's health).
+        """
+        if not self.breaker.allow():
+            with self._lock:
+                self.rejected += 1
+            raise CircuitOpenError(f'{self.provider} circuit open; not calling {method} {url.split("?")[0]}')
+
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except BaseException:
+            # Any exception must settle the call, or a half-open breaker
+            # would keep its trial slot taken and never close again
+            self._record(time.perf_counter() - started, failed=True)
+            raise
+        failed = response.status_code >= 500
+        self._record(time.perf_counter() - started, failed=failed)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def _record(self, elapsed, failed):
+        if failed:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        with self._lock:
+            self.requests += 1
+            self.errors += int(failed)
+            self.latency_total += elapsed
+            self.latency_max = max(self.latency_max, elapsed)
+        logger.debug('%s request took %.1fms%s', self.provider, elapsed * 1000, ' (failed)' if failed else '')
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'rejected': self.rejected,
+                'avg_latency_ms': round(self.latency_total / self.requests * 1000, 1) if self.requests else 0.0,
+                'max_latency_ms': round(self.latency_max * 1000, 1),
+                'circuit': self.breaker.state,
+            }
+
+    def close(self):
+        self.session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(provider, **options):
+    """Return the process-wide client for ``provider`` (created on first use)"""
+    with _clients_lock:
+        client = _clients.get(provider)
+        if client is None:
+            client = _clients[provider] = ProviderClient(provider, **options)
+        return client
+
+
+def get_metrics():
+    """Per-provider metrics of this process, served by the admin metrics endpoint"""
+    with _clients_lock:
+        clients = list(_clients.values())
+    return {client.provider: client.metrics() for client in clients}
+
+
+def reset_clients():
+    """Close and forget every client (tests, or after a fork)"""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
@@ -0,0 +1,69 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from kissanmart import imports
+
+
+class Command(BaseCommand):
+    help = ('Report the import-time tree of the app startup path (django.setup, URLconf, WSGI app) '
+            'and check it against the stored baseline')
+    # Profiling runs in child interpreters; nothing here needs a checked project
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters to take the best times from')
+        parser.add_argument('--depth', type=int, default=2, help='Tree levels to print')
+        parser.add_argument('--min-ms', type=float, default=2.0,
+                            help='Hide modules whose cumulative import time is below this')
+        parser.add_argument('--json', action='store_true', help='Print the per-package summary as JSON')
+        parser.add_argument('--check', action='store_true', help='Fail when startup regressed against the baseline')
+        parser.add_argument('--time-tolerance', type=float, default=0.5)
+        parser.add_argument('--module-tolerance', type=float, default=0.05)
+        parser.add_argument('--update-baseline', action='store_true')
+
+    def handle(self, *args, **options):
+        settings_module = os.environ['DJANGO_SETTINGS_MODULE']
+        roots, importers = imports.profile_startup(settings_module, runs=options['runs'])
+        summary = imports.summarize(roots, importers)
+
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2, sort_keys=True))
+        else:
+            self.write_tree(roots, options['depth'], options['min_ms'] * 1000)
+            self.write_packages(summary)
+
+        if options['update_baseline']:
+            imports.save_baseline(settings_module, summary)
+            self.stdout.write(self.style.SUCCESS(f'Baseline for {settings_module} written to {imports.BASELINE_FILE}'))
+        elif options['check']:
+            baseline = imports.load_baseline().get(settings_module)
+            if baseline is None:
+                raise CommandError(f'No baseline for {settings_module}; run with --update-baseline')
+            problems = imports.check(summary, baseline, options['time_tolerance'], options['module_tolerance'])
+            if problems:
+                raise CommandError('Startup imports regressed:\n' + '\n'.join(problems))
+            self.stdout.write(self.style.SUCCESS('Startup imports within baseline'))
+
+    def write_tree(self, roots, max_depth, min_us):
+        self.stdout.write(f'{"cumulative ms":>14} {"self ms":>8}  module')
+        for root in sorted(roots, key=lambda node: -node.cumulative_us):
+            stack = [(root, 0)]
+            while stack:
+                node, depth = stack.pop()
+                if node.cumulative_us < min_us:
+                    continue
+                self.stdout.write(f'{node.cumulative_us / 1000:>14.1f} {node.self_us / 1000:>8.1f}  '
+                                  f'{"  " * depth}{node.name}')
+                if depth < max_depth:
+                    # Reversed so the slowest child is printed first
+                    children = sorted(node.children, key=lambda child: child.cumulative_us)
+                    stack.extend((child, depth + 1) for child in children)
+
+    def write_packages(self, summary):
+        self.stdout.write(f'\n{"self ms":>8} {"modules":>8}  package')
+        packages = sorted(summary['packages'].items(), key=lambda item: -item[1]['self_ms'])
+        for package, entry in packages:
+            self.stdout.write(f'{entry["self_ms"]:>8.1f} {entry["modules"]:>8}  {package}')
+        self.stdout.write(f'\nTotal {summary["total_ms"]}ms over {summary["modules"]} modules')
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users import deletion
+
+
+class Command(BaseCommand):
+    help = 'Carry out scheduled user deletions in chunks; runs until stopped unless --once is given'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process what is due now and exit')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Rows deleted per transaction')
+        parser.add_argument('--jobs', type=int, default=10, help='Jobs claimed per round')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep when nothing is due')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                finished, failed = deletion.process(limit=options['jobs'], batch_size=options['batch_size'])
+                if finished or failed:
+                    self.stdout.write(f'Finished {finished} user deletions, {failed} failed attempts')
+                    # More may be due; failed jobs are rescheduled into the future
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
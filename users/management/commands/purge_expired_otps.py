@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from users import otp
+
+
+class Command(BaseCommand):
+    help = 'Delete expired/used OTPs and finished SMS outbox rows in small batches (run from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        otps = otp.purge_otps(batch_size=options['batch_size'])
+        messages = otp.purge_outbox(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {otps} OTPs and {messages} outbox messages'))
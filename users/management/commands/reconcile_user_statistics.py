@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from users import stats
+from users.models import UserStatistic
+
+
+class Command(BaseCommand):
+    help = 'Recompute the materialized user statistics counters (run periodically, e.g. from cron)'
+
+    def handle(self, *args, **options):
+        before = dict(UserStatistic.objects.values_list('name', 'value'))
+        after = stats.reconcile()
+        drift = {name: value - before.get(name, 0) for name, value in after.items() if before.get(name) != value}
+        if drift:
+            changes = ', '.join(f'{name} {delta:+d}' for name, delta in sorted(drift.items()))
+            self.stdout.write(self.style.WARNING(f'Corrected drift: {changes}'))
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {len(after)} counters ({after['total_users']} users)"))
@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users import sms
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued SMS (OTPs) from the outbox; runs until stopped unless --once is given'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain what is due now and exit')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help='Parallel provider requests (and HTTP pool size)')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to sleep when the outbox is empty')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency'] or getattr(settings, 'SMS_OUTBOX_CONCURRENCY', 4)
+        provider = sms.get_provider(pool_size=concurrency)
+        try:
+            while True:
+                sent, failed = sms.drain(
+                    provider=provider,
+                    batch_size=options['batch_size'],
+                    concurrency=concurrency,
+                )
+                if sent or failed:
+                    self.stdout.write(f'Sent {sent} SMS, {failed} failed attempts')
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            provider.close()
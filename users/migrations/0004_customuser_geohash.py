@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:49
+
+from django.db import migrations, models
+
+
+def backfill_geohash(apps, schema_editor):
+    from users.geo import encode
+    CustomUser = apps.get_model('users', 'CustomUser')
+    users = CustomUser.objects.filter(latitude__isnull=False, longitude__isnull=False).only('latitude', 'longitude')
+    batch = []
+    for user in users.iterator(chunk_size=2000):
+        user.geohash = encode(user.latitude, user.longitude)
+        batch.append(user)
+        if len(batch) >= 2000:
+            CustomUser.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    CustomUser.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0003_adminactionlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['user_type', 'geohash'], name='user_type_geohash_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:51
+
+from django.db import migrations, models
+
+
+def seed_statistics(apps, schema_editor):
+    from users.stats import compute_statistics
+    CustomUser = apps.get_model('users', 'CustomUser')
+    UserStatistic = apps.get_model('users', 'UserStatistic')
+    stats = compute_statistics(CustomUser.objects.all())
+    UserStatistic.objects.bulk_create([UserStatistic(name=name, value=value) for name, value in stats.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_customuser_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStatistic',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(seed_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_smsoutbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='otp',
+            index=models.Index(fields=['mobile_number', 'otp_code', 'is_verified', '-created_at'], name='otp_verify_lookup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='otp',
+            index=models.Index(fields=['expires_at'], name='otp_expires_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:04
+
+from django.db import migrations, models
+
+
+def create_search_indexes(apps, schema_editor):
+    from users.api.admin_filters import create_search_indexes
+    create_search_indexes(schema_editor.connection)
+
+
+def drop_search_indexes(apps, schema_editor):
+    from users.api.admin_filters import drop_search_indexes
+    drop_search_indexes(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0007_otp_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['-created_at', 'id'], name='user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['user_type', '-created_at', 'id'], name='user_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['buyer_category', '-created_at', 'id'], name='user_buyer_cat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(condition=models.Q(('is_active', False)), fields=['-created_at', 'id'], name='user_inactive_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(condition=models.Q(('is_profile_complete', False)), fields=['-created_at', 'id'], name='user_incomplete_created_idx'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
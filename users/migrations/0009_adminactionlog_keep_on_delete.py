@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_admin_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='adminactionlog',
+            name='action',
+            field=models.CharField(choices=[('view', 'View'), ('suspend', 'Suspend'), ('reactivate', 'Reactivate'), ('delete', 'Delete'), ('other', 'Other')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='adminactionlog',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='admin_logs', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
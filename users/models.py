@@ -5,6 +5,8 @@ from datetime import timedelta
 import random
 import string
 
+from . import geo
+
 class CustomUser(AbstractUser):
     USER_TYPE_CHOICES = [
         ('smart_seller', 'Smart Seller (Farmer)'),
@@ -63,6 +65,8 @@ class CustomUser(AbstractUser):
     # Location coordinates
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    # Derived from latitude/longitude on save, used for radius lookups
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -70,6 +74,28 @@ class CustomUser(AbstractUser):
     
     USERNAME_FIELD = 'id'  # Changed temporarily for migration compatibility
     REQUIRED_FIELDS = []  # Temporarily empty for migration
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Seller lookups by location for "near me" product discovery
+            models.Index(fields=['user_type', 'geohash'], name='user_type_geohash_idx'),
+            # Admin user list: keyset order (-created_at, id), alone or behind
+            # its most selective filters
+            models.Index(fields=['-created_at', 'id'], name='user_created_idx'),
+            models.Index(fields=['user_type', '-created_at', 'id'], name='user_type_created_idx'),
+            models.Index(fields=['buyer_category', '-created_at', 'id'], name='user_buyer_cat_created_idx'),
+            # Suspended users and unfinished profiles are a small minority
+            models.Index(
+                fields=['-created_at', 'id'],
+                condition=models.Q(is_active=False),
+                name='user_inactive_created_idx',
+            ),
+            models.Index(
+                fields=['-created_at', 'id'],
+                condition=models.Q(is_profile_complete=False),
+                name='user_incomplete_created_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.full_name} ({self.get_identifier()})"
@@ -117,6 +143,14 @@ class CustomUser(AbstractUser):
             not (self.user_type == 'smart_buyer' and not self.buyer_category)
         ])
         
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        
         super().save(*args, **kwargs)
 
 
@@ -129,6 +163,15 @@ class OTP(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Verification / login lookup, newest first
+            models.Index(
+                fields=['mobile_number', 'otp_code', 'is_verified', '-created_at'],
+                name='otp_verify_lookup_idx',
+            ),
+            # Expiry purge
+            models.Index(fields=['expires_at'], name='otp_expires_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.otp_code:
@@ -180,12 +223,14 @@ class AdminActionLog(models.Model):
     ACTION_CHOICES = [
         ('view', 'View'),
         ('suspend', 'Suspend'),
+        ('reactivate', 'Reactivate'),
         ('delete', 'Delete'),
         ('other', 'Other'),
     ]
 
     admin_username = models.CharField(max_length=150, null=True, blank=True)
-    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='admin_logs')
+    # Kept (detached) when the user is deleted so the audit trail survives
+    user = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name='admin_logs')
     action = models.CharField(max_length=20, choices=ACTION_CHOICES)
     details = models.TextField(blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -194,4 +239,99 @@ class AdminActionLog(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"{self.action} by {self.admin_username} on {self.user.get_identifier()} at {self.created_at}"
+        target = self.user.get_identifier() if self.user else 'deleted user'
+        return f"{self.action} by {self.admin_username} on {target} at {self.created_at}"
+
+
+class UserStatistic(models.Model):
+    """Materialized counter behind the public statistics endpoint.
+
+    One row per statistic, kept current by signals on CustomUser (see
+    ``users.stats``) and corrected by the ``reconcile_user_statistics``
+    command.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class SMSOutbox(models.Model):
+    """Outgoing SMS waiting for the ``send_sms_outbox`` worker.
+
+    Rows are written in the same transaction as whatever they announce (e.g.
+    the OTP), so a message is queued exactly when its data is committed.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    mobile_number = models.CharField(max_length=15)
+    template = models.CharField(max_length=30, default='otp')
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # When the row may next be picked up; also the lease expiry while sending
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='sms_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.template} SMS to {self.mobile_number} ({self.status})"
+
+
+class UserDeletionJob(models.Model):
+    """A user account being deleted in the background.
+
+    Scheduling deactivates the account and hides its products at once; the
+    ``process_user_deletions`` worker then removes its dependents in bounded
+    chunks, recording progress per step, and finally the user row.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    # Plain ids: the job outlives the user it deletes
+    user_id = models.IntegerField(unique=True)
+    user_identifier = models.CharField(max_length=255, blank=True, default='')
+    requested_by = models.CharField(max_length=150, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    step = models.CharField(max_length=30, blank=True, default='')
+    # Rows (and files) removed so far, per step
+    progress = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # When the job may next be picked up; also the lease expiry while running
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='user_deletion_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Deletion of user {self.user_id} ({self.status})"
@@ -0,0 +1,72 @@
+"""OTP issuing and housekeeping.
+
+Repeat requests for the same number inside ``OTP_RESEND_WINDOW_SECONDS``
+reuse the live OTP (no new row, no new SMS). Expired and consumed rows are
+removed in small batches by ``manage.py purge_expired_otps`` so the table,
+and the verification index, stay small.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OTP, SMSOutbox
+from . import sms
+
+
+def issue_otp(mobile_number):
+    """Return ``(otp, created)``, queueing an SMS only for a new OTP"""
+    now = timezone.now()
+    window = timedelta(seconds=getattr(settings, 'OTP_RESEND_WINDOW_SECONDS', 60))
+    live = OTP.objects.filter(
+        mobile_number=mobile_number,
+        is_verified=False,
+        created_at__gte=now - window,
+        expires_at__gt=now,
+    ).order_by('-created_at').first()
+    if live is not None:
+        return live, False
+
+    with transaction.atomic():
+        otp = OTP.objects.create(mobile_number=mobile_number)
+        sms.enqueue_otp(mobile_number, otp.otp_code)
+    return otp, True
+
+
+def delete_in_batches(queryset, batch_size):
+    """Delete ``queryset`` a batch of primary keys at a time; return the count.
+
+    Short transactions keep locks brief while a large backlog is cleared.
+    """
+    model = queryset.model
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        count, _ = model.objects.filter(pk__in=ids).delete()
+        deleted += count
+
+
+def purge_otps(batch_size=None, grace=None):
+    """Remove OTPs that expired more than ``grace`` ago or were already used"""
+    batch_size = batch_size or getattr(settings, 'OTP_PURGE_BATCH_SIZE', 1000)
+    if grace is None:
+        grace = timedelta(minutes=getattr(settings, 'OTP_PURGE_GRACE_MINUTES', 10))
+    cutoff = timezone.now() - grace
+    expired = delete_in_batches(OTP.objects.filter(expires_at__lt=cutoff), batch_size)
+    verified = delete_in_batches(OTP.objects.filter(is_verified=True), batch_size)
+    return expired + verified
+
+
+def purge_outbox(batch_size=None, retention=None):
+    """Remove delivered or abandoned SMS (they carry OTP codes) after ``retention``"""
+    batch_size = batch_size or getattr(settings, 'OTP_PURGE_BATCH_SIZE', 1000)
+    if retention is None:
+        retention = timedelta(hours=getattr(settings, 'SMS_OUTBOX_RETENTION_HOURS', 24))
+    finished = SMSOutbox.objects.filter(
+        status__in=[SMSOutbox.STATUS_SENT, SMSOutbox.STATUS_FAILED],
+        created_at__lt=timezone.now() - retention,
+    )
+    return delete_in_batches(finished, batch_size)
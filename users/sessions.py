@@ -0,0 +1,128 @@
+"""Session tokens: random (database-checked) or signed (stateless).
+
+``SESSION_TOKEN_MODE = 'signed'`` issues tokens produced by
+``django.core.signing`` that carry the session id, user id, issue time and
+expiry, so verifying one is an HMAC check with no database access. The
+``UserSession`` row is still written, for auditing only.
+
+Revocation goes through the auth cache instead of the database:
+
+* ``auth:revoked:<session id>`` denylists one session until it would have
+  expired anyway, so the list never grows beyond live tokens;
+* ``auth:not_before:<user id>`` rejects every token issued earlier, which is
+  how a new login ends the user's other sessions. It holds an
+  ``(issued_at, session id)`` pair so two logins in the same millisecond
+  are still ordered.
+
+Both need a cache shared by all processes and not subject to eviction
+(Redis with ``maxmemory-policy noeviction``) wherever signed tokens are
+enabled; system check ``users.E001`` rejects a LocMem or dummy auth cache.
+"""
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+from .models import UserSession
+from .authentication import get_cache
+
+
+SALT = 'users.sessions'
+
+SignedSession = namedtuple('SignedSession', 'session_id user_id issued_at expires_at')
+
+
+def is_signed_mode():
+    return getattr(settings, 'SESSION_TOKEN_MODE', 'random') == 'signed'
+
+
+def is_signed_token(token):
+    # Random tokens are plain alphanumerics; signed ones contain the separator
+    return ':' in token
+
+
+def revoked_key(session_id):
+    return f'auth:revoked:{session_id}'
+
+
+def not_before_key(user_id):
+    return f'auth:not_before:{user_id}'
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def start_session(user, end_others=True):
+    """Open a session for ``user`` and return its token.
+
+    With ``end_others`` the user's earlier sessions stop working: random
+    tokens are deactivated in bulk, signed ones by moving the not-before mark.
+    """
+    if not is_signed_mode():
+        if end_others:
+            UserSession.objects.filter(user=user, is_active=True).update(is_active=False)
+        return UserSession.objects.create(user=user).session_token
+
+    lifetime = timedelta(days=getattr(settings, 'SESSION_TOKEN_LIFETIME_DAYS', 30))
+    issued_at = _now_ms()
+    session = UserSession.objects.create(user=user, expires_at=timezone.now() + lifetime)
+    if end_others:
+        get_cache().set(not_before_key(user.pk), (issued_at, session.pk), int(lifetime.total_seconds()))
+    token = signing.dumps({
+        'sid': session.pk,
+        'uid': user.pk,
+        'iat': issued_at,
+        'exp': int(session.expires_at.timestamp()),
+    }, salt=SALT)
+    # Stored for the audit trail; never read back for verification
+    session.session_token = token
+    session.save(update_fields=['session_token'])
+    return token
+
+
+def verify_signed_token(token):
+    """Return the SignedSession for a valid, unrevoked token, else None.
+
+    Only the signature and two cache keys are checked.
+    """
+    try:
+        claims = signing.loads(token, salt=SALT)
+        session = SignedSession(claims['sid'], claims['uid'], claims['iat'], claims['exp'])
+    except (signing.BadSignature, KeyError, TypeError):
+        return None
+    if session.expires_at <= time.time():
+        return None
+
+    state = get_cache().get_many([revoked_key(session.session_id), not_before_key(session.user_id)])
+    if revoked_key(session.session_id) in state:
+        return None
+    not_before = state.get(not_before_key(session.user_id))
+    if not_before is not None and (session.issued_at, session.session_id) < tuple(not_before):
+        return None
+    return session
+
+
+def revoke(session):
+    """Denylist one signed session for the rest of its lifetime"""
+    remaining = int(session.expires_at - time.time())
+    if remaining > 0:
+        get_cache().set(revoked_key(session.session_id), 1, remaining)
+    UserSession.objects.filter(pk=session.session_id).update(is_active=False)
+
+
+def revoke_all(user_id):
+    """End every signed session of a user issued up to now"""
+    revoke_all_many([user_id])
+
+
+def revoke_all_many(user_ids):
+    """``revoke_all`` for several users with a single cache write"""
+    lifetime = timedelta(days=getattr(settings, 'SESSION_TOKEN_LIFETIME_DAYS', 30))
+    not_before = (_now_ms() + 1, 0)
+    get_cache().set_many(
+        {not_before_key(user_id): not_before for user_id in user_ids}, int(lifetime.total_seconds())
+    )
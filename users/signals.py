@@ -0,0 +1,65 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .models import CustomUser, UserSession
+from . import authentication
+from . import stats
+
+
+def _tracked_values(user, update_fields=None, previous=None):
+    """Values of the tracked fields as they will be stored after this save"""
+    values = {}
+    for field in stats.TRACKED_FIELDS:
+        if update_fields is None or field in update_fields or previous is None:
+            values[field] = getattr(user, field)
+        else:
+            values[field] = previous[field]
+    return values
+
+
+@receiver(pre_save, sender=CustomUser)
+def remember_statistics_buckets(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Capture the stored values the materialized counters currently reflect"""
+    instance._statistics_previous = None
+    if raw or not stats.is_materialized():
+        return
+    if update_fields is not None and not set(update_fields) & set(stats.TRACKED_FIELDS):
+        return
+    if instance._state.adding:
+        instance._statistics_previous = {}
+        return
+    instance._statistics_previous = (
+        CustomUser.objects.filter(pk=instance.pk).values(*stats.TRACKED_FIELDS).first() or {}
+    )
+
+
+@receiver(post_save, sender=CustomUser)
+def update_statistics_on_save(sender, instance, update_fields=None, **kwargs):
+    previous = getattr(instance, '_statistics_previous', None)
+    if previous is None:
+        return
+    instance._statistics_previous = None
+    old = stats.buckets(**previous) if previous else set()
+    new = stats.buckets(**_tracked_values(instance, update_fields, previous or None))
+    stats.apply_delta(added=new - old, removed=old - new)
+
+
+@receiver(post_delete, sender=CustomUser)
+def update_statistics_on_delete(sender, instance, **kwargs):
+    if stats.is_materialized():
+        stats.apply_delta(removed=stats.user_buckets(instance))
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_auth(sender, instance, **kwargs):
+    """Profile edits, suspension and deletion must reach cached credentials"""
+    authentication.invalidate_user(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+@receiver(post_save, sender=UserSession)
+@receiver(post_delete, sender=UserSession)
+def invalidate_cached_credential(sender, instance, **kwargs):
+    authentication.invalidate_user(instance.user_id)
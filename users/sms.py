@@ -0,0 +1,220 @@
+"""SMS outbox and delivery providers.
+
+Views only call ``enqueue_otp`` inside their transaction; the
+``send_sms_outbox`` management command drains due rows through a provider
+with bounded concurrency, retrying transient failures with exponential
+backoff. ``SMS_PROVIDER`` selects ``'msg91'`` (default), ``'fake'`` (records
+messages in memory, for tests and load runs) or a dotted path to a provider
+class.
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from kissanmart.imports import lazy_import
+from .models import SMSOutbox
+
+
+logger = logging.getLogger(__name__)
+
+# Only the delivery worker talks to providers; views merely enqueue
+requests = lazy_import('requests')
+http_client = lazy_import('users.http_client')
+
+
+class SendResult:
+    def __init__(self, ok, error='', retryable=False):
+        self.ok = ok
+        self.error = error
+        self.retryable = retryable
+
+
+def normalize_number(mobile_number):
+    """MSG91 expects the country code without '+'; bare 10-digit numbers are Indian"""
+    cleaned = mobile_number[1:] if mobile_number.startswith('+') else mobile_number
+    if len(cleaned) == 10:
+        cleaned = '91' + cleaned
+    return cleaned
+
+
+class MSG91Provider:
+    """MSG91 flow API through the shared pooled ``msg91`` HTTP client"""
+
+    def __init__(self, pool_size=None):
+        pool_size = pool_size or getattr(settings, 'SMS_OUTBOX_CONCURRENCY', 4)
+        self.url = getattr(settings, 'OTP_URL', 'https://control.msg91.com/api/v5/flow/')
+        self.flow_id = getattr(settings, 'OTP_FLOW_ID', None)
+        self.sender = getattr(settings, 'OTP_SENDER_ID', None)
+        self.headers = {'authkey': getattr(settings, 'OTP_AUTH_KEY', None) or ''}
+        self.client = http_client.get_client('msg91', pool_size=pool_size)
+
+    def send(self, mobile_number, template, payload):
+        body = {
+            'flow_id': self.flow_id,
+            'sender': self.sender,
+            'mobiles': normalize_number(mobile_number),
+            'var1': payload.get('otp_code'),
+        }
+        try:
+            resp = self.client.post(self.url, json=body, headers=self.headers)
+        except requests.RequestException as e:
+            # Includes CircuitOpenError: the breaker lets calls through again later
+            return SendResult(False, f'{type(e).__name__}: {e}', retryable=True)
+
+        if resp.status_code in (200, 201):
+            return SendResult(True)
+        error = f'MSG91 {resp.status_code}: {resp.text[:500]}'
+        # Throttling and provider errors are worth retrying; bad requests are not
+        return SendResult(False, error, retryable=resp.status_code == 429 or resp.status_code >= 500)
+
+    def close(self):
+        # The pooled client is shared by the whole process
+        pass
+
+
+class FakeProvider:
+    """Stores messages instead of sending them.
+
+    ``SMS_FAKE_LATENCY_MS`` and ``SMS_FAKE_FAILURE_RATE`` simulate a slow or
+    flaky provider for load runs.
+    """
+    sent = []
+    _lock = threading.Lock()
+
+    def __init__(self, pool_size=None):
+        self.latency = getattr(settings, 'SMS_FAKE_LATENCY_MS', 0) / 1000
+        self.failure_rate = getattr(settings, 'SMS_FAKE_FAILURE_RATE', 0)
+
+    def send(self, mobile_number, template, payload):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            return SendResult(False, 'Simulated provider failure', retryable=True)
+        with self._lock:
+            self.sent.append({'mobile_number': mobile_number, 'template': template, 'payload': payload})
+        return SendResult(True)
+
+    def close(self):
+        pass
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls.sent.clear()
+
+
+PROVIDERS = {
+    'msg91': MSG91Provider,
+    'fake': FakeProvider,
+}
+
+
+def get_provider(pool_size=None):
+    name = getattr(settings, 'SMS_PROVIDER', 'msg91')
+    provider_class = PROVIDERS.get(name) or import_string(name)
+    return provider_class(pool_size=pool_size)
+
+
+def enqueue_otp(mobile_number, otp_code):
+    """Queue an OTP message; call inside the transaction that creates the OTP"""
+    return SMSOutbox.objects.create(
+        mobile_number=mobile_number,
+        template='otp',
+        payload={'otp_code': otp_code},
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter for the ``attempts``-th failure"""
+    base = getattr(settings, 'SMS_OUTBOX_RETRY_BASE_SECONDS', 2)
+    cap = getattr(settings, 'SMS_OUTBOX_RETRY_MAX_SECONDS', 300)
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def claim_batch(limit):
+    """Lease up to ``limit`` due messages to this worker.
+
+    Rows stuck in 'sending' past their lease (a crashed worker) are due
+    again. ``skip_locked`` lets several workers claim concurrently where the
+    database supports it.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'SMS_OUTBOX_LEASE_SECONDS', 60))
+    with transaction.atomic():
+        messages = list(
+            SMSOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status__in=[SMSOutbox.STATUS_PENDING, SMSOutbox.STATUS_SENDING], next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:limit]
+        )
+        if messages:
+            SMSOutbox.objects.filter(pk__in=[message.pk for message in messages]).update(
+                status=SMSOutbox.STATUS_SENDING, next_attempt_at=now + lease
+            )
+    return messages
+
+
+def record_result(message, result):
+    max_attempts = getattr(settings, 'SMS_OUTBOX_MAX_ATTEMPTS', 5)
+    message.attempts += 1
+    if result.ok:
+        message.status = SMSOutbox.STATUS_SENT
+        message.sent_at = timezone.now()
+        message.last_error = ''
+    elif result.retryable and message.attempts < max_attempts:
+        message.status = SMSOutbox.STATUS_PENDING
+        message.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(message.attempts))
+        message.last_error = result.error
+    else:
+        message.status = SMSOutbox.STATUS_FAILED
+        message.last_error = result.error
+        logger.error('Giving up on SMS %s to %s: %s', message.pk, message.mobile_number, result.error)
+    message.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+
+
+def _send(provider, message):
+    try:
+        return provider.send(message.mobile_number, message.template, message.payload)
+    except Exception as e:
+        logger.exception('SMS provider crashed on message %s', message.pk)
+        return SendResult(False, f'{type(e).__name__}: {e}', retryable=True)
+
+
+def drain(provider=None, batch_size=None, concurrency=None, max_batches=None):
+    """Send due messages until none are left; return ``(sent, failed_attempts)``.
+
+    Provider calls run on ``concurrency`` threads sharing one connection
+    pool; results are written back from the calling thread.
+    """
+    batch_size = batch_size or getattr(settings, 'SMS_OUTBOX_BATCH_SIZE', 50)
+    concurrency = concurrency or getattr(settings, 'SMS_OUTBOX_CONCURRENCY', 4)
+    owns_provider = provider is None
+    provider = provider or get_provider(pool_size=concurrency)
+
+    sent = failed = batches = 0
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='sms-outbox') as executor:
+            while max_batches is None or batches < max_batches:
+                messages = claim_batch(batch_size)
+                if not messages:
+                    break
+                batches += 1
+                results = executor.map(lambda message: _send(provider, message), messages)
+                for message, result in zip(messages, results):
+                    record_result(message, result)
+                    if result.ok:
+                        sent += 1
+                    else:
+                        failed += 1
+    finally:
+        if owns_provider:
+            provider.close()
+    return sent, failed
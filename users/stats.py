@@ -0,0 +1,119 @@
+"""User statistics: one conditional aggregate, optionally materialized.
+
+``compute_statistics`` counts everything in a single query. With
+``USER_STATISTICS_MATERIALIZED`` enabled the endpoint instead reads the
+``UserStatistic`` counter rows, which the CustomUser signals adjust by the
+difference between a user's old and new buckets on every save and delete.
+Writes that bypass signals (``QuerySet.update``, raw SQL) are corrected by
+``reconcile`` / ``manage.py reconcile_user_statistics``.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+
+# Counter name -> condition a user must meet to be counted
+STATISTICS = {
+    'total_users': Q(),
+    'smart_sellers': Q(user_type='smart_seller'),
+    'smart_buyers': Q(user_type='smart_buyer'),
+    'verified_users': Q(is_mobile_verified=True),
+    'complete_profiles': Q(is_profile_complete=True),
+    'mandi_owners': Q(user_type='smart_buyer', buyer_category='mandi_owner'),
+    'shopkeepers': Q(user_type='smart_buyer', buyer_category='shopkeeper'),
+    'communities': Q(user_type='smart_buyer', buyer_category='community'),
+}
+# Fields the conditions read; saves touching none of them cannot move a counter
+TRACKED_FIELDS = ('user_type', 'buyer_category', 'is_mobile_verified', 'is_profile_complete')
+
+
+def is_materialized():
+    return getattr(settings, 'USER_STATISTICS_MATERIALIZED', True)
+
+
+def compute_statistics(queryset=None):
+    """Return every counter from a single aggregate query"""
+    from .models import CustomUser
+
+    queryset = CustomUser.objects.all() if queryset is None else queryset
+    return queryset.aggregate(**{
+        name: Count('pk', filter=condition) if condition else Count('pk')
+        for name, condition in STATISTICS.items()
+    })
+
+
+def buckets(user_type, buyer_category, is_mobile_verified, is_profile_complete):
+    """Return the counter names a user with these values contributes to"""
+    names = {'total_users'}
+    if user_type == 'smart_seller':
+        names.add('smart_sellers')
+    elif user_type == 'smart_buyer':
+        names.add('smart_buyers')
+        category_counter = {
+            'mandi_owner': 'mandi_owners',
+            'shopkeeper': 'shopkeepers',
+            'community': 'communities',
+        }.get(buyer_category)
+        if category_counter:
+            names.add(category_counter)
+    if is_mobile_verified:
+        names.add('verified_users')
+    if is_profile_complete:
+        names.add('complete_profiles')
+    return names
+
+
+def user_buckets(user):
+    return buckets(*(getattr(user, field) for field in TRACKED_FIELDS))
+
+
+def apply_delta(added=(), removed=()):
+    """Increment ``added`` and decrement ``removed`` counters in place"""
+    from .models import UserStatistic
+
+    if added:
+        UserStatistic.objects.filter(name__in=added).update(value=F('value') + 1)
+    if removed:
+        UserStatistic.objects.filter(name__in=removed).update(value=F('value') - 1)
+
+
+def get_statistics():
+    """Return the counters, from the materialized rows when enabled"""
+    from .models import UserStatistic
+
+    if not is_materialized():
+        return compute_statistics()
+    stats = dict(UserStatistic.objects.values_list('name', 'value'))
+    if set(stats) != set(STATISTICS):
+        # Table not seeded yet (or a counter was added): build it now
+        return reconcile()
+    return stats
+
+
+def reconcile():
+    """Recompute every counter and overwrite the materialized rows"""
+    from .models import UserStatistic
+
+    with transaction.atomic():
+        # Lock the counter rows so concurrent signal updates queue behind us
+        list(UserStatistic.objects.select_for_update().values_list('name'))
+        stats = compute_statistics()
+        for name, value in stats.items():
+            UserStatistic.objects.update_or_create(name=name, defaults={'value': value})
+    return stats
+
+
+def format_statistics(stats):
+    """Shape the counters like the original ``statistics`` response"""
+    return {
+        'total_users': stats['total_users'],
+        'smart_sellers': stats['smart_sellers'],
+        'smart_buyers': stats['smart_buyers'],
+        'verified_users': stats['verified_users'],
+        'complete_profiles': stats['complete_profiles'],
+        'buyer_breakdown': {
+            'mandi_owners': stats['mandi_owners'],
+            'shopkeepers': stats['shopkeepers'],
+            'communities': stats['communities']
+        }
+    }
@@ -1,3 +1,1498 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import requests
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from kissanmart import perf
+from kissanmart.nplusone import NPlusOneMixin
+
+from . import admin_actions
+from . import authentication
+from . import checks as user_checks
+from . import deletion
+from . import exports
+from . import geo
+from . import google_identity
+from . import http_client
+from . import otp as otp_lifecycle
+from . import sessions
+from . import sms
+from . import stats
+from .api.serializers_new import UserListSerializer
+from .models import AdminActionLog, CustomUser, OTP, SMSOutbox, UserDeletionJob, UserSession, UserStatistic
+
+
+class StubServer:
+    """Local HTTP server standing in for a third-party provider.
+
+    Append ``(status, body)`` or ``(status, body, delay_seconds)`` to
+    ``responses``; each request consumes one (200 once they run out).
+    ``headers`` are added to every response.
+    """
+
+    def __init__(self):
+        self.responses = []
+        self.requests = []
+        self.headers = {}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def handle_request(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                stub.requests.append({
+                    'method': self.command,
+                    'path': self.path,
+                    'port': self.client_address[1],
+                    'body': self.rfile.read(length).decode(),
+                })
+                status_code, body, *delay = stub.responses.pop(0) if stub.responses else (200, '{}')
+                if delay:
+                    time.sleep(delay[0])
+                payload = body.encode()
+                self.send_response(status_code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in stub.headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = handle_request
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, path='/'):
+        return f'http://127.0.0.1:{self.server.server_address[1]}{path}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class GeoTests(TestCase):
+    """Geohash cover and distance helpers behind "near me" lookups"""
+
+    def test_encode_matches_reference(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(geo.encode(18.5204, 73.8567, 5), 'tek92')
+
+    def test_cover_contains_every_point_in_box(self):
+        for radius_km in (0.5, 5, 40, 180):
+            box = geo.bounding_box(18.5204, 73.8567, radius_km)
+            cells = geo.covering_cells(box)
+            self.assertLessEqual(len(cells), geo.MAX_COVER_CELLS)
+            min_lat, max_lat, min_lon, max_lon = box
+            for i in range(11):
+                for j in range(11):
+                    point_hash = geo.encode(
+                        min_lat + (max_lat - min_lat) * i / 10, min_lon + (max_lon - min_lon) * j / 10
+                    )
+                    self.assertTrue(any(point_hash.startswith(cell) for cell in cells), (radius_km, point_hash))
+
+    def test_haversine(self):
+        # Pune to Mumbai
+        self.assertAlmostEqual(geo.haversine_km(18.5204, 73.8567, 19.0760, 72.8777), 119.8, delta=1)
+        self.assertEqual(geo.haversine_km(18.5, 73.8, 18.5, 73.8), 0)
+
+    def test_user_save_keeps_geohash_in_step(self):
+        user = CustomUser.objects.create(mobile_number='9876500061', latitude='18.520400', longitude='73.856700')
+        self.assertEqual(user.geohash, geo.encode(18.5204, 73.8567))
+
+        user.latitude, user.longitude = '19.076000', '72.877700'
+        user.save(update_fields=['latitude', 'longitude'])
+        user.refresh_from_db()
+        self.assertEqual(user.geohash, geo.encode(19.076, 72.8777))
+
+        user.latitude = None
+        user.save()
+        self.assertEqual(user.geohash, '')
+
+    def test_find_nearby_users(self):
+        pune = CustomUser.objects.create(mobile_number='9876500062', latitude='18.520400', longitude='73.856700')
+        mumbai = CustomUser.objects.create(mobile_number='9876500063', latitude='19.076000', longitude='72.877700')
+        CustomUser.objects.create(mobile_number='9876500064', latitude='28.613900', longitude='77.209000')
+
+        nearby = geo.find_nearby_users(CustomUser.objects.all(), 18.53, 73.85, 150)
+        self.assertEqual(set(nearby), {pune.id, mumbai.id})
+        self.assertLess(nearby[pune.id], 2)
+        self.assertEqual(set(geo.find_nearby_users(CustomUser.objects.all(), 18.53, 73.85, 10)), {pune.id})
+
+
+class UserStatisticsTests(TestCase):
+    """``statistics`` is served from counters that track every user write"""
+
+    def setUp(self):
+        self.url = reverse('users:statistics')
+
+    def make_users(self):
+        CustomUser.objects.create(mobile_number='9876500081', user_type='smart_seller', is_mobile_verified=True)
+        CustomUser.objects.create(mobile_number='9876500082', user_type='smart_buyer', buyer_category='shopkeeper')
+        CustomUser.objects.create(mobile_number='9876500083', user_type='smart_buyer', buyer_category='community')
+        return CustomUser.objects.create(mobile_number='9876500084')
+
+    def test_single_aggregate_query(self):
+        self.make_users()
+        with self.assertNumQueries(1):
+            computed = stats.compute_statistics()
+        self.assertEqual(computed['total_users'], 4)
+        self.assertEqual(computed['smart_buyers'], 2)
+        self.assertEqual(computed['communities'], 1)
+
+    def test_counters_follow_saves_and_deletes(self):
+        user = self.make_users()
+        self.assertEqual(stats.get_statistics(), stats.compute_statistics())
+
+        user.user_type, user.buyer_category = 'smart_buyer', 'mandi_owner'
+        user.save()
+        verified = CustomUser.objects.get(mobile_number='9876500081')
+        verified.is_mobile_verified = False
+        verified.save(update_fields=['is_mobile_verified'])
+        CustomUser.objects.get(mobile_number='9876500083').delete()
+        # Saves that touch no counted field skip the bookkeeping entirely
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+
+        self.assertEqual(stats.get_statistics(), stats.compute_statistics())
+        self.assertEqual(stats.get_statistics()['mandi_owners'], 1)
+
+    def test_endpoint_reads_counters(self):
+        self.make_users()
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        data = response.json()['statistics']
+        self.assertEqual(data['total_users'], 4)
+        self.assertEqual(data['buyer_breakdown'], {'mandi_owners': 0, 'shopkeepers': 1, 'communities': 1})
+
+    def test_reconcile_command_fixes_drift(self):
+        self.make_users()
+        # update() bypasses signals, so the counters drift until reconciled
+        CustomUser.objects.filter(user_type='smart_seller').update(user_type='smart_buyer', buyer_category='community')
+        self.assertNotEqual(stats.get_statistics(), stats.compute_statistics())
+
+        out = io.StringIO()
+        call_command('reconcile_user_statistics', stdout=out)
+        self.assertIn('smart_sellers -1', out.getvalue())
+        self.assertEqual(stats.get_statistics(), stats.compute_statistics())
+
+    @override_settings(USER_STATISTICS_MATERIALIZED=False)
+    def test_aggregate_mode(self):
+        self.make_users()
+        UserStatistic.objects.all().delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()['statistics']['smart_sellers'], 1)
+        self.assertFalse(UserStatistic.objects.exists())
+
+
+@override_settings(SMS_PROVIDER='fake', SMS_FAKE_LATENCY_MS=0, SMS_FAKE_FAILURE_RATE=0)
+class SMSOutboxTests(TestCase):
+    """OTP requests only queue an SMS; ``send_sms_outbox`` delivers it"""
+
+    def setUp(self):
+        sms.FakeProvider.reset()
+        http_client.reset_clients()
+
+    def test_send_otp_queues_message(self):
+        response = self.client.post(reverse('users:send_otp'), {'mobile_number': '+919876543210'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('queued', response.json()['message'])
+        self.assertEqual(sms.FakeProvider.sent, [])
+
+        message = SMSOutbox.objects.get()
+        otp = OTP.objects.get(mobile_number='9876543210')
+        self.assertEqual(message.payload, {'otp_code': otp.otp_code})
+        self.assertEqual(message.status, SMSOutbox.STATUS_PENDING)
+
+        call_command('send_sms_outbox', '--once', stdout=io.StringIO())
+        message.refresh_from_db()
+        self.assertEqual(message.status, SMSOutbox.STATUS_SENT)
+        self.assertEqual(sms.FakeProvider.sent[0]['payload']['otp_code'], otp.otp_code)
+
+    def test_drain_sends_everything_due(self):
+        for i in range(7):
+            sms.enqueue_otp(f'98765000{i:02d}', '123456')
+        sms.enqueue_otp('9876500099', '654321')
+        SMSOutbox.objects.filter(mobile_number='9876500099').update(next_attempt_at=timezone.now() + timedelta(minutes=5))
+
+        self.assertEqual(sms.drain(batch_size=3, concurrency=2), (7, 0))
+        self.assertEqual(len(sms.FakeProvider.sent), 7)
+        self.assertEqual(SMSOutbox.objects.filter(status=SMSOutbox.STATUS_PENDING).count(), 1)
+
+    def test_retries_with_backoff_then_gives_up(self):
+        message = sms.enqueue_otp('9876543210', '123456')
+        provider = mock.Mock()
+        provider.send.return_value = sms.SendResult(False, 'MSG91 503: busy', retryable=True)
+
+        with self.settings(SMS_OUTBOX_MAX_ATTEMPTS=2, SMS_OUTBOX_RETRY_BASE_SECONDS=10):
+            self.assertEqual(sms.drain(provider=provider), (0, 1))
+            message.refresh_from_db()
+            self.assertEqual((message.status, message.attempts), (SMSOutbox.STATUS_PENDING, 1))
+            self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=4))
+
+            # Not due yet
+            self.assertEqual(sms.drain(provider=provider), (0, 0))
+
+            SMSOutbox.objects.update(next_attempt_at=timezone.now())
+            with self.assertLogs('users.sms', 'ERROR'):
+                sms.drain(provider=provider)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (SMSOutbox.STATUS_FAILED, 2))
+        self.assertEqual(message.last_error, 'MSG91 503: busy')
+
+    def test_expired_lease_is_reclaimed(self):
+        message = sms.enqueue_otp('9876543210', '123456')
+        SMSOutbox.objects.update(status=SMSOutbox.STATUS_SENDING, next_attempt_at=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(sms.drain(), (0, 0))
+
+        # The worker holding the lease died
+        SMSOutbox.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(sms.drain(), (1, 0))
+        message.refresh_from_db()
+        self.assertEqual(message.status, SMSOutbox.STATUS_SENT)
+
+    def test_msg91_provider_classifies_errors(self):
+        with StubServer() as stub, self.settings(OTP_URL=stub.url('/flow/')):
+            provider = sms.MSG91Provider(pool_size=2)
+            stub.responses += [(503, 'busy'), (400, 'bad flow'), (200, '{"type": "success"}')]
+            self.assertTrue(provider.send('9876543210', 'otp', {'otp_code': '1'}).retryable)
+            self.assertFalse(provider.send('9876543210', 'otp', {'otp_code': '1'}).retryable)
+            self.assertTrue(provider.send('+919876543210', 'otp', {'otp_code': '1'}).ok)
+        self.assertEqual(json.loads(stub.requests[-1]['body'])['mobiles'], '919876543210')
+
+
+@override_settings(SMS_PROVIDER='fake')
+class OTPLifecycleTests(TestCase):
+    """Resend coalescing, expiry purge and the indexed verification lookup"""
+
+    def test_repeat_requests_reuse_live_otp(self):
+        url = reverse('users:send_otp')
+        for _ in range(3):
+            self.assertEqual(self.client.post(url, {'mobile_number': '+919876543210'}).status_code, 200)
+        self.assertEqual(OTP.objects.count(), 1)
+        self.assertEqual(SMSOutbox.objects.count(), 1)
+
+        # Outside the window a fresh OTP (and SMS) is issued
+        OTP.objects.update(created_at=timezone.now() - timedelta(minutes=2))
+        otp_instance, created = otp_lifecycle.issue_otp('9876543210')
+        self.assertTrue(created)
+        self.assertEqual(SMSOutbox.objects.count(), 2)
+
+    def test_purge_removes_only_dead_rows(self):
+        now = timezone.now()
+        live = OTP.objects.create(mobile_number='9876543210')
+        recently_expired = OTP.objects.create(mobile_number='9876543211', expires_at=now - timedelta(minutes=1))
+        for i in range(5):
+            OTP.objects.create(mobile_number=f'98765432{i:02d}', expires_at=now - timedelta(hours=1))
+        OTP.objects.create(mobile_number='9876543299', is_verified=True)
+
+        self.assertEqual(otp_lifecycle.purge_otps(batch_size=2), 6)
+        self.assertEqual(set(OTP.objects.values_list('pk', flat=True)), {live.pk, recently_expired.pk})
+
+    def test_purge_command_clears_finished_outbox(self):
+        old = timezone.now() - timedelta(days=2)
+        sms.enqueue_otp('9876543210', '111111')
+        sms.enqueue_otp('9876543211', '222222')
+        SMSOutbox.objects.filter(mobile_number='9876543210').update(status=SMSOutbox.STATUS_SENT)
+        SMSOutbox.objects.update(created_at=old)
+
+        out = io.StringIO()
+        call_command('purge_expired_otps', stdout=out)
+        self.assertIn('1 outbox messages', out.getvalue())
+        # Undelivered messages are never dropped
+        self.assertEqual(list(SMSOutbox.objects.values_list('mobile_number', flat=True)), ['9876543211'])
+
+    def test_verification_lookup_uses_index(self):
+        queryset = OTP.objects.filter(
+            mobile_number='9876543210', otp_code='123456', is_verified=False
+        ).order_by('-created_at')
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            prefix = 'EXPLAIN ' if connection.vendor == 'postgresql' else 'EXPLAIN QUERY PLAN '
+            cursor.execute(prefix + sql, params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('otp_verify_lookup_idx', plan)
+
+
+class CachedAuthenticationTests(TestCase):
+    """Token / session-token auth is served from the credential cache"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = CustomUser.objects.create(
+            mobile_number='9876500091', full_name='Asha', user_type='smart_seller'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.session = UserSession.objects.create(user=self.user)
+        self.url = reverse('users:dashboard')
+
+    # SessionAuthentication comes first, so DRF answers failed auth with 403
+    def get(self, **headers):
+        return self.client.get(self.url, headers=headers)
+
+    def test_repeat_requests_skip_the_database(self):
+        self.assertEqual(self.get(Authorization=f'Token {self.token.key}').status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(Authorization=f'Token {self.token.key}').status_code, 200)
+
+        self.assertEqual(self.get(**{'X-Session-Token': self.session.session_token}).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.get(**{'X-Session-Token': self.session.session_token})
+        self.assertEqual(response.json()['dashboard']['user_info']['full_name'], 'Asha')
+
+    def test_bad_credentials_are_rejected(self):
+        self.assertEqual(self.get(Authorization='Token nope').status_code, 403)
+        self.assertEqual(self.get(**{'X-Session-Token': 'nope'}).status_code, 403)
+        UserSession.objects.filter(pk=self.session.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.get(**{'X-Session-Token': self.session.session_token}).status_code, 403)
+
+    def test_profile_update_is_visible_immediately(self):
+        self.get(Authorization=f'Token {self.token.key}')
+        self.user.full_name = 'Asha Patil'
+        self.user.save()
+        response = self.get(Authorization=f'Token {self.token.key}')
+        self.assertEqual(response.json()['dashboard']['user_info']['full_name'], 'Asha Patil')
+
+    def test_logout_revokes_cached_credentials(self):
+        headers = {'Authorization': f'Token {self.token.key}'}
+        self.get(**headers)
+        self.get(**{'X-Session-Token': self.session.session_token})
+
+        response = self.client.post(reverse('users:logout'), headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(**headers).status_code, 403)
+        self.assertEqual(self.get(**{'X-Session-Token': self.session.session_token}).status_code, 403)
+
+    def test_stale_session_token_does_not_block_login_views(self):
+        response = self.client.post(
+            reverse('users:send_otp'), {'mobile_number': '+919876500091'},
+            headers={'X-Session-Token': 'expired-or-unknown'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_entry_cached_across_an_invalidation_is_ignored(self):
+        # A login that read the generation before a logout must not revive the user
+        key = authentication.credential_key('token', self.token.key)
+        generation = authentication.current_generation(self.user.pk)
+        authentication.invalidate_user(self.user.pk)
+        authentication.remember(key, self.user, self.token, generation)
+        self.assertIsNone(authentication.recall(key))
+
+        authentication.remember(key, self.user, self.token)
+        other = authentication.credential_key('session', self.session.session_token)
+        authentication.remember(other, self.user, self.session)
+        authentication.invalidate_users([self.user.pk])
+        self.assertIsNone(authentication.recall(key))
+        self.assertIsNone(authentication.recall(other))
+
+    @override_settings(ADMIN_USERNAME='admin', ADMIN_PASSWORD='secret')
+    def test_suspension_revokes_cached_credentials(self):
+        headers = {'Authorization': f'Token {self.token.key}'}
+        self.get(**headers)
+
+        admin_token = base64.b64encode(b'admin:secret').decode()
+        response = self.client.post(
+            reverse('users:admin_user_suspend', args=[self.user.pk]), headers={'X-Admin-Token': admin_token}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(**headers).status_code, 403)
+
+
+@override_settings(SESSION_TOKEN_MODE='signed')
+class SignedSessionTests(TestCase):
+    """Signed session tokens are checked by signature and cache only"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = CustomUser.objects.create(
+            mobile_number='9876500095', full_name='Ravi', user_type='smart_buyer', buyer_category='community'
+        )
+        Token.objects.create(user=self.user)
+        self.url = reverse('users:dashboard')
+
+    def get(self, session_token):
+        return self.client.get(self.url, headers={'X-Session-Token': session_token})
+
+    def test_unshared_auth_cache_fails_system_check(self):
+        # The suite itself runs signed mode on LocMem; deployments may not
+        self.assertEqual([error.id for error in user_checks.check_signed_session_cache(None)], ['users.E001'])
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache'}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(user_checks.check_signed_session_cache(None), [])
+        with override_settings(SESSION_TOKEN_MODE='random'):
+            self.assertEqual(user_checks.check_signed_session_cache(None), [])
+
+    def test_verification_needs_no_database(self):
+        session_token = sessions.start_session(self.user)
+        audit = UserSession.objects.get(user=self.user)
+        self.assertEqual(audit.session_token, session_token)
+
+        self.assertEqual(self.get(session_token).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(session_token).status_code, 200)
+
+    def test_tampered_and_expired_tokens_are_rejected(self):
+        session_token = sessions.start_session(self.user)
+        self.assertEqual(self.get(session_token[:-2] + 'xx').status_code, 403)
+
+        with self.settings(SESSION_TOKEN_LIFETIME_DAYS=0):
+            expired = sessions.start_session(self.user, end_others=False)
+        self.assertEqual(self.get(expired).status_code, 403)
+
+    def test_logout_denylists_the_session(self):
+        first = sessions.start_session(self.user, end_others=False)
+        second = sessions.start_session(self.user, end_others=False)
+
+        response = self.client.post(reverse('users:logout'), headers={'X-Session-Token': first})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(first).status_code, 403)
+        self.assertTrue(caches['default'].get(sessions.revoked_key(UserSession.objects.get(session_token=first).pk)))
+        # Logout ends every session, as it does for random tokens
+        self.assertEqual(self.get(second).status_code, 403)
+
+    def test_new_login_ends_older_sessions(self):
+        old = sessions.start_session(self.user)
+        new = sessions.start_session(self.user)
+        self.assertIsNone(sessions.verify_signed_token(old))
+        self.assertEqual(self.get(new).status_code, 200)
+
+    @override_settings(ADMIN_USERNAME='admin', ADMIN_PASSWORD='secret')
+    def test_suspension_ends_sessions(self):
+        session_token = sessions.start_session(self.user)
+        admin_token = base64.b64encode(b'admin:secret').decode()
+        self.client.post(reverse('users:admin_user_suspend', args=[self.user.pk]), headers={'X-Admin-Token': admin_token})
+        self.assertIsNone(sessions.verify_signed_token(session_token))
+
+
+class OutboundHTTPClientTests(SimpleTestCase):
+    """Pooling, timeouts, circuit breaking and metrics against a stub server"""
+
+    def setUp(self):
+        http_client.reset_clients()
+        self.addCleanup(http_client.reset_clients)
+
+    def test_connections_are_reused(self):
+        with StubServer() as stub:
+            client = http_client.get_client('stub')
+            for _ in range(3):
+                self.assertEqual(client.get(stub.url('/ping')).status_code, 200)
+        self.assertEqual(len({request['port'] for request in stub.requests}), 1)
+        self.assertIs(http_client.get_client('stub'), client)
+
+    def test_timeout_is_always_applied(self):
+        with StubServer() as stub:
+            client = http_client.ProviderClient('slow', timeout=(1, 0.2))
+            stub.responses.append((200, '{}', 0.5))
+            with self.assertRaises(requests.Timeout):
+                client.get(stub.url())
+            client.close()
+        self.assertEqual(client.metrics()['errors'], 1)
+
+    def test_breaker_opens_fails_fast_and_recovers(self):
+        now = [0.0]
+        breaker = http_client.CircuitBreaker(threshold=2, reset_timeout=30, clock=lambda: now[0])
+        with StubServer() as stub:
+            client = http_client.ProviderClient('flaky', breaker=breaker)
+            stub.responses += [(502, 'bad gateway'), (500, 'oops')]
+            client.get(stub.url())
+            client.get(stub.url())
+            self.assertEqual(breaker.state, breaker.OPEN)
+
+            with self.assertRaises(http_client.CircuitOpenError):
+                client.get(stub.url())
+            self.assertEqual(len(stub.requests), 2)
+
+            # After the reset timeout one trial call goes through and closes it
+            now[0] = 31
+            self.assertEqual(client.get(stub.url()).status_code, 200)
+            self.assertEqual(breaker.state, breaker.CLOSED)
+            client.close()
+
+        metrics = client.metrics()
+        self.assertEqual((metrics['requests'], metrics['errors'], metrics['rejected']), (3, 2, 1))
+        self.assertEqual(metrics['circuit'], 'closed')
+
+    def test_unexpected_error_in_trial_call_frees_the_breaker(self):
+        now = [0.0]
+        breaker = http_client.CircuitBreaker(threshold=1, reset_timeout=30, clock=lambda: now[0])
+        breaker.record_failure()
+        client = http_client.ProviderClient('fragile', breaker=breaker)
+        now[0] = 31
+        with mock.patch.object(client.session, 'request', side_effect=RuntimeError('bad adapter')):
+            with self.assertRaises(RuntimeError):
+                client.get('http://stub.invalid/')
+        self.assertEqual(breaker.state, breaker.OPEN)
+        self.assertEqual(client.metrics()['errors'], 1)
+
+        # The next trial is allowed once the reset timeout passes again
+        now[0] = 62
+        with StubServer() as stub:
+            self.assertEqual(client.get(stub.url()).status_code, 200)
+        self.assertEqual(breaker.state, breaker.CLOSED)
+        client.close()
+
+    def test_client_errors_do_not_trip_the_breaker(self):
+        breaker = http_client.CircuitBreaker(threshold=1, reset_timeout=30)
+        with StubServer() as stub:
+            client = http_client.ProviderClient('strict', breaker=breaker)
+            stub.responses.append((401, '{"error": "invalid_token"}'))
+            self.assertEqual(client.get(stub.url()).status_code, 401)
+            client.close()
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+
+class GoogleIDTokenTests(TestCase):
+    """Google ID tokens are verified locally against a cached key set"""
+
+    client_id = 'web-client.apps.googleusercontent.com'
+
+    def setUp(self):
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        caches['default'].clear()
+        http_client.reset_clients()
+        google_identity.clear_keys()
+        self.addCleanup(http_client.reset_clients)
+        self.addCleanup(google_identity.clear_keys)
+
+        self.private_keys = {}
+        self.jwks = []
+        for kid in ('key-1', 'key-2'):
+            key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+            self.private_keys[kid] = key.private_bytes(
+                serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+            )
+            numbers = key.public_key().public_numbers()
+            self.jwks.append({
+                'kty': 'RSA', 'alg': 'RS256', 'use': 'sig', 'kid': kid,
+                'n': self.b64(numbers.n), 'e': self.b64(numbers.e),
+            })
+
+        self.stub = StubServer().__enter__()
+        self.addCleanup(self.stub.__exit__, None, None, None)
+        self.stub.headers['Cache-Control'] = 'public, max-age=21600'
+        settings_override = override_settings(
+            GOOGLE_JWKS_URL=self.stub.url('/certs'),
+            GOOGLE_OAUTH2_CLIENT_ID=self.client_id,
+            GOOGLE_ID_TOKEN_EXTRA_AUDIENCES=['android-client'],
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    @staticmethod
+    def b64(number):
+        return base64.urlsafe_b64encode(number.to_bytes((number.bit_length() + 7) // 8, 'big')).rstrip(b'=').decode()
+
+    def serve_keys(self, *kids):
+        keys = [jwk for jwk in self.jwks if jwk['kid'] in kids]
+        self.stub.responses.append((200, json.dumps({'keys': keys})))
+
+    def make_token(self, kid='key-1', **claims):
+        from google.auth import crypt
+        from google.auth import jwt as google_jwt
+
+        now = int(time.time())
+        payload = {
+            'iss': 'https://accounts.google.com', 'aud': self.client_id, 'sub': '1234567890',
+            'email': 'asha@example.com', 'email_verified': True, 'name': 'Asha',
+            'iat': now, 'exp': now + 3600,
+        }
+        payload.update(claims)
+        signer = crypt.RSASigner.from_string(self.private_keys[kid], key_id=kid)
+        return google_jwt.encode(signer, payload).decode()
+
+    def test_verification_uses_cached_keys(self):
+        self.serve_keys('key-1')
+        for _ in range(3):
+            info = google_identity.get_user_info(id_token=self.make_token())
+        self.assertEqual((info['id'], info['email'], info['name']), ('1234567890', 'asha@example.com', 'Asha'))
+        self.assertEqual(len(self.stub.requests), 1)
+
+        # A fresh process picks the key set up from the shared cache
+        google_identity._keys, google_identity._expires_at = {}, 0.0
+        google_identity.verify_id_token(self.make_token(aud='android-client'))
+        self.assertEqual(len(self.stub.requests), 1)
+
+    def test_rejects_bad_tokens(self):
+        self.serve_keys('key-1')
+        bad_tokens = [
+            self.make_token(aud='someone-else'),
+            self.make_token(iss='https://evil.example.com'),
+            self.make_token(exp=int(time.time()) - 600, iat=int(time.time()) - 4200),
+            self.make_token()[:-4] + 'AAAA',
+            'not-a-jwt',
+        ]
+        for token in bad_tokens:
+            with self.assertRaises(google_identity.InvalidIDToken):
+                google_identity.verify_id_token(token)
+
+    def test_unverified_email_is_dropped(self):
+        self.serve_keys('key-1')
+        info = google_identity.get_user_info(id_token=self.make_token(email_verified=False))
+        self.assertIsNone(info['email'])
+
+    def test_unknown_kid_refreshes_once(self):
+        self.serve_keys('key-1')
+        google_identity.verify_id_token(self.make_token())
+        # Google rotated in key-2
+        self.serve_keys('key-1', 'key-2')
+        google_identity.verify_id_token(self.make_token(kid='key-2'))
+        google_identity.verify_id_token(self.make_token(kid='key-2'))
+        self.assertEqual(len(self.stub.requests), 2)
+
+    def test_max_age_accounts_for_proxy_age(self):
+        response = requests.Response()
+        response.headers.update({'Cache-Control': 'public, max-age=600', 'Age': '100'})
+        self.assertEqual(google_identity.max_age(response), 500)
+        self.assertEqual(google_identity.max_age(requests.Response()), google_identity.DEFAULT_MAX_AGE)
+
+    def test_falls_back_to_userinfo_when_keys_unavailable(self):
+        self.stub.responses.append((503, 'unavailable'))
+        self.stub.responses.append((200, json.dumps({'id': '42', 'email': 'asha@example.com'})))
+        with mock.patch.object(google_identity, 'USERINFO_URL', self.stub.url('/userinfo')):
+            info = google_identity.get_user_info(id_token=self.make_token(), access_token='access')
+        self.assertEqual(info['id'], '42')
+        self.assertEqual([request['path'] for request in self.stub.requests], ['/certs', '/userinfo?alt=json&access_token=access'])
+
+        self.stub.responses.append((503, 'unavailable'))
+        with self.assertRaises(google_identity.KeySetUnavailable):
+            google_identity.get_user_info(id_token=self.make_token())
+
+    def test_link_social_accepts_id_token(self):
+        self.serve_keys('key-1')
+        user = CustomUser.objects.create(mobile_number='9876500092', user_type='buyer')
+        headers = {'Authorization': f'Token {Token.objects.create(user=user).key}'}
+        url = reverse('users:oauth_link')
+
+        response = self.client.post(url, {'provider': 'google', 'id_token': self.make_token()}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertEqual((user.google_id, user.email), ('1234567890', 'asha@example.com'))
+
+        response = self.client.post(
+            url, {'provider': 'google', 'id_token': self.make_token(aud='someone-else')}, headers=headers
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(ADMIN_USERNAME='admin', ADMIN_PASSWORD='secret')
+class AdminUserListTests(TestCase):
+    """The admin user list is cursor-paginated, filtered and indexed"""
+
+    def setUp(self):
+        self.headers = {'X-Admin-Token': base64.b64encode(b'admin:secret').decode()}
+        self.url = reverse('users:admin_users_list_create')
+        base = timezone.now() - timedelta(days=30)
+        rows = [
+            ('+919876500001', 'Asha Patil', 'smart_seller', None, True, True),
+            ('+919876500002', 'Ravi Kumar', 'smart_buyer', 'mandi_owner', True, True),
+            ('9876500003', 'Meena Rao', 'smart_buyer', 'shopkeeper', False, True),
+            ('+919811100004', 'Ashok Jain', 'smart_buyer', 'community', True, False),
+            ('+919811100005', 'Kiran Patil', 'smart_seller', None, True, True),
+        ]
+        self.users = []
+        for day, (mobile, name, user_type, category, active, complete) in enumerate(rows):
+            user = CustomUser.objects.create(
+                mobile_number=mobile, full_name=name, user_type=user_type, buyer_category=category,
+                is_active=active, address='12 Long Street',
+            )
+            # Spread creation times; two users share one to exercise the id tie-break
+            CustomUser.objects.filter(pk=user.pk).update(
+                created_at=base + timedelta(days=min(day, 3)), is_profile_complete=complete
+            )
+            self.users.append(user)
+
+    def get(self, **params):
+        return self.client.get(self.url, params, headers=self.headers)
+
+    def mobiles(self, response):
+        return [user['mobile_number'] for user in response.json()['users']]
+
+    def test_walks_every_page_once_in_keyset_order(self):
+        seen, cursor = [], None
+        while True:
+            params = {'page_size': 2, **({'cursor': cursor} if cursor else {})}
+            body = self.get(**params).json()
+            self.assertLessEqual(len(body['users']), 2)
+            seen += [user['id'] for user in body['users']]
+            cursor = body['pagination']['next_cursor']
+            if not cursor:
+                break
+        expected = list(CustomUser.objects.order_by('-created_at', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_filters(self):
+        self.assertEqual(len(self.get(user_type='smart_buyer').json()['users']), 3)
+        self.assertEqual(self.mobiles(self.get(user_type='smart_buyer', is_active='false')), ['9876500003'])
+        self.assertEqual(self.mobiles(self.get(is_profile_complete='no')), ['+919811100004'])
+        self.assertEqual(len(self.get(buyer_category='mandi_owner,shopkeeper').json()['users']), 2)
+
+        middle = (timezone.now() - timedelta(days=29, hours=12)).isoformat()
+        self.assertEqual(self.mobiles(self.get(created_before=middle)), ['+919876500001'])
+        self.assertEqual(len(self.get(created_after=middle).json()['users']), 4)
+
+    def test_search(self):
+        # Numeric terms are mobile prefixes, with or without the country code
+        self.assertEqual(sorted(self.mobiles(self.get(search='98765'))), ['+919876500001', '+919876500002', '9876500003'])
+        self.assertEqual(len(self.get(search='+91981').json()['users']), 2)
+        self.assertEqual(sorted(self.mobiles(self.get(search='patil'))), ['+919811100005', '+919876500001'])
+
+    def test_bad_parameters_are_rejected(self):
+        for params in ({'user_type': 'farmer'}, {'is_active': 'maybe'}, {'created_after': 'yesterday'}, {'cursor': 'junk'}):
+            response = self.get(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertFalse(response.json()['success'])
+
+    def test_list_loads_only_list_columns(self):
+        with self.assertNumQueries(1) as context:
+            users = self.get(user_type='smart_buyer', is_active='true').json()['users']
+        self.assertNotIn('address', users[0])
+        sql = context.captured_queries[0]['sql']
+        self.assertNotIn('"address"', sql)
+        self.assertNotIn('"password"', sql)
+
+    def test_filtered_pages_use_an_index(self):
+        from .api.admin_filters import filter_users
+        from .api.pagination import seek
+
+        if connection.vendor != 'sqlite':
+            self.skipTest('Plan assertions are written against SQLite')
+        cases = [{'user_type': 'smart_buyer'}, {'is_active': 'false'}, {'buyer_category': 'shopkeeper'}, {}]
+        for params in cases:
+            queryset = seek(filter_users(CustomUser.objects.all(), params), None)[:50]
+            sql, sql_params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, sql_params)
+                plan = [row[-1] for row in cursor.fetchall()]
+            self.assertFalse([line for line in plan if line.strip() == 'SCAN users_customuser'], (params, plan))
+            self.assertFalse([line for line in plan if 'TEMP B-TREE' in line], (params, plan))
+
+
+@override_settings(ADMIN_USERNAME='admin', ADMIN_PASSWORD='secret')
+class AdminExportTests(TestCase):
+    """Admin exports stream filtered rows without building them in memory"""
+
+    def setUp(self):
+        self.headers = {'X-Admin-Token': base64.b64encode(b'admin:secret').decode()}
+        self.sellers = [
+            CustomUser.objects.create(mobile_number=f'+91987650{i:04d}', full_name=f'Seller {i}', user_type='smart_seller')
+            for i in range(5)
+        ]
+        self.buyer = CustomUser.objects.create(
+            mobile_number='+919811100001', full_name='Buyer, "Quoted"', user_type='smart_buyer'
+        )
+        for user in self.sellers[:2]:
+            AdminActionLog.objects.create(admin_username='admin', user=user, action='suspend', details='spam')
+        AdminActionLog.objects.create(admin_username='other', user=self.buyer, action='view')
+
+    def download(self, name, **params):
+        response = self.client.get(reverse(name), params, headers=self.headers)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_users_csv_applies_list_filters(self):
+        response, body = self.download('users:admin_users_export', user_type='smart_seller')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment; filename="users-', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(body)))
+        expected = list(
+            CustomUser.objects.filter(user_type='smart_seller').order_by('-created_at', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual([int(row['id']) for row in rows], expected)
+        self.assertEqual(list(rows[0]), exports.USER_EXPORT_FIELDS)
+
+        _, body = self.download('users:admin_users_export', search='quoted')
+        self.assertEqual(list(csv.DictReader(io.StringIO(body)))[0]['full_name'], 'Buyer, "Quoted"')
+
+    def test_csv_neutralises_formulas(self):
+        CustomUser.objects.filter(pk=self.buyer.pk).update(full_name='=HYPERLINK("http://evil")', city='@SUM(A1)')
+        _, body = self.download('users:admin_users_export', user_type='smart_buyer')
+        row = list(csv.DictReader(io.StringIO(body)))[0]
+        self.assertEqual(row['full_name'], '\'=HYPERLINK("http://evil")')
+        self.assertEqual(row['city'], "'@SUM(A1)")
+        self.assertEqual(row['id'], str(self.buyer.pk))
+
+        _, body = self.download('users:admin_users_export', user_type='smart_buyer', data_format='ndjson')
+        self.assertEqual(json.loads(body.splitlines()[0])['full_name'], '=HYPERLINK("http://evil")')
+
+    def test_logs_ndjson(self):
+        response, body = self.download('users:admin_logs_export', data_format='ndjson', action='suspend')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['user_id'] for row in rows], [user.pk for user in self.sellers[:2]])
+        self.assertEqual(set(rows[0]), set(exports.LOG_EXPORT_FIELDS))
+
+        _, body = self.download('users:admin_logs_export', data_format='ndjson', user=self.buyer.pk)
+        self.assertEqual(len(body.splitlines()), 1)
+
+    @override_settings(ADMIN_EXPORT_CHUNK_SIZE=2)
+    def test_streams_in_chunks_from_one_query(self):
+        with mock.patch.object(exports, 'FLUSH_ROWS', 2):
+            response = self.client.get(reverse('users:admin_users_export'), headers=self.headers)
+            # Nothing is read until the body is consumed
+            with self.assertNumQueries(1):
+                chunks = list(response.streaming_content)
+        # Header + 6 users flushed two rows at a time
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(len(b''.join(chunks).decode().splitlines()), 7)
+
+    def test_rejects_bad_requests(self):
+        self.assertEqual(self.client.get(reverse('users:admin_users_export')).status_code, 401)
+        for name, params in (
+            ('users:admin_users_export', {'data_format': 'xml'}),
+            ('users:admin_users_export', {'is_active': 'maybe'}),
+            ('users:admin_logs_export', {'user': 'abc'}),
+        ):
+            self.assertEqual(self.client.get(reverse(name), params, headers=self.headers).status_code, 400)
+
+
+@override_settings(ADMIN_USERNAME='admin', ADMIN_PASSWORD='secret', ADMIN_BULK_BATCH_SIZE=3)
+class AdminBulkActionTests(TestCase):
+    """Bulk suspend / reactivate / delete write in batches and audit every change"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.headers = {'Authorization': f'Basic {base64.b64encode(b"admin:secret").decode()}'}
+        self.users = [
+            CustomUser.objects.create(mobile_number=f'+91981110{i:04d}', full_name=f'Spam {i}', user_type='smart_buyer')
+            for i in range(5)
+        ]
+        CustomUser.objects.filter(pk=self.users[0].pk).update(is_active=False)
+
+    def post(self, payload):
+        return self.client.post(reverse('users:admin_users_bulk'), payload, content_type='application/json', headers=self.headers)
+
+    def test_suspend_reports_each_id(self):
+        ids = [user.pk for user in self.users] + [999999]
+        body = self.post({'action': 'suspend', 'ids': ids}).json()
+        statuses = {row['id']: row['status'] for row in body['results']}
+        self.assertEqual(statuses[self.users[0].pk], 'already_suspended')
+        self.assertEqual(statuses[999999], 'not_found')
+        self.assertEqual(body['summary'], {'already_suspended': 1, 'suspended': 4, 'not_found': 1})
+        self.assertFalse(CustomUser.objects.filter(is_active=True).exists())
+
+        logs = AdminActionLog.objects.filter(action='suspend')
+        self.assertEqual(sorted(logs.values_list('user_id', flat=True)), [user.pk for user in self.users[1:]])
+        self.assertEqual(set(logs.values_list('admin_username', flat=True)), {'admin'})
+
+    def test_queries_per_batch_not_per_user(self):
+        def queries_for(users):
+            with CaptureQueriesContext(connection) as context:
+                admin_actions.set_active([user.pk for user in users], active=False)
+            return len(context.captured_queries)
+
+        CustomUser.objects.update(is_active=True)
+        # One batch of three users costs the same as one batch of one
+        self.assertEqual(queries_for(self.users[:1]), queries_for(self.users[1:4]))
+
+    def test_suspension_reaches_cached_credentials(self):
+        user = self.users[1]
+        token = Token.objects.create(user=user)
+        dashboard = reverse('users:dashboard')
+        auth = {'Authorization': f'Token {token.key}'}
+        self.assertEqual(self.client.get(dashboard, headers=auth).status_code, 200)
+
+        self.post({'action': 'suspend', 'ids': [user.pk]})
+        self.assertEqual(self.client.get(dashboard, headers=auth).status_code, 403)
+
+        body = self.post({'action': 'reactivate', 'ids': [user.pk, self.users[0].pk]}).json()
+        self.assertEqual(body['summary'], {'reactivated': 2})
+        self.assertEqual(self.client.get(dashboard, headers=auth).status_code, 200)
+
+    def test_reactivate_skips_users_being_deleted(self):
+        doomed, running, kept = self.users[1], self.users[2], self.users[3]
+        self.post({'action': 'delete', 'ids': [doomed.pk, running.pk]})
+        UserDeletionJob.objects.filter(user_id=running.pk).update(status=UserDeletionJob.STATUS_RUNNING)
+        self.post({'action': 'suspend', 'ids': [kept.pk]})
+
+        body = self.post({'action': 'reactivate', 'ids': [doomed.pk, running.pk, kept.pk]}).json()
+        statuses = {row['id']: row['status'] for row in body['results']}
+        self.assertEqual(statuses, {doomed.pk: 'deletion_scheduled', running.pk: 'deletion_scheduled', kept.pk: 'reactivated'})
+        self.assertEqual(
+            set(CustomUser.objects.filter(pk__in=[doomed.pk, running.pk, kept.pk], is_active=True).values_list('pk', flat=True)),
+            {kept.pk}
+        )
+        self.assertFalse(AdminActionLog.objects.filter(action='reactivate', user_id__in=[doomed.pk, running.pk]).exists())
+
+        # Nor through the Django admin change form
+        from django.contrib import admin as django_admin
+        model_admin = django_admin.site._registry[CustomUser]
+        self.assertIn('is_active', model_admin.get_readonly_fields(None, doomed))
+        self.assertNotIn('is_active', model_admin.get_readonly_fields(None, kept))
+
+    def test_filter_selection(self):
+        body = self.post({'action': 'suspend', 'filter': {'search': 'Spam', 'is_active': True}}).json()
+        self.assertEqual(body['summary'], {'suspended': 4})
+
+        with override_settings(ADMIN_BULK_MAX_USERS=2):
+            response = self.post({'action': 'reactivate', 'filter': {'user_type': ['smart_buyer']}})
+        self.assertEqual(response.status_code, 400)
+
+    def test_delete_keeps_audit_trail(self):
+        victim = self.users[2]
+        body = self.post({'action': 'delete', 'ids': [victim.pk, 999999]}).json()
+        self.assertEqual(body['summary'], {'deletion_scheduled': 1, 'not_found': 1})
+        self.assertFalse(CustomUser.objects.get(pk=victim.pk).is_active)
+
+        deletion.process()
+        self.assertFalse(CustomUser.objects.filter(pk=victim.pk).exists())
+        log = AdminActionLog.objects.get(action='delete')
+        self.assertIsNone(log.user_id)
+        self.assertIn(f'user {victim.pk} {victim.mobile_number}', log.details)
+
+    def test_rejects_bad_requests(self):
+        for payload in (
+            {'action': 'ban', 'ids': [1]},
+            {'action': 'suspend'},
+            {'action': 'suspend', 'ids': [1], 'filter': {'search': 'x'}},
+            {'action': 'suspend', 'ids': ['one']},
+            {'action': 'suspend', 'filter': {}},
+            {'action': 'suspend', 'filter': {'user_type': 'farmer'}},
+        ):
+            self.assertEqual(self.post(payload).status_code, 400, payload)
+        self.assertEqual(self.client.post(reverse('users:admin_users_bulk'), {}).status_code, 401)
+
+
+@override_settings(ADMIN_USERNAME='admin', ADMIN_PASSWORD='secret', USER_DELETION_BATCH_SIZE=2)
+class UserDeletionTests(TestCase):
+    """Deleting a user deactivates it at once and removes its data in chunks later"""
+
+    def setUp(self):
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from products.models import Product, ProductImage
+
+        caches['default'].clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.headers = {'Authorization': f'Basic {base64.b64encode(b"admin:secret").decode()}'}
+        self.seller = CustomUser.objects.create(
+            mobile_number='+919876500051', full_name='Big Seller', user_type='smart_seller'
+        )
+        self.token = Token.objects.create(user=self.seller)
+        UserSession.objects.create(user=self.seller)
+        OTP.objects.create(mobile_number=self.seller.mobile_number, otp_code='123456')
+        self.files = []
+        for i in range(3):
+            product = Product.objects.create(
+                seller=self.seller, name=f'Crop {i}', description='Fresh',
+                quantity_available=10, price_per_unit=50, unit='KG', target_shopkeepers=True,
+            )
+            for j in range(2):
+                name = default_storage.save(f'product_images/crop_{i}_{j}.jpg', ContentFile(b'jpeg'))
+                ProductImage.objects.create(product=product, image=name)
+                self.files.append(name)
+        self.other = CustomUser.objects.create(mobile_number='+919876500052', user_type='smart_seller')
+        Product.objects.create(
+            seller=self.other, name='Other crop', description='Fresh',
+            quantity_available=10, price_per_unit=50, unit='KG', target_shopkeepers=True,
+        )
+
+    def test_delete_request_only_deactivates_and_hides(self):
+        from products.models import Product
+
+        # A fixed number of statements however many products and images there are
+        with self.assertNumQueries(10):
+            response = self.client.delete(reverse('users:admin_user_rud', args=[self.seller.pk]), headers=self.headers)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['deletion']['status'], 'pending')
+
+        self.seller.refresh_from_db()
+        self.assertFalse(self.seller.is_active)
+        self.assertFalse(Product.objects.filter(seller=self.seller, is_published=True).exists())
+        self.assertEqual(Product.objects.filter(seller=self.seller).count(), 3)
+        dashboard = self.client.get(reverse('users:dashboard'), headers={'Authorization': f'Token {self.token.key}'})
+        self.assertEqual(dashboard.status_code, 403)
+
+    def test_worker_deletes_dependents_in_chunks(self):
+        from django.core.files.storage import default_storage
+        from products.models import Product, ProductImage
+
+        deletion.schedule([self.seller.pk], 'admin')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(deletion.process(), (1, 0))
+
+        job = UserDeletionJob.objects.get(user_id=self.seller.pk)
+        self.assertEqual(job.status, UserDeletionJob.STATUS_DONE)
+        self.assertEqual(job.progress, {'product_images': 6, 'products': 3, 'credentials': 2, 'otps': 1, 'user': 1})
+        self.assertFalse(CustomUser.objects.filter(pk=self.seller.pk).exists())
+        self.assertFalse(ProductImage.objects.filter(product__seller_id=self.seller.pk).exists())
+        self.assertFalse(any(default_storage.exists(name) for name in self.files))
+        # Other users and the audit trail are untouched
+        self.assertTrue(Product.objects.filter(seller=self.other).exists())
+        self.assertIsNone(AdminActionLog.objects.get(action='delete').user_id)
+
+    def test_job_resumes_where_it_stopped(self):
+        from products.models import ProductImage
+
+        deletion.schedule([self.seller.pk])
+        job = UserDeletionJob.objects.get(user_id=self.seller.pk)
+        self.assertFalse(deletion.run_job(job, max_chunks=2))
+        job.refresh_from_db()
+        self.assertEqual((job.step, job.progress), ('product_images', {'product_images': 4}))
+        self.assertEqual(ProductImage.objects.filter(product__seller_id=self.seller.pk).count(), 2)
+
+        self.assertTrue(deletion.run_job(UserDeletionJob.objects.get(pk=job.pk)))
+        self.assertFalse(CustomUser.objects.filter(pk=self.seller.pk).exists())
+
+    @override_settings(USER_DELETION_LEASE_SECONDS=60)
+    def test_running_job_keeps_its_lease(self):
+        deletion.schedule([self.seller.pk])
+        [job] = deletion.claim_jobs(10)
+        claimed_at = timezone.now()
+        # Two chunks in, the first lease would have run out
+        with mock.patch('users.deletion.timezone.now', return_value=claimed_at + timedelta(seconds=50)):
+            self.assertFalse(deletion.run_job(job, max_chunks=2))
+        with mock.patch('users.deletion.timezone.now', return_value=claimed_at + timedelta(seconds=70)):
+            self.assertEqual(deletion.claim_jobs(10), [])
+
+    def test_job_taken_over_after_its_lease_expired_stops(self):
+        from products.models import ProductImage
+
+        deletion.schedule([self.seller.pk])
+        [job] = deletion.claim_jobs(10)
+        # The lease ran out before this worker got to the job and another claimed it
+        UserDeletionJob.objects.filter(pk=job.pk).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        [taken] = deletion.claim_jobs(10)
+
+        with mock.patch.object(deletion, 'claim_jobs', return_value=[job]):
+            self.assertEqual(deletion.process(), (0, 0))
+        self.assertEqual(ProductImage.objects.filter(product__seller_id=self.seller.pk).count(), 6)
+        taken.refresh_from_db()
+        self.assertEqual((taken.attempts, taken.progress), (0, {}))
+        self.assertTrue(deletion.run_job(taken))
+
+    def test_failures_are_retried_later(self):
+        deletion.schedule([self.seller.pk])
+        with mock.patch.object(deletion, 'STEPS', [('products', mock.Mock(side_effect=RuntimeError('boom')))]):
+            self.assertEqual(deletion.process(), (0, 1))
+        job = UserDeletionJob.objects.get(user_id=self.seller.pk)
+        self.assertEqual((job.status, job.attempts), (UserDeletionJob.STATUS_PENDING, 1))
+        self.assertIn('boom', job.last_error)
+        self.assertGreater(job.next_attempt_at, timezone.now())
+        # Not due yet
+        self.assertEqual(deletion.process(), (0, 0))
+
+    def test_progress_endpoint(self):
+        url = reverse('users:admin_user_deletion', args=[self.seller.pk])
+        self.assertEqual(self.client.get(url, headers=self.headers).status_code, 404)
+        deletion.schedule([self.seller.pk], 'admin')
+        deletion.process()
+        body = self.client.get(url, headers=self.headers).json()
+        self.assertEqual((body['deletion']['status'], body['deletion']['requested_by']), ('done', 'admin'))
+
+    def test_command(self):
+        deletion.schedule([self.seller.pk])
+        out = io.StringIO()
+        call_command('process_user_deletions', '--once', stdout=out)
+        self.assertIn('Finished 1 user deletions', out.getvalue())
+        self.assertFalse(CustomUser.objects.filter(pk=self.seller.pk).exists())
+
+
+class ServerlessProfileTests(SimpleTestCase):
+    """The serverless entrypoint boots the trimmed API profile quickly"""
+    databases = {'default'}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import importlib.util
+        from django.conf import settings
+
+        path = settings.BASE_DIR / 'api' / 'cold_start.py'
+        spec = importlib.util.spec_from_file_location('cold_start', path)
+        cls.cold_start = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(cls.cold_start)
+
+    def test_api_profile_skips_html_apps(self):
+        api = self.cold_start.run_once('kissanmart.settings_api')
+        full = self.cold_start.run_once('kissanmart.settings')
+        # Token auth answers without the database
+        self.assertEqual((api['status'], full['status']), (401, 403))
+        # DRF's schema module still imports parts of django.contrib.admin, but
+        # the admin app, its registrations and the session stack stay unloaded
+        for module in ('allauth', 'django.contrib.admin.apps', 'users.admin', 'products.admin',
+                       'django.contrib.messages.middleware', 'django.contrib.sessions.middleware'):
+            self.assertNotIn(module, api['loaded'])
+            self.assertIn(module, full['loaded'])
+        self.assertNotIn('google.auth', api['loaded'])
+        self.assertLess(api['modules'], full['modules'])
+
+    def test_cold_start_within_baseline(self):
+        baseline = self.cold_start.load_baseline().get(self.cold_start.DEFAULT_SETTINGS)
+        if baseline is None:
+            self.skipTest('No cold-start baseline recorded')
+        result, other = self.cold_start.measure_against(self.cold_start.DEFAULT_SETTINGS, baseline['compare'], runs=3)
+        # The time ratio is noisier under a loaded test run than the CLI, so only gross slowdowns fail
+        self.assertEqual(self.cold_start.check(result, baseline, other, ratio_tolerance=0.5), [])
+
+    def test_absolute_time_is_advisory(self):
+        baseline = {'first_response_ms': 100.0, 'modules': 800, 'compare': 'kissanmart.settings', 'ratio': 0.5}
+        slow = {'first_response_ms': 300.0, 'modules': 800}
+        # Three times slower on a slower machine, but so is the full profile
+        self.assertEqual(self.cold_start.check(slow, baseline, {'first_response_ms': 600.0}), [])
+        self.assertEqual(len(self.cold_start.advise(slow, baseline)), 1)
+        self.assertEqual(len(self.cold_start.check(slow, baseline, {'first_response_ms': 400.0})), 1)
+        self.assertEqual(len(self.cold_start.check(dict(slow, modules=900), baseline)), 1)
+
+    def test_warmup(self):
+        from kissanmart import serverless
+
+        class Ping:
+            path = serverless.WARMUP_PATH
+            headers = {}
+
+        self.assertTrue(serverless.is_warmup(Ping()))
+        Ping.path, Ping.headers = '/api/products/', {'X-Warmup': '1'}
+        self.assertTrue(serverless.is_warmup(Ping()))
+        Ping.headers = {}
+        self.assertFalse(serverless.is_warmup(Ping()))
+        self.assertGreaterEqual(serverless.warmup(), 0)
+
+
+class ImportProfileTests(SimpleTestCase):
+    """Startup import tree parsing, lazy modules and the stored baseline"""
+
+    REPORT = (
+        'import time: self [us] | cumulative | imported package\n'
+        'import time:       100 |        100 |     urllib3.util\n'
+        'import time:       200 |        300 |   urllib3\n'
+        'import time:        50 |         50 |   charset_normalizer\n'
+        'import time:       400 |        750 | requests\n'
+        'import time:        10 |         10 | json\n'
+    )
+
+    def test_parse_importtime(self):
+        from kissanmart import imports
+
+        roots = imports.parse_importtime(self.REPORT)
+        self.assertEqual([root.name for root in roots], ['requests', 'json'])
+        self.assertEqual([child.name for child in roots[0].children], ['urllib3', 'charset_normalizer'])
+        self.assertEqual(roots[0].children[0].children[0].name, 'urllib3.util')
+
+        summary = imports.summarize(roots, {'requests': ['rest_framework.compat', 'users.sms']})
+        self.assertEqual((summary['total_ms'], summary['modules']), (0.8, 5))
+        self.assertEqual(summary['packages']['urllib3'], {'modules': 2, 'self_ms': 0.3})
+        # Every importer, not just the one that loaded the package first
+        self.assertEqual(summary['deferred'], {
+            'requests': [None, 'rest_framework.compat', 'users.sms'], 'urllib3': ['requests'],
+        })
+        entry = imports.baseline_entry(summary)
+        self.assertEqual(entry['packages'], {'charset_normalizer': 1, 'requests': 1, 'urllib3': 2})
+        self.assertEqual(entry['deferred'], summary['deferred'])
+
+    def test_check_reports_new_importers(self):
+        from kissanmart import imports
+
+        baseline = imports.summarize(imports.parse_importtime(self.REPORT), {'requests': ['rest_framework.compat']})
+        # A second importer of an already loaded package is still a regression
+        summary = imports.summarize(imports.parse_importtime(self.REPORT), {
+            'requests': ['rest_framework.compat', 'users.sms'], 'PIL': ['products.models'],
+        })
+        problems = imports.check(summary, baseline)
+        self.assertEqual(len(problems), 2)
+        self.assertIn('PIL is now imported at startup by products.models', problems[0])
+        self.assertIn('requests is now imported at startup by users.sms', problems[1])
+        self.assertEqual(imports.check(baseline, baseline), [])
+
+    def test_find_importers(self):
+        import types
+        from kissanmart import imports
+
+        module = types.ModuleType('kissanmart_import_probe')
+        module.json, module.loads, module.lazy = json, json.loads, imports.lazy_import('json')
+        self.addCleanup(sys.modules.pop, module.__name__, None)
+        sys.modules[module.__name__] = module
+        self.assertIn(module.__name__, imports.find_importers(('json',))['json'])
+        # A lazy binding is not an import
+        del module.json, module.loads
+        self.assertNotIn(module.__name__, imports.find_importers(('json',)).get('json', []))
+
+    def test_lazy_module(self):
+        from kissanmart.imports import LazyModule, lazy_import
+
+        # Even an already imported module is bound lazily
+        self.assertIsInstance(lazy_import('json'), LazyModule)
+        self.assertIs(lazy_import('json').loads, json.loads)
+        module = LazyModule('colorsys')
+        self.assertIn('not loaded', repr(module))
+        self.assertEqual(module.rgb_to_hsv(0, 0, 0), (0, 0, 0))
+        self.assertIn('(loaded)', repr(module))
+
+    def test_startup_within_baseline(self):
+        from kissanmart import imports
+
+        settings_module = os.environ['DJANGO_SETTINGS_MODULE']
+        baseline = imports.load_baseline().get(settings_module)
+        if baseline is None:
+            self.skipTest(f'No import baseline recorded for {settings_module}')
+        summary = imports.summarize(*imports.profile_startup(settings_module, runs=1))
+        # Project code itself never imports a deferred package at startup
+        project = ('users', 'products', 'kissanmart', 'api')
+        importers = [name for names in summary['deferred'].values() for name in names]
+        self.assertEqual([name for name in importers if name and name.split('.')[0] in project], [])
+        # Timing is machine dependent, so only gross slowdowns fail here
+        self.assertEqual(imports.check(summary, baseline, time_tolerance=1.0), [])
+
+
+@override_settings(ADMIN_USERNAME='admin', ADMIN_PASSWORD='secret', PERF_SLOW_QUERY_SAMPLE_RATE=1.0,
+                   PERF_SERVER_TIMING=True)
+class RequestMetricsTests(TestCase):
+    """Per-request metrics, Server-Timing headers and the slow-query log"""
+
+    def setUp(self):
+        self.headers = {'X-Admin-Token': base64.b64encode(b'admin:secret').decode()}
+        CustomUser.objects.create(mobile_number='+919876500001', full_name='Asha Patil', user_type='smart_seller')
+        perf.reset()
+        self.addCleanup(perf.reset)
+
+    def test_records_view_metrics_and_server_timing(self):
+        response = self.client.get(reverse('users:admin_users_list_create'), headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", ser;dur=[\d.]+$')
+
+        metrics = perf.snapshot()['views']['users:admin_users_list_create']
+        self.assertEqual((metrics['requests'], metrics['errors']), (1, 0))
+        self.assertGreater(metrics['max_queries'], 0)
+        self.assertEqual(metrics['max_response_bytes'], len(response.content))
+        self.assertEqual(sum(metrics['histogram_ms'].values()), 1)
+        self.assertIn(metrics['p50_ms'], perf.DEFAULT_BUCKETS_MS + (None,))
+
+        self.client.get('/api/users/no-such-page/')
+        self.assertEqual(perf.snapshot()['views'][perf.UNRESOLVED]['requests'], 1)
+
+    @override_settings(PERF_SERVER_TIMING=False)
+    def test_server_timing_can_be_turned_off(self):
+        response = self.client.get(reverse('users:admin_users_list_create'), headers=self.headers)
+        self.assertNotIn('Server-Timing', response)
+        # Metrics are still recorded
+        self.assertEqual(perf.snapshot()['views']['users:admin_users_list_create']['requests'], 1)
+
+    def test_counts_queries_and_serializer_time(self):
+        # Normally done when the middleware is loaded
+        perf.instrument_serializers()
+        stats = perf.RequestStats()
+        token = perf._current.set(stats)
+        try:
+            with connection.execute_wrapper(stats):
+                users = list(CustomUser.objects.all())
+                CustomUser.objects.count()
+                UserListSerializer(users, many=True).data
+        finally:
+            perf._current.reset(token)
+        self.assertEqual(stats.queries, 2)
+        self.assertGreater(stats.db_time, 0)
+        self.assertGreater(stats.serializer_time, 0)
+
+    def test_lean_product_listing_counts_as_serializer_time(self):
+        from products.api.serializers import serialize_product_list
+        from products.models import Product
+
+        stats = perf.RequestStats()
+        token = perf._current.set(stats)
+        try:
+            serialize_product_list(Product.objects.all())
+        finally:
+            perf._current.reset(token)
+        self.assertGreater(stats.serializer_time, 0)
+
+    @override_settings(PERF_SLOW_QUERY_MS=0)
+    def test_slow_queries_are_fingerprinted_and_logged(self):
+        with self.assertLogs('kissanmart.perf.slow_queries', 'WARNING') as logs:
+            self.client.get(reverse('users:admin_users_list_create'), {'search': 'Asha'}, headers=self.headers)
+        self.assertTrue(logs.output)
+        slow = perf.snapshot()['slow_queries']
+        self.assertTrue(slow)
+        self.assertTrue(all('Asha' not in entry['sql'] for entry in slow))
+
+    def test_fingerprint(self):
+        sql = "SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'O''Brien' AND n > 5 LIMIT 21"
+        self.assertEqual(perf.fingerprint(sql), 'SELECT * FROM t WHERE id IN (...) AND name = ? AND n > ? LIMIT ?')
+        self.assertEqual(perf.fingerprint('SELECT  "t1"."id"\n FROM "t1" WHERE "t1"."id" = %s'),
+                         'SELECT "t1"."id" FROM "t1" WHERE "t1"."id" = ?')
+
+    def test_metrics_endpoint_is_admin_only(self):
+        url = reverse('users:admin_metrics')
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        self.addCleanup(http_client.reset_clients)
+        http_client.get_client('sms')
+        self.client.get(reverse('users:admin_users_list_create'), headers=self.headers)
+        response = self.client.get(url, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('users:admin_users_list_create', response.json()['metrics']['views'])
+        self.assertEqual(response.json()['metrics']['outbound_http']['sms']['circuit'], 'closed')
+
+        self.assertEqual(self.client.delete(url, headers=self.headers).status_code, 200)
+        # Only the metrics request itself has been recorded since the reset
+        self.assertEqual(list(perf.snapshot()['views']), ['users:admin_metrics'])
+
+
+@override_settings(ADMIN_USERNAME='admin', ADMIN_PASSWORD='secret', SMS_PROVIDER='fake', SMS_FAKE_LATENCY_MS=0)
+class UserQueryCountTests(NPlusOneMixin, TestCase):
+    """Every users URL issues the same queries however much data there is.
+
+    Each scenario runs against the fixtures plus ``SIZES`` extra users,
+    audit log entries, sessions and products; every run is rolled back so
+    the next one starts from the same state.
+    """
+    SIZES = (2, 12)
+    # Provider calls need a live Google/Facebook; these only validate input here
+    # (the provider paths are covered by GoogleIDTokenTests)
+    EXPECTED_STATUS = {'oauth_callback': 400, 'oauth_token': 400, 'oauth_link': 400}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = CustomUser.objects.create(
+            mobile_number='9876511001', full_name='Asha Patil', user_type='smart_seller', address='Pune',
+            city='Pune', state='MH', pincode='411001', is_mobile_verified=True,
+        )
+        cls.buyer = CustomUser.objects.create(
+            mobile_number='9876511002', full_name='Ravi Kumar', user_type='smart_buyer',
+            buyer_category='shopkeeper', is_mobile_verified=True,
+        )
+        cls.newcomer = CustomUser.objects.create(mobile_number='9876511003', is_mobile_verified=True)
+        CustomUser.objects.filter(pk__in=[cls.seller.pk, cls.buyer.pk]).update(is_profile_complete=True)
+        CustomUser.objects.filter(pk=cls.newcomer.pk).update(is_profile_complete=False)
+        Token.objects.create(user=cls.seller)
+        OTP.objects.create(mobile_number=cls.seller.mobile_number, otp_code='654321')
+        OTP.objects.create(mobile_number='9876511004', otp_code='123456')
+        UserDeletionJob.objects.create(user_id=cls.buyer.pk, user_identifier=cls.buyer.mobile_number)
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.client = APIClient()
+        self.headers = {'X-Admin-Token': base64.b64encode(b'admin:secret').decode()}
+
+    def seed(self, size):
+        from products.models import Product
+
+        CustomUser.objects.bulk_create([
+            CustomUser(mobile_number=f'98777{i:05d}', full_name=f'Grower {i}', user_type='smart_seller')
+            for i in range(size)
+        ])
+        AdminActionLog.objects.bulk_create([
+            AdminActionLog(admin_username='admin', user=self.buyer, action='suspend', details=f'Check {i}')
+            for i in range(size)
+        ])
+        expires_at = timezone.now() + timedelta(days=1)
+        UserSession.objects.bulk_create([
+            UserSession(user=self.seller, session_token=UserSession.generate_session_token(), expires_at=expires_at)
+            for _ in range(size)
+        ])
+        Product.objects.bulk_create([
+            Product(seller=self.seller, name=f'Okra {i}', description='Green okra', quantity_available=5,
+                    price_per_unit=30, unit='KG', target_shopkeepers=True)
+            for i in range(size)
+        ])
+
+    def scenarios(self):
+        seller, buyer = self.seller, self.buyer
+        return {
+            'send_otp': (None, 'post', reverse('users:send_otp'), {'mobile_number': '+919876511005'}),
+            'verify_phone_registration': (None, 'post', reverse('users:verify_phone_registration'), {
+                'mobile_number': '9876511004', 'otp_code': '123456'
+            }),
+            'complete_profile': (None, 'post', reverse('users:complete_profile'), {
+                'mobile_number': f'+91{self.newcomer.mobile_number}', 'full_name': 'Meena Rao', 'user_type': 'smart_seller',
+                'address': '4 Market Road', 'city': 'Nashik', 'state': 'MH', 'pincode': '422001',
+            }),
+            'phone_login': (None, 'post', reverse('users:phone_login'), {
+                'mobile_number': seller.mobile_number, 'otp_code': '654321'
+            }),
+            'logout': (seller, 'post', reverse('users:logout'), None),
+            'profile': (seller, 'get', reverse('users:profile'), None),
+            'dashboard': (seller, 'get', reverse('users:dashboard'), None),
+            'check_user': (None, 'post', reverse('users:check_user'), {'mobile_number': seller.mobile_number}),
+            'statistics': (seller, 'get', reverse('users:statistics'), None),
+            'oauth_callback': (None, 'post', reverse('users:oauth_callback'), {'provider': 'google'}),
+            'oauth_token': (None, 'post', reverse('users:oauth_token'), {'provider': 'google'}),
+            'oauth_link': (seller, 'post', reverse('users:oauth_link'), {}),
+            'admin_auth': (None, 'post', reverse('users:admin_auth'), {'username': 'admin', 'password': 'secret'}),
+            'admin_users_list_create': (None, 'get', reverse('users:admin_users_list_create'), None),
+            'admin_users_export': (None, 'get', reverse('users:admin_users_export'), {'data_format': 'ndjson'}),
+            'admin_users_bulk': (None, 'post', reverse('users:admin_users_bulk'), {
+                'action': 'suspend', 'ids': [buyer.pk]
+            }),
+            'admin_logs_export': (None, 'get', reverse('users:admin_logs_export'), None),
+            'admin_user_rud': (None, 'get', reverse('users:admin_user_rud', args=[buyer.pk]), None),
+            'admin_user_suspend': (None, 'post', reverse('users:admin_user_suspend', args=[buyer.pk]), None),
+            'admin_user_logs': (None, 'get', reverse('users:admin_user_logs', args=[buyer.pk]), None),
+            'admin_user_deletion': (None, 'get', reverse('users:admin_user_deletion', args=[buyer.pk]), None),
+            'admin_metrics': (None, 'get', reverse('users:admin_metrics'), None),
+        }
+
+    def measure(self, name, size):
+        for cache in caches.all():
+            cache.clear()
+        with transaction.atomic():
+            self.seed(size)
+            user, method, url, data = self.scenarios()[name]
+            # A fresh instance each run: views cache related objects on request.user
+            self.client.force_authenticate(user and CustomUser.objects.get(pk=user.pk))
+            with self.capture_queries() as capture:
+                if method == 'get':
+                    response = self.client.get(url, data, headers=self.headers)
+                else:
+                    response = getattr(self.client, method)(url, data, format='json', headers=self.headers)
+                body = b''.join(response.streaming_content) if response.streaming else response.content
+            transaction.set_rollback(True)
+        expected = self.EXPECTED_STATUS.get(name)
+        if expected:
+            self.assertEqual(response.status_code, expected, body)
+        else:
+            self.assertLess(response.status_code, 400, body)
+        return capture
+
+    def test_every_user_url_has_a_scenario(self):
+        from . import urls as user_urls
+
+        names = {pattern.name for pattern in user_urls.urlpatterns}
+        self.assertEqual(names, set(self.scenarios()))
+
+    def test_query_count_is_constant(self):
+        small, large = self.SIZES
+        for name in self.scenarios():
+            with self.subTest(view=name):
+                # The first run pays for per-process lookups (e.g. content types)
+                self.measure(name, small)
+                small_capture = self.measure(name, small)
+                large_capture = self.measure(name, large)
+                self.assertSameQueryCount(small_capture, large_capture, name)
+                self.assertNoNPlusOne(large_capture, msg=name)
 
-# Create your tests here.
@@ -53,8 +53,13 @@ from .api import admin_views
 urlpatterns += [
     path('admin/auth/', csrf_exempt(admin_views.AdminAuthView.as_view()), name='admin_auth'),
     path('admin/users/', admin_views.AdminUserListCreate.as_view(), name='admin_users_list_create'),
+    path('admin/users/export/', admin_views.AdminUserExportView.as_view(), name='admin_users_export'),
+    path('admin/users/bulk/', csrf_exempt(admin_views.AdminUserBulkActionView.as_view()), name='admin_users_bulk'),
+    path('admin/logs/export/', admin_views.AdminLogExportView.as_view(), name='admin_logs_export'),
     path('admin/users/<int:id>/', admin_views.AdminUserRetrieveUpdateDelete.as_view(), name='admin_user_rud'),
     path('admin/users/<int:id>/suspend/', csrf_exempt(admin_views.AdminUserSuspendView.as_view()), name='admin_user_suspend'),
     path('admin/users/<int:id>/logs/', admin_views.AdminUserLogsView.as_view(), name='admin_user_logs'),
+    path('admin/users/<int:id>/deletion/', admin_views.AdminUserDeletionView.as_view(), name='admin_user_deletion'),
+    path('admin/metrics/', csrf_exempt(admin_views.AdminMetricsView.as_view()), name='admin_metrics'),
 ]
 